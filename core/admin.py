@@ -2,17 +2,26 @@ import locale
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse, path
+from django.db import transaction
 from django.db.models import F, Sum
 from django.contrib.humanize.templatetags.humanize import intcomma
 from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.contrib import messages
+from django.contrib.admin.actions import delete_selected as delete_selected_bawaan
+from django.core.exceptions import ValidationError
 from django.utils.safestring import mark_safe
 from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.models import User, Group
 from .models import (
     Pelanggan, Sopir, Kendaraan, Produk,
-    StokMasuk, Pemesanan, DetailPemesanan, Feedback
+    StokMasuk, Pemesanan, DetailPemesanan, Feedback, LaporanJob, MutasiStok
 )
 from . import views
+from .reports import LAPORAN, FORMAT_EKSPOR
+from .pesanan import batalkan_pesanan, hapus_pesanan, kirim_pesanan
+from .forms import KirimPesananForm, ImporStokMasukForm, StokMasukAdminForm
+from .stok import baca_impor_stok, hapus_stok_masuk, impor_stok_masuk
 
 # Custom Admin Site
 class CustomAdminSite(admin.AdminSite):
@@ -40,6 +49,15 @@ class CustomAdminSite(admin.AdminSite):
         extra_context['user'] = request.user
         
         return super().index(request, extra_context)
+    
+    def get_urls(self):
+        from . import views
+        
+        urls = super().get_urls()
+        custom_urls = [
+            path('dashboard/deret-waktu/', self.admin_view(views.admin_dashboard_deret_waktu), name='dashboard-deret-waktu'),
+        ]
+        return custom_urls + urls
 # Instantiate the custom admin site
 custom_admin_site = CustomAdminSite(name='custom_admin')
 
@@ -80,7 +98,12 @@ custom_admin_site.register(Group)
 
 @admin.register(Pelanggan, site=custom_admin_site)
 class PelangganAdmin(ActionColumnMixin, admin.ModelAdmin):
-    list_display = ('nama', 'noWa', 'alamat', 'username', 'actions_column')
+    def total_pembelian_formatted(self, obj):
+        return currency_format(obj.totalPembelian)
+    total_pembelian_formatted.short_description = 'Total Pembelian'
+    total_pembelian_formatted.admin_order_field = 'totalPembelian'
+
+    list_display = ('nama', 'noWa', 'alamat', 'username', 'jumlahPesanan', 'total_pembelian_formatted', 'pesananTerakhir', 'actions_column')
     search_fields = ('nama', 'username', 'noWa')
     list_filter = ()
 
@@ -114,6 +137,67 @@ class StokMasukAdmin(ActionColumnMixin, admin.ModelAdmin):
     list_filter = ('tanggal', 'idProduk')
     date_hierarchy = 'tanggal'
     autocomplete_fields = ['idProduk']
+    change_list_template = 'core/stokmasuk_change_list.html'
+    form = StokMasukAdminForm
+    actions = ['delete_selected']
+    
+    @admin.action(permissions=['delete'], description=delete_selected_bawaan.short_description)
+    def delete_selected(self, request, queryset):
+        # Aksi hapus bawaan; stok yang sudah terjual membatalkan seluruh penghapusan (lihat delete_queryset)
+        try:
+            with transaction.atomic():
+                return delete_selected_bawaan(self, request, queryset)
+        except ValidationError as e:
+            self.message_user(request, ' '.join(e.messages), messages.ERROR)
+            return None
+    
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        # Stok bisa terjual di antara validasi form dan StokMasuk.save(); simpanan dibatalkan seluruhnya
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except ValidationError as e:
+            self.message_user(request, ' '.join(e.messages), messages.ERROR)
+            return redirect('admin:core_stokmasuk_change', object_id)
+    
+    def delete_queryset(self, request, queryset):
+        # queryset.delete() bawaan melewati StokMasuk.delete(), jadi stok tidak pernah ditarik
+        hapus_stok_masuk(queryset)
+    
+    def delete_view(self, request, object_id, extra_context=None):
+        try:
+            return super().delete_view(request, object_id, extra_context)
+        except ValidationError as e:
+            self.message_user(request, ' '.join(e.messages), messages.ERROR)
+            return redirect('admin:core_stokmasuk_change', object_id)
+    
+    def get_urls(self):
+        urls = super().get_urls()
+        custom_urls = [
+            path('impor/', self.admin_site.admin_view(self.impor_view), name='core_stokmasuk_impor'),
+        ]
+        return custom_urls + urls
+    
+    def impor_view(self, request):
+        """Impor banyak stok masuk dari CSV/TSV; satu baris salah membatalkan seluruh file"""
+        form = ImporStokMasukForm(request.POST or None, request.FILES or None)
+        errors = []
+        if form.is_valid():
+            try:
+                stok_masuk_list = baca_impor_stok(form.cleaned_data['file'])
+            except ValidationError as e:
+                errors = e.messages
+            else:
+                jumlah_per_produk = impor_stok_masuk(stok_masuk_list)
+                self.message_user(request, f'{len(stok_masuk_list)} stok masuk untuk {len(jumlah_per_produk)} produk berhasil diimpor.')
+                return redirect('admin:core_stokmasuk_changelist')
+        
+        return TemplateResponse(request, 'core/stokmasuk_impor.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Impor Stok Masuk',
+            'opts': self.model._meta,
+            'form': form,
+            'errors': errors,
+        })
 
 
 class DetailPemesananInline(admin.TabularInline):
@@ -174,26 +258,78 @@ class PemesananAdmin(ActionColumnMixin, admin.ModelAdmin):
             path('laporan/sopir-kendaraan/pdf/', self.admin_site.admin_view(views.laporan_sopir_kendaraan), name='laporan-sopir-kendaraan-pdf'),
             path('laporan/pemesanan-pendapatan/pdf/', self.admin_site.admin_view(views.laporan_pemesanan_pendapatan), name='laporan-pemesanan-pendapatan-pdf'),
             path('laporan/feedback/pdf/', self.admin_site.admin_view(views.laporan_feedback), name='laporan-feedback-pdf'),
+            path('laporan/semua/zip/', self.admin_site.admin_view(views.laporan_bundel_zip), name='laporan-semua-zip'),
+        ]
+        custom_urls += [
+            path('laporan/job/<int:id_job>/', self.admin_site.admin_view(views.admin_laporan_job_status), name='laporan-job-status'),
+            path('laporan/job/<int:id_job>/status/', self.admin_site.admin_view(views.admin_laporan_job_status_json), name='laporan-job-status-json'),
+            path('laporan/job/<int:id_job>/unduh/', self.admin_site.admin_view(views.laporan_job_unduh), name='laporan-job-unduh'),
+        ]
+        # Ekspor CSV/XLSX untuk setiap laporan, misalnya laporan/produk/csv/ (name 'laporan-produk-csv')
+        custom_urls += [
+            path(f'laporan/{nama}/{format_ekspor}/', self.admin_site.admin_view(views.laporan_ekspor),
+                 {'nama': nama, 'format_ekspor': format_ekspor}, name=f'laporan-{nama}-{format_ekspor}')
+            for nama in LAPORAN
+            for format_ekspor in FORMAT_EKSPOR
         ]
         return custom_urls + urls
 
-    def response_change(self, request, obj):
-        # Check if status has changed to "Dibatalkan"
-        if obj.status == 'Dibatalkan':
-            # Get the original object from database
-            from .models import DetailPemesanan, Produk
-            original_obj = self.model.objects.get(pk=obj.pk)
-            
-            # If status was not "Dibatalkan" before, return stock
-            if original_obj.status != 'Dibatalkan':
-                # Loop through all order details
-                for detail in obj.detailpemesanan_set.all():
-                    # Add quantity back to product stock
-                    product = detail.idProduk
-                    product.stok += detail.jumlah
-                    product.save()
+    actions = ['kirim_pesanan_terpilih', 'batalkan_pesanan_terpilih']
+    
+    @admin.action(description='Kirim pesanan terpilih (tugaskan sopir)')
+    def kirim_pesanan_terpilih(self, request, queryset):
+        # Langkah pertama menampilkan pilihan sopir; langkah kedua (tombol "Kirim") menjalankan update
+        form = KirimPesananForm(request.POST if 'kirim' in request.POST else None)
+        if form.is_valid():
+            jumlah = kirim_pesanan(queryset, form.cleaned_data['idSopir'])
+            dilewati = queryset.count() - jumlah
+            self.message_user(request, f'{jumlah} pesanan dikirim oleh {form.cleaned_data["idSopir"].nama}.')
+            if dilewati:
+                self.message_user(request, f'{dilewati} pesanan dilewati karena statusnya bukan Diproses.', messages.WARNING)
+            return None
+        
+        return TemplateResponse(request, 'core/kirim_pesanan.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Kirim Pesanan Terpilih',
+            'opts': self.model._meta,
+            'form': form,
+            'pesanan_list': queryset.select_related('idPelanggan').order_by('tanggalPemesanan'),
+            'action_checkbox_name': admin.helpers.ACTION_CHECKBOX_NAME,
+        })
+    
+    @admin.action(description='Batalkan pesanan terpilih')
+    def batalkan_pesanan_terpilih(self, request, queryset):
+        try:
+            jumlah = batalkan_pesanan(queryset)
+        except ValidationError as e:
+            # Pesanan terpilih diubah admin lain di tengah pembatalan; tidak ada yang dibatalkan
+            self.message_user(request, ' '.join(e.messages), messages.ERROR)
+            return
+        self.message_user(request, f'{jumlah} pesanan dibatalkan dan stoknya dikembalikan.')
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        # ValidationError dari batalkan_pesanan di save_model membatalkan seluruh simpanan form
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except ValidationError as e:
+            self.message_user(request, ' '.join(e.messages), messages.ERROR)
+            return redirect('admin:core_pemesanan_change', object_id)
+
+    def delete_queryset(self, request, queryset):
+        # Aksi "hapus" bawaan memakai queryset.delete() yang melewati Pemesanan.delete()
+        hapus_pesanan(queryset)
+
+    def save_model(self, request, obj, form, change):
+        # Pembatalan dari form ubah memakai jalur yang sama dengan aksi "Batalkan pesanan terpilih"
+        status_lama = form.initial.get('status')
+        if not change or obj.status != 'Dibatalkan' or status_lama == 'Dibatalkan':
+            return super().save_model(request, obj, form, change)
         
-        return super().response_change(request, obj)
+        obj.status = status_lama
+        super().save_model(request, obj, form, change)
+        batalkan_pesanan(Pemesanan.objects.filter(pk=obj.pk))
+        obj.status = 'Dibatalkan'
+        obj.tandai_tersimpan()
 
 @admin.register(Feedback, site=custom_admin_site)
 class FeedbackAdmin(ActionColumnMixin, admin.ModelAdmin):
@@ -208,3 +344,34 @@ class FeedbackAdmin(ActionColumnMixin, admin.ModelAdmin):
         return f'{obj.isi[:50]}...' if len(obj.isi) > 50 else obj.isi
     isi_preview.short_description = 'Isi Feedback (Ringkasan)'
 
+@admin.register(MutasiStok, site=custom_admin_site)
+class MutasiStokAdmin(admin.ModelAdmin):
+    list_display = ('tanggal', 'idProduk', 'jenis', 'perubahan', 'keterangan')
+    list_filter = ('jenis', 'idProduk')
+    date_hierarchy = 'tanggal'
+    list_select_related = ('idProduk',)
+    
+    # Buku besar hanya ditambah oleh perubahan stok, tidak diubah dari admin
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+    
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(LaporanJob, site=custom_admin_site)
+class LaporanJobAdmin(admin.ModelAdmin):
+    list_display = ('idJob', 'laporan', 'status', 'dibuatOleh', 'tanggalDibuat', 'tanggalSelesai', 'status_link')
+    list_filter = ('status', 'laporan')
+    readonly_fields = ('laporan', 'parameter', 'kunci', 'status', 'file', 'pesanError', 'dibuatOleh',
+                       'tanggalDibuat', 'tanggalMulai', 'tanggalSelesai')
+    
+    def has_add_permission(self, request):
+        # Job dibuat dari tombol "Cetak PDF" di halaman laporan
+        return False
+    
+    def status_link(self, obj):
+        return format_html('<a href="{}">Lihat</a>', reverse('admin:laporan-job-status', args=[obj.idJob]))
+    status_link.short_description = 'Status'
@@ -0,0 +1,231 @@
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db.models import Count, Sum, Q
+from django.utils import timezone
+
+from .models import Pemesanan, RekapPendapatanHarian
+
+DASHBOARD_CACHE_KEY = 'dashboard:context'
+DASHBOARD_VERSION_KEY = 'dashboard:versi'
+DASHBOARD_LOCK_KEY = 'dashboard:lock'
+# Umur maksimum context sebelum dihitung ulang walaupun tidak ada perubahan data,
+# karena "pesanan perlu perhatian" bergantung pada jendela 24 jam yang terus bergeser
+DASHBOARD_CACHE_TTL = 60
+# Batas waktu kunci rebuild, untuk berjaga-jaga jika proses rebuild mati di tengah jalan
+DASHBOARD_LOCK_TIMEOUT = 30
+# Entry lama tetap disimpan selama ini agar bisa disajikan selama rebuild berjalan
+DASHBOARD_STALE_TIMEOUT = 60 * 60 * 24
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "Mei", "Jun", "Jul", "Agu", "Sep", "Okt", "Nov", "Des"]
+
+
+def get_month_range(now):
+    """
+    Return (awal, akhir) of the local (Asia/Makassar) month containing `now`
+    as a half-open range of aware datetimes.
+    """
+    now = timezone.localtime(now)
+    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if now.month == 12:
+        end_of_month = start_of_month.replace(year=now.year + 1, month=1)
+    else:
+        end_of_month = start_of_month.replace(month=now.month + 1)
+    return start_of_month, end_of_month
+
+
+def get_rentang_bulan_lalu(today=None):
+    """(tanggal pertama, tanggal terakhir) bulan kalender sebelum `today` (tanggal lokal)."""
+    if today is None:
+        today = timezone.localdate()
+    akhir = today.replace(day=1) - timedelta(days=1)
+    return akhir.replace(day=1), akhir
+
+
+def get_kpi_pemesanan(now=None):
+    """
+    Hitung semua KPI pemesanan untuk dashboard dalam satu query agregasi bersyarat.
+    """
+    if now is None:
+        now = timezone.now()
+
+    start_of_month, end_of_month = get_month_range(now)
+    twenty_four_hours_ago = now - timedelta(hours=24)
+
+    selesai = Q(status='Selesai')
+    bulan_ini = Q(tanggalPemesanan__gte=start_of_month, tanggalPemesanan__lt=end_of_month)
+
+    hasil = Pemesanan.objects.aggregate(
+        # Pesanan Perlu Perhatian: status='Diproses' dan lebih dari 24 jam yang lalu
+        pesanan_perlu_perhatian=Count('pk', filter=Q(status='Diproses', tanggalPemesanan__lte=twenty_four_hours_ago)),
+        total_pesanan_diproses=Count('pk', filter=Q(status='Diproses')),
+        total_pengiriman_aktif=Count('pk', filter=Q(status='Dikirim')),
+        transaksi_selesai_bulan_ini=Count('pk', filter=selesai & bulan_ini),
+        transaksi_selesai_keseluruhan=Count('pk', filter=selesai),
+        pendapatan_bulan_ini=Sum('total', filter=selesai & bulan_ini),
+        total_pendapatan_keseluruhan=Sum('total', filter=selesai),
+    )
+
+    # SUM tanpa baris menghasilkan None
+    for key in ('pendapatan_bulan_ini', 'total_pendapatan_keseluruhan'):
+        if hasil[key] is None:
+            hasil[key] = Decimal('0')
+
+    hasil['twenty_four_hours_ago'] = twenty_four_hours_ago
+    return hasil
+
+
+GRANULARITAS_CHOICES = ('harian', 'mingguan', 'bulanan')
+# Batas jumlah titik pada satu deret agar satu request tidak membangun deret raksasa
+MAX_PERIODE_DERET = 1000
+
+
+def get_awal_periode(tanggal, granularitas):
+    """Tanggal awal periode (hari, minggu ISO yang dimulai Senin, atau bulan) yang memuat `tanggal`."""
+    if granularitas == 'harian':
+        return tanggal
+    if granularitas == 'mingguan':
+        return tanggal - timedelta(days=tanggal.weekday())
+    return tanggal.replace(day=1)
+
+
+def get_periode_berikutnya(periode, granularitas):
+    if granularitas == 'harian':
+        return periode + timedelta(days=1)
+    if granularitas == 'mingguan':
+        return periode + timedelta(days=7)
+    if periode.month == 12:
+        return periode.replace(year=periode.year + 1, month=1)
+    return periode.replace(month=periode.month + 1)
+
+
+def get_label_periode(periode, granularitas):
+    if granularitas == 'bulanan':
+        return f"{MONTH_NAMES[periode.month - 1]} {str(periode.year)[2:]}"
+    return f"{periode.day} {MONTH_NAMES[periode.month - 1]} {str(periode.year)[2:]}"
+
+
+def get_deret_waktu(tgl_mulai, tgl_akhir, granularitas='bulanan'):
+    """
+    Deret pendapatan dan jumlah pesanan 'Selesai' antara `tgl_mulai` dan `tgl_akhir`
+    (inklusif) per hari, minggu, atau bulan, dibaca dari RekapPendapatanHarian.
+    
+    Seperti kartu "Transaksi Selesai" dan "Pendapatan", deret ini hanya menghitung
+    pesanan 'Selesai'; pesanan yang masih diproses atau dikirim belum masuk. Karena
+    itu key-nya `jumlah_pesanan_selesai`, bukan jumlah semua pesanan.
+    """
+    if granularitas not in GRANULARITAS_CHOICES:
+        raise ValueError(f'Granularitas tidak dikenal: {granularitas}')
+    if tgl_mulai > tgl_akhir:
+        raise ValueError('Tanggal mulai harus sebelum tanggal akhir.')
+
+    periode_list = []
+    periode = get_awal_periode(tgl_mulai, granularitas)
+    while periode <= tgl_akhir:
+        if len(periode_list) >= MAX_PERIODE_DERET:
+            raise ValueError(f'Rentang terlalu panjang (maksimal {MAX_PERIODE_DERET} periode).')
+        periode_list.append(periode)
+        periode = get_periode_berikutnya(periode, granularitas)
+
+    rekap_list = RekapPendapatanHarian.objects.filter(
+        tanggal__gte=tgl_mulai, tanggal__lte=tgl_akhir
+    ).values_list('tanggal', 'jumlahPesanan', 'pendapatan')
+
+    # Akumulasi per periode dalam dict, lalu susun deret dengan satu kali lookup per periode
+    per_periode = {}
+    for tanggal, jumlah_pesanan, pendapatan in rekap_list:
+        key = get_awal_periode(tanggal, granularitas)
+        jumlah_lama, pendapatan_lama = per_periode.get(key, (0, Decimal('0')))
+        per_periode[key] = (jumlah_lama + jumlah_pesanan, pendapatan_lama + pendapatan)
+
+    kosong = (0, Decimal('0'))
+    return {
+        'granularitas': granularitas,
+        'tgl_mulai': tgl_mulai.isoformat(),
+        'tgl_akhir': tgl_akhir.isoformat(),
+        'periode': [periode.isoformat() for periode in periode_list],
+        'labels': [get_label_periode(periode, granularitas) for periode in periode_list],
+        'jumlah_pesanan_selesai': [per_periode.get(periode, kosong)[0] for periode in periode_list],
+        # Konversi Decimal ke float secara eksplisit agar bisa di-serialisasi JSON
+        'pendapatan': [float(per_periode.get(periode, kosong)[1]) for periode in periode_list],
+    }
+
+
+def get_rentang_default(granularitas, today=None):
+    """Rentang bawaan grafik: 30 hari, 12 minggu, atau 6 bulan terakhir."""
+    if today is None:
+        today = timezone.localdate()
+    if granularitas == 'harian':
+        return today - timedelta(days=29), today
+    if granularitas == 'mingguan':
+        return get_awal_periode(today, 'mingguan') - timedelta(weeks=11), today
+    tgl_mulai = today.replace(day=1)
+    for i in range(5):
+        tgl_mulai = (tgl_mulai - timedelta(days=1)).replace(day=1)
+    return tgl_mulai, today
+
+
+def get_pendapatan_bulanan(now=None, jumlah_bulan=6):
+    """
+    Deret pendapatan per bulan untuk grafik dashboard, dibaca dari RekapPendapatanHarian.
+    Mengembalikan (labels, data) dengan bulan tertua di depan.
+    """
+    if now is None:
+        now = timezone.now()
+    today = timezone.localdate(now)
+
+    tgl_mulai = today.replace(day=1)
+    for i in range(jumlah_bulan - 1):
+        tgl_mulai = (tgl_mulai - timedelta(days=1)).replace(day=1)
+
+    deret = get_deret_waktu(tgl_mulai, today, 'bulanan')
+    return deret['labels'], deret['pendapatan']
+
+
+def get_dashboard_version():
+    cache.add(DASHBOARD_VERSION_KEY, 0, None)
+    return cache.get(DASHBOARD_VERSION_KEY, 0)
+
+
+def bump_dashboard_version():
+    """Tandai context dashboard yang tersimpan sebagai usang (dipanggil dari signals)."""
+    cache.add(DASHBOARD_VERSION_KEY, 0, None)
+    try:
+        cache.incr(DASHBOARD_VERSION_KEY)
+    except ValueError:
+        # Key hilang di antara add() dan incr(), misalnya karena cache di-clear
+        cache.set(DASHBOARD_VERSION_KEY, 1, None)
+
+
+def get_cached_dashboard_context(build_context):
+    """
+    Ambil context dashboard dari cache, atau hitung ulang dengan `build_context()`.
+
+    Entry dianggap segar jika versinya sama dengan versi data terkini dan umurnya
+    belum melewati DASHBOARD_CACHE_TTL. Jika entry usang dan proses lain sedang
+    menghitung ulang, entry usang langsung dikembalikan (stale-while-revalidate)
+    agar tidak semua request admin menghitung dashboard secara bersamaan.
+    """
+    versi = get_dashboard_version()
+    entry = cache.get(DASHBOARD_CACHE_KEY)
+
+    if entry is not None and entry['versi'] == versi and entry['kedaluwarsa'] > time.time():
+        return entry['context']
+
+    locked = cache.add(DASHBOARD_LOCK_KEY, 1, DASHBOARD_LOCK_TIMEOUT)
+    if not locked and entry is not None:
+        return entry['context']
+
+    try:
+        context = build_context()
+        cache.set(DASHBOARD_CACHE_KEY, {
+            'context': context,
+            'versi': versi,
+            'kedaluwarsa': time.time() + DASHBOARD_CACHE_TTL,
+        }, DASHBOARD_STALE_TIMEOUT)
+    finally:
+        if locked:
+            cache.delete(DASHBOARD_LOCK_KEY)
+    return context
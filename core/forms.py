@@ -1,7 +1,9 @@
 from django import forms
 from django.contrib.auth.forms import SetPasswordForm
 from django.contrib.auth.hashers import make_password
-from .models import Pelanggan, Pemesanan, Sopir
+from django.db import transaction
+from .models import Pelanggan, Pemesanan, Produk, Sopir, StokMasuk
+from .pesanan import batalkan_pesanan
 
 class SopirEditPengirimanForm(forms.ModelForm):
     class Meta:
@@ -19,6 +21,44 @@ class SopirEditPengirimanForm(forms.ModelForm):
             ('Selesai', 'Selesai'),
             ('Dibatalkan', 'Dibatalkan')
         ]
+    
+    def save(self, commit=True):
+        if not commit or self.cleaned_data.get('status') != 'Dibatalkan':
+            return super().save(commit)
+        
+        # Pembatalan lewat jalur yang sama dengan admin agar stok ikut dikembalikan
+        pesanan = super().save(commit=False)
+        pesanan.status = self.initial['status']
+        with transaction.atomic():
+            pesanan.save()
+            batalkan_pesanan(Pemesanan.objects.filter(pk=pesanan.pk))
+        pesanan.status = 'Dibatalkan'
+        pesanan.tandai_tersimpan()
+        return pesanan
+
+class KirimPesananForm(forms.Form):
+    """Pilihan sopir untuk aksi admin "Kirim pesanan terpilih"."""
+    idSopir = forms.ModelChoiceField(queryset=Sopir.objects.order_by('nama'), label='Sopir Pengirim')
+
+class ImporStokMasukForm(forms.Form):
+    file = forms.FileField(label='File CSV/TSV', help_text='Kolom: produk (ID atau nama), jumlah, keterangan (opsional).')
+
+class StokMasukAdminForm(forms.ModelForm):
+    """Form ubah StokMasuk di admin: jumlah tidak boleh diturunkan melebihi stok yang belum terjual."""
+    class Meta:
+        model = StokMasuk
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        jumlah = cleaned_data.get('jumlah')
+        if self.instance.pk and jumlah is not None and jumlah < self.instance.jumlah:
+            # StokMasuk.save() juga memeriksa ini dengan UPDATE bersyarat; di sini agar pesannya tampil di form
+            produk = Produk.objects.only('namaProduk', 'stok').get(pk=self.instance.idProduk_id)
+            if produk.stok < self.instance.jumlah - jumlah:
+                self.add_error('jumlah', f'Stok {produk.namaProduk} tinggal {produk.stok}, jumlah stok masuk '
+                                         f'paling sedikit {self.instance.jumlah - produk.stok}.')
+        return cleaned_data
 
 class PelangganRegisterForm(forms.ModelForm):
     password = forms.CharField(widget=forms.PasswordInput(attrs={
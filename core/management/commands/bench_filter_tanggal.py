@@ -0,0 +1,84 @@
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import Pelanggan, Pemesanan
+from core.reports import get_rentang_waktu
+
+
+class Command(BaseCommand):
+    help = (
+        'Bandingkan filter tanggal __date (cast per baris) dengan rentang datetime '
+        'setengah-terbuka pada database yang diisi data uji. Data uji di-rollback.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jumlah', type=int, default=50000, help='Jumlah Pemesanan uji yang dibuat')
+        parser.add_argument('--ulang', type=int, default=20, help='Berapa kali setiap query dijalankan')
+        parser.add_argument('--hari', type=int, default=30, help='Panjang rentang tanggal yang difilter')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.seed(options['jumlah'])
+
+            tgl_akhir = timezone.localdate()
+            tgl_mulai = tgl_akhir - timedelta(days=options['hari'] - 1)
+            awal, akhir = get_rentang_waktu(tgl_mulai, tgl_akhir)
+
+            queries = [
+                ('__date (cast per baris)', Pemesanan.objects.filter(
+                    status='Selesai',
+                    tanggalPemesanan__date__gte=tgl_mulai,
+                    tanggalPemesanan__date__lte=tgl_akhir,
+                )),
+                ('rentang datetime [awal, akhir)', Pemesanan.objects.filter(
+                    status='Selesai',
+                    tanggalPemesanan__gte=awal,
+                    tanggalPemesanan__lt=akhir,
+                )),
+            ]
+
+            hasil = {}
+            for label, queryset in queries:
+                jumlah, durasi = self.ukur(queryset, options['ulang'])
+                hasil[label] = jumlah
+                self.stdout.write(f'{label}: {jumlah} baris, rata-rata {durasi * 1000:.2f} ms per query')
+                self.stdout.write(f'  {queryset.explain()}')
+
+            if len(set(hasil.values())) != 1:
+                self.stdout.write(self.style.WARNING(f'Jumlah baris berbeda: {hasil}'))
+
+            # Jangan tinggalkan data uji di database
+            transaction.set_rollback(True)
+
+    def seed(self, jumlah):
+        pelanggan = Pelanggan(nama='Benchmark', noWa='-', alamat='-', username='__benchmark__',
+                              password='pbkdf2_sha256$benchmark')
+        pelanggan.save()
+
+        now = timezone.now()
+        statuses = [status for status, label in Pemesanan.STATUS_CHOICES]
+        rng = random.Random(0)
+        # bulk_create tidak memanggil save(), sehingga rekap pendapatan tidak ikut berubah
+        Pemesanan.objects.bulk_create([
+            Pemesanan(
+                idPelanggan=pelanggan,
+                alamatPengiriman='-',
+                total=rng.randint(1, 50) * 10000,
+                status=rng.choice(statuses),
+                tanggalPemesanan=now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60)),
+            )
+            for i in range(jumlah)
+        ], batch_size=1000)
+        self.stdout.write(f'{jumlah} Pemesanan uji dibuat.')
+
+    def ukur(self, queryset, ulang):
+        jumlah = queryset.count()
+        mulai = time.perf_counter()
+        for i in range(ulang):
+            queryset.count()
+        return jumlah, (time.perf_counter() - mulai) / ulang
@@ -0,0 +1,38 @@
+import time
+from io import BytesIO
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.reports import LAPORAN, FilterLaporan, build_laporan_pdf
+
+
+class Command(BaseCommand):
+    help = 'Ukur waktu render PDF setiap laporan (rata-rata dan tercepat dari beberapa kali render).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('laporan', nargs='*', help=f'Nama laporan (bawaan: semua). Pilihan: {", ".join(LAPORAN)}')
+        parser.add_argument('--ulang', type=int, default=10, help='Berapa kali setiap laporan dirender')
+
+    def handle(self, *args, **options):
+        nama_list = options['laporan'] or list(LAPORAN)
+        for nama in nama_list:
+            if nama not in LAPORAN:
+                raise CommandError(f'Laporan "{nama}" tidak dikenal.')
+
+        filter_laporan = FilterLaporan()
+        for nama in nama_list:
+            laporan = LAPORAN[nama]
+            # Render pertama memanaskan font, style, dan flowable statis
+            build_laporan_pdf(laporan, filter_laporan, BytesIO())
+
+            durasi_list = []
+            for i in range(options['ulang']):
+                buffer = BytesIO()
+                mulai = time.perf_counter()
+                build_laporan_pdf(laporan, filter_laporan, buffer)
+                durasi_list.append(time.perf_counter() - mulai)
+
+            self.stdout.write(
+                f'{nama:<22} rata-rata {sum(durasi_list) / len(durasi_list) * 1000:8.2f} ms'
+                f'  tercepat {min(durasi_list) * 1000:8.2f} ms  ({len(buffer.getvalue()) // 1024} KB)'
+            )
@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.reports.jobs import LAPORAN_CACHE_TTL, bersihkan_cache_laporan
+
+
+class Command(BaseCommand):
+    help = (
+        'Hapus LaporanJob yang sudah selesai atau gagal beserta PDF/ZIP cache laporan yang tidak dipakai lagi. '
+        'Jalankan berkala dari cron, misalnya setiap jam, agar direktori cache tidak terus membesar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--jam', type=float, default=LAPORAN_CACHE_TTL / timedelta(hours=1),
+                            help='Umur minimum (jam) job dan file sebelum dihapus')
+
+    def handle(self, *args, **options):
+        jumlah_job, jumlah_file = bersihkan_cache_laporan(timedelta(hours=options['jam']))
+        self.stdout.write(self.style.SUCCESS(f'{jumlah_job} job dan {jumlah_file} file cache laporan dihapus.'))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.dashboard import get_rentang_bulan_lalu
+from core.reports import get_laporan_bulanan, prerender_laporan_bulanan
+from core.reports.bulanan import get_rentang_bulan
+
+
+class Command(BaseCommand):
+    help = (
+        'Render PDF dan preview HTML laporan per bulan (Laporan.per_bulan) untuk satu bulan yang '
+        'sudah tutup ke storage (bawaan: bulan lalu). Jalankan dari cron setiap awal bulan, misalnya '
+        '"10 0 1 * * python manage.py prerender_laporan_bulanan". Jalankan ulang dengan --bulan '
+        'untuk merender ulang bulan yang hasilnya terhapus karena datanya dikoreksi.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bulan', help='Bulan yang dirender, format YYYY-MM')
+        parser.add_argument('laporan', nargs='*',
+                            help=f'Nama laporan (bawaan: semua). Pilihan: {", ".join(get_laporan_bulanan())}')
+
+    def handle(self, *args, **options):
+        laporan_bulanan = get_laporan_bulanan()
+        nama_list = options['laporan'] or list(laporan_bulanan)
+        for nama in nama_list:
+            if nama not in laporan_bulanan:
+                raise CommandError(f'Laporan "{nama}" tidak dikenal atau tidak bisa di-prerender per bulan.')
+
+        bulan = options['bulan']
+        if bulan:
+            try:
+                get_rentang_bulan(bulan)
+            except ValueError:
+                raise CommandError(f'Bulan "{bulan}" tidak valid, gunakan format YYYY-MM.')
+        else:
+            bulan = get_rentang_bulan_lalu()[0].strftime('%Y-%m')
+
+        for nama in nama_list:
+            path_pdf, path_html = prerender_laporan_bulanan(laporan_bulanan[nama], bulan)
+            self.stdout.write(f'{nama:<22} {path_pdf}, {path_html}')
+        self.stdout.write(self.style.SUCCESS(f'{len(nama_list)} laporan bulan {bulan} dirender.'))
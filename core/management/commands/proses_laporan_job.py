@@ -0,0 +1,44 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core import worker
+from core.models import LaporanJob
+from core.reports import BUNDEL
+from core.reports.jobs import klaim_job, proses_job
+
+
+class Command(BaseCommand):
+    help = 'Kerjakan antrean LaporanJob: render PDF laporan di process pool di luar request web.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Jumlah proses render')
+        parser.add_argument('--interval', type=float, default=2.0, help='Jeda (detik) saat antrean kosong')
+        parser.add_argument('--sekali', action='store_true', help='Kosongkan antrean sekali lalu berhenti')
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        # Proses pool memakai spawn agar tidak mewarisi koneksi database proses induk
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=worker.init_worker) as pool:
+            while True:
+                id_list = klaim_job(workers)
+                connections.close_all()
+                if not id_list:
+                    if options['sekali']:
+                        break
+                    time.sleep(options['interval'])
+                    continue
+
+                # Job bundel dikerjakan proses ini: semua laporannya dirender bersamaan di pool
+                bundel_list = set(LaporanJob.objects.filter(pk__in=id_list, laporan=BUNDEL.nama).values_list('pk', flat=True))
+                tunggal_list = [id_job for id_job in id_list if id_job not in bundel_list]
+                for id_job, status in zip(tunggal_list, pool.map(worker.proses_job, tunggal_list)):
+                    self.stdout.write(f'Job #{id_job}: {status}')
+                for id_job in sorted(bundel_list):
+                    self.stdout.write(f'Job #{id_job}: {proses_job(id_job, pool)}')
+                connections.close_all()
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from core.dashboard import bump_dashboard_version
+from core.models import RekapPendapatanHarian
+from core.reports.cache import bump_versi_laporan
+
+
+class Command(BaseCommand):
+    help = 'Bangun ulang tabel RekapPendapatanHarian dari seluruh Pemesanan berstatus Selesai'
+
+    def handle(self, *args, **options):
+        jumlah = RekapPendapatanHarian.rebuild()
+        # rebuild() memakai bulk_create tanpa signal; dashboard dan laporan dibaca dari rekap ini
+        bump_dashboard_version()
+        bump_versi_laporan()
+        self.stdout.write(self.style.SUCCESS(f'Rekap pendapatan dibangun ulang: {jumlah} hari.'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.dashboard import bump_dashboard_version
+from core.models import Pelanggan
+from core.reports.cache import bump_versi_laporan
+
+
+class Command(BaseCommand):
+    help = 'Hitung ulang total pembelian, jumlah pesanan, dan pesanan terakhir semua pelanggan dari tabel Pemesanan'
+
+    def handle(self, *args, **options):
+        sebelum = {item[0]: item[1:] for item in Pelanggan.objects.values_list('pk', *Pelanggan.FIELD_STATISTIK)}
+        Pelanggan.hitung_ulang_statistik()
+        # queryset.update() tanpa signal; laporan pelanggan membaca statistik ini
+        bump_dashboard_version()
+        bump_versi_laporan()
+        sesudah = {item[0]: item[1:] for item in Pelanggan.objects.values_list('pk', *Pelanggan.FIELD_STATISTIK)}
+
+        berbeda = [pk for pk, nilai in sesudah.items() if sebelum.get(pk) != nilai]
+        for pk in berbeda:
+            self.stdout.write(self.style.WARNING(f'Pelanggan #{pk}: {sebelum.get(pk)} -> {sesudah[pk]}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Statistik {len(sesudah)} pelanggan dihitung ulang, {len(berbeda)} diperbaiki.'
+        ))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Produk, SnapshotStok
+
+
+class Command(BaseCommand):
+    help = (
+        'Simpan snapshot stok semua produk dari buku besar MutasiStok. Jalankan berkala dari cron, '
+        'misalnya setiap malam, agar stok pada tanggal tertentu cukup dihitung dari snapshot terakhir.'
+    )
+
+    def handle(self, *args, **options):
+        waktu = timezone.now()
+        snapshot_list = SnapshotStok.buat(waktu)
+        self.stdout.write(self.style.SUCCESS(f'Snapshot stok {len(snapshot_list)} produk pada {waktu:%Y-%m-%d %H:%M}.'))
+
+        # Buku besar harus menjumlah ke stok saat ini; selisih berarti ada perubahan stok yang tidak tercatat
+        stok_sekarang = dict(Produk.objects.values_list('pk', 'stok'))
+        for snapshot in snapshot_list:
+            if snapshot.stok != stok_sekarang.get(snapshot.idProduk_id):
+                self.stdout.write(self.style.WARNING(
+                    f'Produk #{snapshot.idProduk_id}: buku besar {snapshot.stok}, stok {stok_sekarang.get(snapshot.idProduk_id)}.'
+                ))
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:07
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def isi_rekap_pendapatan(apps, schema_editor):
+    Pemesanan = apps.get_model('core', 'Pemesanan')
+    RekapPendapatanHarian = apps.get_model('core', 'RekapPendapatanHarian')
+    rekap_per_hari = Pemesanan.objects.filter(status='Selesai').annotate(
+        tgl=TruncDate('tanggalPemesanan')
+    ).values('tgl').annotate(jumlah=Count('pk'), pendapatan=Sum('total')).order_by('tgl')
+    RekapPendapatanHarian.objects.bulk_create([
+        RekapPendapatanHarian(tanggal=item['tgl'], jumlahPesanan=item['jumlah'], pendapatan=item['pendapatan'] or 0)
+        for item in rekap_per_hari
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_alter_pelanggan_alamat_alter_produk_stok'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RekapPendapatanHarian',
+            fields=[
+                ('idRekap', models.AutoField(primary_key=True, serialize=False, verbose_name='ID Rekap')),
+                ('tanggal', models.DateField(unique=True, verbose_name='Tanggal')),
+                ('jumlahPesanan', models.IntegerField(default=0, verbose_name='Jumlah Pesanan Selesai')),
+                ('pendapatan', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Pendapatan')),
+            ],
+            options={
+                'verbose_name': 'Rekap Pendapatan Harian',
+                'verbose_name_plural': 'Rekap Pendapatan Harian',
+                'ordering': ['tanggal'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='pemesanan',
+            name='tanggalPemesanan',
+            field=models.DateTimeField(default=django.utils.timezone.now, verbose_name='Tanggal Pemesanan'),
+        ),
+        migrations.AlterField(
+            model_name='produk',
+            name='hargaPerDus',
+            field=models.PositiveIntegerField(verbose_name='Harga per Dus/Galon'),
+        ),
+        migrations.RunPython(isi_rekap_pendapatan, migrations.RunPython.noop),
+    ]
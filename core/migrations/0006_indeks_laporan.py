@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_rekappendapatanharian'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='feedback',
+            index=models.Index(fields=['tanggal'], name='feedback_tanggal_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pemesanan',
+            index=models.Index(fields=['status', 'tanggalPemesanan'], name='pemesanan_status_tgl_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pemesanan',
+            index=models.Index(fields=['idSopir', 'status'], name='pemesanan_sopir_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stokmasuk',
+            index=models.Index(fields=['tanggal'], name='stokmasuk_tanggal_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:19
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_indeks_laporan'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LaporanJob',
+            fields=[
+                ('idJob', models.AutoField(primary_key=True, serialize=False, verbose_name='ID Job')),
+                ('laporan', models.CharField(max_length=30, verbose_name='Laporan')),
+                ('parameter', models.JSONField(blank=True, default=dict, verbose_name='Parameter Filter')),
+                ('status', models.CharField(choices=[('Menunggu', 'Menunggu'), ('Diproses', 'Diproses'), ('Selesai', 'Selesai'), ('Gagal', 'Gagal')], default='Menunggu', max_length=10, verbose_name='Status Job')),
+                ('file', models.FileField(blank=True, null=True, upload_to='laporan_job/', verbose_name='File PDF')),
+                ('pesanError', models.TextField(blank=True, verbose_name='Pesan Error')),
+                ('tanggalDibuat', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Tanggal Dibuat')),
+                ('tanggalMulai', models.DateTimeField(blank=True, null=True, verbose_name='Tanggal Mulai')),
+                ('tanggalSelesai', models.DateTimeField(blank=True, null=True, verbose_name='Tanggal Selesai')),
+                ('dibuatOleh', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL, verbose_name='Dibuat Oleh')),
+            ],
+            options={
+                'verbose_name': 'Job Laporan',
+                'verbose_name_plural': 'Job Laporan',
+                'ordering': ['-tanggalDibuat'],
+                'indexes': [models.Index(fields=['status', 'tanggalDibuat'], name='laporanjob_status_tgl_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_laporanjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='laporanjob',
+            name='kunci',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='Kunci Cache'),
+        ),
+        migrations.AddConstraint(
+            model_name='laporanjob',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ['Menunggu', 'Diproses']), models.Q(('kunci', ''), _negated=True)), fields=('kunci',), name='laporanjob_kunci_aktif_unik'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_laporanjob_kunci'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='produk',
+            constraint=models.CheckConstraint(condition=models.Q(('stok__gte', 0)), name='produk_stok_tidak_negatif'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def isi_saldo_awal(apps, schema_editor):
+    # Stok yang ada sebelum buku besar dibuat menjadi mutasi pertama setiap produk
+    Produk = apps.get_model('core', 'Produk')
+    MutasiStok = apps.get_model('core', 'MutasiStok')
+    tanggal = timezone.now()
+    MutasiStok.objects.bulk_create([
+        MutasiStok(idProduk_id=pk, tanggal=tanggal, jenis='Saldo Awal', perubahan=stok)
+        for pk, stok in Produk.objects.filter(stok__gt=0).values_list('pk', 'stok')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_produk_stok_tidak_negatif'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MutasiStok',
+            fields=[
+                ('idMutasi', models.AutoField(primary_key=True, serialize=False, verbose_name='ID Mutasi')),
+                ('tanggal', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Tanggal')),
+                ('jenis', models.CharField(choices=[('Saldo Awal', 'Saldo Awal'), ('Stok Masuk', 'Stok Masuk'), ('Penjualan', 'Penjualan'), ('Pembatalan', 'Pembatalan'), ('Koreksi', 'Koreksi')], max_length=15, verbose_name='Jenis Mutasi')),
+                ('perubahan', models.IntegerField(verbose_name='Perubahan Stok')),
+                ('keterangan', models.CharField(blank=True, max_length=200, verbose_name='Keterangan')),
+                ('idProduk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.produk', verbose_name='Produk')),
+            ],
+            options={
+                'verbose_name': 'Mutasi Stok',
+                'verbose_name_plural': 'Mutasi Stok',
+                'ordering': ['tanggal', 'idMutasi'],
+                'indexes': [models.Index(fields=['idProduk', 'tanggal'], name='mutasistok_produk_tgl_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='SnapshotStok',
+            fields=[
+                ('idSnapshot', models.AutoField(primary_key=True, serialize=False, verbose_name='ID Snapshot')),
+                ('waktu', models.DateTimeField(verbose_name='Waktu')),
+                ('stok', models.IntegerField(verbose_name='Stok')),
+                ('idProduk', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.produk', verbose_name='Produk')),
+            ],
+            options={
+                'verbose_name': 'Snapshot Stok',
+                'verbose_name_plural': 'Snapshot Stok',
+                'ordering': ['-waktu'],
+                'constraints': [models.UniqueConstraint(fields=('idProduk', 'waktu'), name='snapshotstok_produk_waktu_unik')],
+            },
+        ),
+        migrations.RunPython(isi_saldo_awal, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:41
+
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def isi_statistik_pelanggan(apps, schema_editor):
+    Pelanggan = apps.get_model('core', 'Pelanggan')
+    Pemesanan = apps.get_model('core', 'Pemesanan')
+    pesanan = Pemesanan.objects.filter(idPelanggan=OuterRef('pk')).exclude(status='Dibatalkan').order_by()
+    Pelanggan.objects.update(
+        totalPembelian=Coalesce(
+            Subquery(pesanan.values('idPelanggan').annotate(total=Sum('total')).values('total')[:1]),
+            Value(Decimal('0')), output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        ),
+        jumlahPesanan=Coalesce(Subquery(pesanan.values('idPelanggan').annotate(jumlah=Count('pk')).values('jumlah')[:1]), 0),
+        pesananTerakhir=Subquery(pesanan.order_by('-tanggalPemesanan').values('tanggalPemesanan')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_mutasistok'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pelanggan',
+            name='jumlahPesanan',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Jumlah Pesanan'),
+        ),
+        migrations.AddField(
+            model_name='pelanggan',
+            name='pesananTerakhir',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Pesanan Terakhir'),
+        ),
+        migrations.AddField(
+            model_name='pelanggan',
+            name='totalPembelian',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='Total Pembelian'),
+        ),
+        migrations.RunPython(isi_statistik_pelanggan, migrations.RunPython.noop),
+    ]
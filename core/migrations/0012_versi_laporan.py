@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-17 00:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_statistik_pelanggan'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersiLaporan',
+            fields=[
+                ('idVersi', models.PositiveSmallIntegerField(default=1, primary_key=True, serialize=False, verbose_name='ID Versi')),
+                ('versi', models.PositiveBigIntegerField(default=0, verbose_name='Versi Data')),
+            ],
+            options={
+                'verbose_name': 'Versi Laporan',
+                'verbose_name_plural': 'Versi Laporan',
+            },
+        ),
+    ]
@@ -1,8 +1,12 @@
-from django.db import models
-from django.db.models import F, Sum
+from django.db import models, transaction
+from django.db.models import F, Q, Sum, Count, Case, When, Value, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.functions import TruncDate
 from django.core.exceptions import ValidationError
 from django.contrib.auth.hashers import make_password, check_password 
+from django.contrib.auth.models import User
 from django.utils import timezone
+from decimal import Decimal
 
 class Pelanggan(models.Model):
     idPelanggan = models.AutoField(primary_key=True, verbose_name='ID Pelanggan')
@@ -11,12 +15,68 @@ class Pelanggan(models.Model):
     alamat = models.CharField(max_length=200, verbose_name='Alamat Tempat Tinggal')
     username = models.CharField(max_length=20, unique=True, verbose_name='Username')
     password = models.CharField(max_length=150, verbose_name='Password (Hash)')
+    # Statistik pesanan yang tidak dibatalkan, diperbarui setiap kali Pemesanan berubah.
+    # Hitung ulang dengan `python manage.py rekonsiliasi_pelanggan`.
+    totalPembelian = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False, verbose_name='Total Pembelian')
+    jumlahPesanan = models.PositiveIntegerField(default=0, editable=False, verbose_name='Jumlah Pesanan')
+    pesananTerakhir = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='Pesanan Terakhir')
+    
+    FIELD_STATISTIK = ('totalPembelian', 'jumlahPesanan', 'pesananTerakhir')
 
     def save(self, *args, **kwargs):
         # PERBAIKAN KRITIS: HASH HANYA JIKA BUKAN HASH (Misal, panjangnya kurang dari hash pbkdf2)
         if len(self.password) < 60 or not self.password.startswith('pbkdf2_sha256'):
             self.password = make_password(self.password)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Statistik diperbarui lewat UPDATE F(); nilai lama di instance ini tidak boleh menimpanya
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.FIELD_STATISTIK
+            ]
         super().save(*args, **kwargs)
+    
+    @staticmethod
+    def get_subquery_statistik():
+        """Subquery statistik pesanan per pelanggan langsung dari tabel Pemesanan."""
+        pesanan = Pemesanan.objects.filter(idPelanggan=OuterRef('pk')).exclude(status='Dibatalkan').order_by()
+        return {
+            'totalPembelian': Coalesce(
+                Subquery(pesanan.values('idPelanggan').annotate(total=Sum('total')).values('total')[:1]),
+                Value(Decimal('0')), output_field=models.DecimalField(max_digits=14, decimal_places=2),
+            ),
+            'jumlahPesanan': Coalesce(
+                Subquery(pesanan.values('idPelanggan').annotate(jumlah=Count('pk')).values('jumlah')[:1]), 0,
+            ),
+            'pesananTerakhir': Subquery(pesanan.order_by('-tanggalPemesanan').values('tanggalPemesanan')[:1]),
+        }
+    
+    @classmethod
+    def catat_pesanan(cls, perubahan_per_pelanggan):
+        """
+        Tambahkan selisih {idPelanggan: (jumlah pesanan, total)} ke statistik beberapa
+        pelanggan dengan satu UPDATE ... CASE. Pesanan terakhir dibaca ulang dengan
+        subquery karena tidak bisa dikurangi secara inkremental.
+        """
+        if not perubahan_per_pelanggan:
+            return 0
+        jumlah = Case(
+            *[When(pk=pk, then=Value(n)) for pk, (n, total) in perubahan_per_pelanggan.items()],
+            output_field=IntegerField(),
+        )
+        total = Case(
+            *[When(pk=pk, then=Value(total)) for pk, (n, total) in perubahan_per_pelanggan.items()],
+            output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        )
+        return cls.objects.filter(pk__in=perubahan_per_pelanggan).update(
+            jumlahPesanan=F('jumlahPesanan') + jumlah,
+            totalPembelian=F('totalPembelian') + total,
+            pesananTerakhir=cls.get_subquery_statistik()['pesananTerakhir'],
+        )
+    
+    @classmethod
+    def hitung_ulang_statistik(cls):
+        """Hitung ulang statistik semua pelanggan dari tabel Pemesanan dalam satu UPDATE."""
+        return cls.objects.update(**cls.get_subquery_statistik())
 
     def check_password(self, raw_password):
         return check_password(raw_password, self.password)
@@ -76,12 +136,71 @@ class Produk(models.Model):
     deskripsi = models.CharField(max_length=200, blank=True, verbose_name='Deskripsi')
     foto = models.ImageField(upload_to='foto_produk/', null=True, blank=True, verbose_name='Foto Produk')
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__original_stok = self.__dict__.get('stok') if self.pk else 0
+    
+    def save(self, *args, **kwargs):
+        is_new = self._state.adding
+        stok = self.__dict__.get('stok')
+        ubah_stok = stok is not None and (is_new or stok != self.__original_stok)
+        if kwargs.get('update_fields') is not None and 'stok' not in kwargs['update_fields']:
+            ubah_stok = False
+        if not is_new and not ubah_stok and kwargs.get('update_fields') is None:
+            # Stok diubah lewat UPDATE F() di tempat lain; menyimpan nilai stok lama
+            # dari instance ini akan menimpa perubahan itu tanpa tercatat di MutasiStok
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'stok'
+            ]
+        with transaction.atomic():
+            # Selisih koreksi dihitung dari stok tersimpan, bukan dari nilai saat instance dimuat
+            stok_lama = 0 if is_new or not ubah_stok else (
+                Produk.objects.filter(pk=self.pk).values_list('stok', flat=True).first() or 0
+            )
+            super().save(*args, **kwargs)
+            if ubah_stok and stok != stok_lama:
+                MutasiStok.catat({self.pk: stok - stok_lama}, 'Saldo Awal' if is_new else 'Koreksi')
+        self.__original_stok = stok
+    
+    @classmethod
+    def kurangi_stok(cls, jumlah_per_produk):
+        """
+        Kurangi stok beberapa produk ({idProduk: jumlah}) dengan satu UPDATE bersyarat
+        `stok >= jumlah`. Mengembalikan False jika ada produk yang stoknya tidak mencukupi;
+        produk lain mungkin sudah terpotong, jadi panggil di dalam transaction.atomic
+        dan batalkan transaksinya.
+        """
+        if not jumlah_per_produk:
+            return True
+        jumlah = Case(
+            *[When(pk=pk, then=Value(n)) for pk, n in jumlah_per_produk.items()],
+            output_field=IntegerField(),
+        )
+        diperbarui = cls.objects.filter(pk__in=jumlah_per_produk, stok__gte=jumlah).update(stok=F('stok') - jumlah)
+        return diperbarui == len(jumlah_per_produk)
+    
+    @classmethod
+    def tambah_stok(cls, jumlah_per_produk):
+        """Tambah stok beberapa produk ({idProduk: jumlah}) dengan satu UPDATE ... CASE."""
+        if not jumlah_per_produk:
+            return 0
+        jumlah = Case(
+            *[When(pk=pk, then=Value(n)) for pk, n in jumlah_per_produk.items()],
+            output_field=IntegerField(),
+        )
+        return cls.objects.filter(pk__in=jumlah_per_produk).update(stok=F('stok') + jumlah)
+    
     def __str__(self):
         return f'{self.namaProduk} - ({self.stok})'
     
     class Meta:
         verbose_name = 'Produk'
         verbose_name_plural = 'Produk'
+        constraints = [
+            # Jaring pengaman terakhir: pengurangan stok yang lolos dari UPDATE bersyarat tetap ditolak database
+            models.CheckConstraint(condition=models.Q(stok__gte=0), name='produk_stok_tidak_negatif'),
+        ]
 
 class StokMasuk(models.Model):
     idStok = models.AutoField(primary_key=True, verbose_name='ID Stok Masuk')
@@ -96,20 +215,29 @@ class StokMasuk(models.Model):
     
     def save(self, *args, **kwargs):
         is_new = self._state.adding
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
-        if is_new:
-            Produk.objects.filter(idProduk=self.idProduk_id).update(stok=F('stok') + self.jumlah)
-        else:
             perbedaan_jumlah = self.jumlah - self.__original_jumlah
-            if perbedaan_jumlah != 0:
+            if perbedaan_jumlah > 0:
                 Produk.objects.filter(idProduk=self.idProduk_id).update(stok=F('stok') + perbedaan_jumlah)
+            elif perbedaan_jumlah < 0:
+                self._kurangi_stok(-perbedaan_jumlah)
+            if perbedaan_jumlah:
+                MutasiStok.catat({self.idProduk_id: perbedaan_jumlah}, 'Stok Masuk', f'Stok masuk #{self.pk}')
         
         self.__original_jumlah = self.jumlah
 
+    def _kurangi_stok(self, jumlah):
+        # Stok yang sudah terjual tidak bisa ditarik kembali dari stok masuk
+        if not Produk.kurangi_stok({self.idProduk_id: jumlah}):
+            raise ValidationError(f'Stok {self.idProduk.namaProduk} tidak mencukupi untuk mengurangi stok masuk ini.')
+
     def delete(self, *args, **kwargs):
-        Produk.objects.filter(idProduk=self.idProduk_id).update(stok=F('stok') - self.jumlah)
-        super().delete(*args, **kwargs)
+        with transaction.atomic():
+            self._kurangi_stok(self.jumlah)
+            MutasiStok.catat({self.idProduk_id: -self.jumlah}, 'Stok Masuk', f'Stok masuk #{self.pk} dihapus')
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return f'{self.tanggal} - {self.idProduk.namaProduk}'
@@ -117,7 +245,20 @@ class StokMasuk(models.Model):
     class Meta:
         verbose_name = 'Stok Masuk'
         verbose_name_plural = 'Stok Masuk'
+        indexes = [
+            models.Index(fields=['tanggal'], name='stokmasuk_tanggal_idx'),
+        ]
     
+def get_perubahan_statistik(lama, baru):
+    """Selisih {idPelanggan: (jumlah, total)} dari dua kontribusi Pemesanan.get_kontribusi_statistik()."""
+    perubahan = {}
+    for kontribusi, tanda in [(lama, -1), (baru, 1)]:
+        if kontribusi is not None:
+            id_pelanggan, total, tanggal = kontribusi
+            jumlah_lama, total_lama = perubahan.get(id_pelanggan, (0, Decimal('0')))
+            perubahan[id_pelanggan] = (jumlah_lama + tanda, total_lama + tanda * total)
+    return perubahan
+
 class Pemesanan(models.Model):
     STATUS_CHOICES = [
         ('Diproses', 'Diproses'),
@@ -136,6 +277,130 @@ class Pemesanan(models.Model):
     fotoPengiriman = models.ImageField(upload_to='bukti_pengiriman/', null=True, blank=True, verbose_name='Foto Pengiriman')
     idSopir = models.ForeignKey(Sopir, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Sopir Pengirim') 
     
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__original_rekap = self.get_kontribusi_rekap() if self.pk else None
+        self.__original_statistik = self.get_kontribusi_statistik() if self.pk else None
+        self.__original_tanggal = self.__dict__.get('tanggalPemesanan') if self.pk else None
+    
+    def get_kontribusi_rekap(self):
+        """
+        Kontribusi pesanan ini ke RekapPendapatanHarian sebagai (tanggal, total),
+        atau None jika pesanan belum/tidak berstatus 'Selesai'.
+        """
+        # Baca langsung dari __dict__ agar field yang di-defer tidak memicu query
+        fields = self.__dict__
+        if fields.get('status') != 'Selesai' or fields.get('tanggalPemesanan') is None:
+            return None
+        return (timezone.localdate(fields['tanggalPemesanan']), Decimal(str(fields.get('total') or 0)))
+    
+    def get_kontribusi_statistik(self):
+        """
+        Kontribusi pesanan ini ke statistik Pelanggan sebagai (idPelanggan, total,
+        tanggal), atau None jika pesanan dibatalkan.
+        """
+        fields = self.__dict__
+        if fields.get('status') == 'Dibatalkan' or fields.get('idPelanggan_id') is None:
+            return None
+        return (fields['idPelanggan_id'], Decimal(str(fields.get('total') or 0)), fields.get('tanggalPemesanan'))
+    
+    def tandai_tersimpan(self):
+        """Samakan kontribusi rekap tersimpan dengan instance ini setelah diubah lewat queryset.update()."""
+        self.__original_rekap = self.get_kontribusi_rekap()
+        self.__original_statistik = self.get_kontribusi_statistik()
+        self.__original_tanggal = self.__dict__.get('tanggalPemesanan')
+    
+    def get_tanggal_terdampak(self):
+        """Tanggal pesanan yang tersimpan dan yang sekarang; laporan bulan keduanya ikut berubah."""
+        return {tanggal for tanggal in (self.__original_tanggal, self.__dict__.get('tanggalPemesanan')) if tanggal}
+    
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            
+            kontribusi = self.get_kontribusi_rekap()
+            if kontribusi != self.__original_rekap:
+                if self.__original_rekap is not None:
+                    tanggal, total = self.__original_rekap
+                    RekapPendapatanHarian.catat(tanggal, -1, -total)
+                if kontribusi is not None:
+                    tanggal, total = kontribusi
+                    RekapPendapatanHarian.catat(tanggal, 1, total)
+            
+            statistik = self.get_kontribusi_statistik()
+            if statistik != self.__original_statistik:
+                Pelanggan.catat_pesanan(get_perubahan_statistik(self.__original_statistik, statistik))
+        
+        self.__original_rekap = kontribusi
+        self.__original_statistik = statistik
+        self.__original_tanggal = self.__dict__.get('tanggalPemesanan')
+    
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            if self.__original_rekap is not None:
+                tanggal, total = self.__original_rekap
+                RekapPendapatanHarian.catat(tanggal, -1, -total)
+            result = super().delete(*args, **kwargs)
+            if self.__original_statistik is not None:
+                Pelanggan.catat_pesanan(get_perubahan_statistik(self.__original_statistik, None))
+        
+        self.__original_rekap = None
+        self.__original_statistik = None
+        self.__original_tanggal = None
+        return result
+    
+    def add_lines(self, items, produk_map=None):
+        """
+        Tambahkan banyak DetailPemesanan sekaligus dari `items` berisi (idProduk, jumlah).
+        Harga diambil dengan satu in_bulk, baris dibuat dengan bulk_create, stok semua
+        produk dikurangi dalam satu UPDATE bersyarat, dan total ditulis sekali, sehingga
+        jumlah query tidak bertambah dengan jumlah baris. Stok yang tidak mencukupi
+        membatalkan seluruh penambahan dengan ValidationError.
+        
+        `produk_map` ({idProduk: Produk}) boleh diberikan jika pemanggil sudah mengambil
+        produknya dengan in_bulk, agar produk tidak dibaca dua kali.
+        """
+        jumlah_per_produk = {}
+        for id_produk, jumlah in items:
+            if jumlah <= 0:
+                raise ValidationError('Jumlah pesanan harus lebih dari 0.')
+            jumlah_per_produk[id_produk] = jumlah_per_produk.get(id_produk, 0) + jumlah
+        if not jumlah_per_produk:
+            return []
+        
+        with transaction.atomic():
+            if produk_map is None:
+                produk_map = Produk.objects.in_bulk(list(jumlah_per_produk))
+            tidak_ada = [str(pk) for pk in jumlah_per_produk if pk not in produk_map]
+            if tidak_ada:
+                raise ValidationError(f'Produk {", ".join(tidak_ada)} tidak ditemukan.')
+            
+            # Pesanan yang sudah dibatalkan tidak memotong stok (sama seperti DetailPemesanan.save)
+            if self.status != 'Dibatalkan' and not Produk.kurangi_stok(jumlah_per_produk):
+                kurang = [
+                    f'{produk_map[pk].namaProduk} ({produk_map[pk].stok})'
+                    for pk, jumlah in jumlah_per_produk.items() if produk_map[pk].stok < jumlah
+                ]
+                raise ValidationError(f'Stok {", ".join(kurang) or "produk"} tidak mencukupi.')
+            if self.status != 'Dibatalkan':
+                MutasiStok.catat({pk: -jumlah for pk, jumlah in jumlah_per_produk.items()}, 'Penjualan',
+                                 f'Pemesanan #{self.pk}')
+            
+            detail_list = DetailPemesanan.objects.bulk_create([
+                DetailPemesanan(
+                    idPemesanan=self,
+                    idProduk=produk_map[pk],
+                    jumlah=jumlah,
+                    subTotal=produk_map[pk].hargaPerDus * jumlah,
+                )
+                for pk, jumlah in jumlah_per_produk.items()
+            ])
+            for detail in detail_list:
+                detail.tandai_tersimpan()
+            self.total = Decimal(str(self.total or 0)) + sum(detail.subTotal for detail in detail_list)
+            self.save(update_fields=['total'])
+        return detail_list
+    
     def update_total(self):
         total_subtotal = self.detailpemesanan_set.aggregate(Sum('subTotal'))['subTotal__sum']
         self.total = total_subtotal if total_subtotal is not None else 0.00
@@ -147,6 +412,12 @@ class Pemesanan(models.Model):
     class Meta:
         verbose_name = 'Pemesanan'
         verbose_name_plural = 'Pemesanan'
+        indexes = [
+            # Laporan & dashboard: filter status + rentang tanggal
+            models.Index(fields=['status', 'tanggalPemesanan'], name='pemesanan_status_tgl_idx'),
+            # Laporan sopir: jumlah pesanan per sopir per status
+            models.Index(fields=['idSopir', 'status'], name='pemesanan_sopir_status_idx'),
+        ]
 
 class DetailPemesanan(models.Model):
     idDetail = models.AutoField(primary_key=True, verbose_name='ID Detail')
@@ -160,32 +431,42 @@ class DetailPemesanan(models.Model):
         self.__original_jumlah = self.jumlah if self.pk else 0
     
     def save(self, *args, **kwargs):
-        is_new = self._state.adding
-        
         harga_produk = self.idProduk.hargaPerDus
         self.subTotal = harga_produk * self.jumlah
         
-        super().save(*args, **kwargs)
-        
-        if self.idPemesanan.status != 'Dibatalkan':
-            perbedaan_jumlah = self.jumlah - self.__original_jumlah
+        with transaction.atomic():
+            super().save(*args, **kwargs)
             
-            if perbedaan_jumlah != 0:
-                if self.idProduk.stok < perbedaan_jumlah:
-                    raise ValidationError(f'Stok {self.idProduk.namaProduk} tidak mencukupi ({self.idProduk.stok}).')
-
-                Produk.objects.filter(idProduk=self.idProduk_id).update(stok=F('stok') - perbedaan_jumlah)
+            if self.idPemesanan.status != 'Dibatalkan':
+                perbedaan_jumlah = self.jumlah - self.__original_jumlah
+                
+                # Stok dipotong dengan UPDATE bersyarat, bukan dicek dari instance Produk yang
+                # mungkin sudah usang: checkout yang berjalan bersamaan tidak bisa oversell
+                if perbedaan_jumlah > 0 and not Produk.kurangi_stok({self.idProduk_id: perbedaan_jumlah}):
+                    stok = Produk.objects.filter(idProduk=self.idProduk_id).values_list('stok', flat=True).first()
+                    raise ValidationError(f'Stok {self.idProduk.namaProduk} tidak mencukupi ({stok}).')
+                if perbedaan_jumlah < 0:
+                    Produk.objects.filter(idProduk=self.idProduk_id).update(stok=F('stok') - perbedaan_jumlah)
+                if perbedaan_jumlah:
+                    MutasiStok.catat({self.idProduk_id: -perbedaan_jumlah}, 'Penjualan', f'Pemesanan #{self.idPemesanan_id}')
             
+            self.idPemesanan.update_total()
+        
+        if self.idPemesanan.status != 'Dibatalkan':
             self.__original_jumlah = self.jumlah
-            
-        self.idPemesanan.update_total()
+
+    def tandai_tersimpan(self):
+        """Catat jumlah saat ini sebagai jumlah tersimpan setelah bulk_create, agar save() berikutnya hanya memotong selisihnya."""
+        self.__original_jumlah = self.jumlah
 
     def delete(self, *args, **kwargs):
-        if self.idPemesanan.status != 'Dibatalkan':
-            Produk.objects.filter(idProduk=self.idProduk_id).update(stok=F('stok') + self.jumlah)
-            
-        super().delete(*args, **kwargs)
-        self.idPemesanan.update_total()
+        with transaction.atomic():
+            if self.idPemesanan.status != 'Dibatalkan':
+                Produk.objects.filter(idProduk=self.idProduk_id).update(stok=F('stok') + self.jumlah)
+                MutasiStok.catat({self.idProduk_id: self.jumlah}, 'Penjualan', f'Pemesanan #{self.idPemesanan_id} (baris dihapus)')
+                
+            super().delete(*args, **kwargs)
+            self.idPemesanan.update_total()
     
     def __str__(self):
         return f'Detail {self.idDetail}'
@@ -205,4 +486,228 @@ class Feedback(models.Model):
     
     class Meta:
         verbose_name = 'Feedback'
-        verbose_name_plural = 'Feedback'
\ No newline at end of file
+        verbose_name_plural = 'Feedback'
+        indexes = [
+            models.Index(fields=['tanggal'], name='feedback_tanggal_idx'),
+        ]
+
+class RekapPendapatanHarian(models.Model):
+    """
+    Rekap harian pesanan 'Selesai', diperbarui setiap kali sebuah Pemesanan
+    masuk atau keluar dari status 'Selesai'. Bangun ulang dengan
+    `python manage.py rebuild_rekap_pendapatan`.
+    """
+    idRekap = models.AutoField(primary_key=True, verbose_name='ID Rekap')
+    tanggal = models.DateField(unique=True, verbose_name='Tanggal')
+    jumlahPesanan = models.IntegerField(default=0, verbose_name='Jumlah Pesanan Selesai')
+    pendapatan = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name='Pendapatan')
+    
+    @classmethod
+    def catat(cls, tanggal, jumlah_pesanan, pendapatan):
+        """Tambahkan selisih jumlah pesanan dan pendapatan ke rekap tanggal tertentu."""
+        rekap, created = cls.objects.get_or_create(
+            tanggal=tanggal,
+            defaults={'jumlahPesanan': jumlah_pesanan, 'pendapatan': pendapatan},
+        )
+        if not created:
+            cls.objects.filter(pk=rekap.pk).update(
+                jumlahPesanan=F('jumlahPesanan') + jumlah_pesanan,
+                pendapatan=F('pendapatan') + pendapatan,
+            )
+    
+    @classmethod
+    def total_pendapatan(cls, tgl_mulai=None, tgl_akhir=None):
+        """Total pendapatan 'Selesai' dalam rentang tanggal (inklusif)."""
+        rekap_list = cls.objects.all()
+        if tgl_mulai:
+            rekap_list = rekap_list.filter(tanggal__gte=tgl_mulai)
+        if tgl_akhir:
+            rekap_list = rekap_list.filter(tanggal__lte=tgl_akhir)
+        return rekap_list.aggregate(total=Sum('pendapatan'))['total'] or Decimal('0')
+    
+    @classmethod
+    def rebuild(cls):
+        """Hitung ulang seluruh rekap dari tabel Pemesanan (untuk backfill)."""
+        rekap_per_hari = Pemesanan.objects.filter(status='Selesai').annotate(
+            tgl=TruncDate('tanggalPemesanan')
+        ).values('tgl').annotate(
+            jumlah=Count('pk'),
+            pendapatan=Sum('total'),
+        ).order_by('tgl')
+        
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create([
+                cls(tanggal=item['tgl'], jumlahPesanan=item['jumlah'], pendapatan=item['pendapatan'] or 0)
+                for item in rekap_per_hari
+            ])
+        return cls.objects.count()
+    
+    def __str__(self):
+        return f'{self.tanggal} - {self.jumlahPesanan} pesanan'
+    
+    class Meta:
+        verbose_name = 'Rekap Pendapatan Harian'
+        verbose_name_plural = 'Rekap Pendapatan Harian'
+        ordering = ['tanggal']
+
+
+class MutasiStok(models.Model):
+    """
+    Buku besar stok yang hanya ditambah: setiap perubahan Produk.stok dicatat di sini
+    dengan tanda (+ masuk, - keluar). Jumlah seluruh mutasi sebuah produk sama dengan
+    stoknya; SnapshotStok menyimpan hasil penjumlahan itu secara berkala agar stok
+    pada tanggal tertentu tidak perlu menjumlah ulang seluruh riwayat.
+    """
+    JENIS_CHOICES = [
+        ('Saldo Awal', 'Saldo Awal'),
+        ('Stok Masuk', 'Stok Masuk'),
+        ('Penjualan', 'Penjualan'),
+        ('Pembatalan', 'Pembatalan'),
+        ('Koreksi', 'Koreksi'),
+    ]
+    
+    idMutasi = models.AutoField(primary_key=True, verbose_name='ID Mutasi')
+    idProduk = models.ForeignKey(Produk, on_delete=models.CASCADE, verbose_name='Produk')
+    tanggal = models.DateTimeField(default=timezone.now, verbose_name='Tanggal')
+    jenis = models.CharField(max_length=15, choices=JENIS_CHOICES, verbose_name='Jenis Mutasi')
+    perubahan = models.IntegerField(verbose_name='Perubahan Stok')
+    keterangan = models.CharField(max_length=200, blank=True, verbose_name='Keterangan')
+    
+    @classmethod
+    def catat(cls, perubahan_per_produk, jenis, keterangan=''):
+        """Catat perubahan stok {idProduk: perubahan} dalam satu bulk_create."""
+        tanggal = timezone.now()
+        return cls.objects.bulk_create([
+            cls(idProduk_id=pk, tanggal=tanggal, jenis=jenis, perubahan=perubahan, keterangan=keterangan)
+            for pk, perubahan in perubahan_per_produk.items() if perubahan
+        ])
+    
+    def __str__(self):
+        return f'{self.tanggal:%Y-%m-%d %H:%M} - {self.idProduk_id} ({self.perubahan:+d})'
+    
+    class Meta:
+        verbose_name = 'Mutasi Stok'
+        verbose_name_plural = 'Mutasi Stok'
+        ordering = ['tanggal', 'idMutasi']
+        indexes = [
+            # Stok pada tanggal: snapshot terakhir + rentang mutasi sesudahnya per produk
+            models.Index(fields=['idProduk', 'tanggal'], name='mutasistok_produk_tgl_idx'),
+        ]
+
+
+class SnapshotStok(models.Model):
+    """
+    Stok sebuah produk pada `waktu`, yaitu jumlah semua MutasiStok sebelum `waktu`.
+    Dibuat berkala oleh `python manage.py snapshot_stok`.
+    """
+    idSnapshot = models.AutoField(primary_key=True, verbose_name='ID Snapshot')
+    idProduk = models.ForeignKey(Produk, on_delete=models.CASCADE, verbose_name='Produk')
+    waktu = models.DateTimeField(verbose_name='Waktu')
+    stok = models.IntegerField(verbose_name='Stok')
+    
+    @classmethod
+    def stok_pada(cls, waktu, produk_list=None):
+        """
+        {idProduk: stok} pada `waktu`, dari snapshot terakhir sebelum `waktu` ditambah
+        mutasi di antara keduanya, dalam satu query.
+        """
+        snapshot = cls.objects.filter(idProduk=OuterRef('pk'), waktu__lte=waktu).order_by('-waktu')
+        produk_qs = Produk.objects.all() if produk_list is None else Produk.objects.filter(pk__in=produk_list)
+        produk_qs = produk_qs.annotate(
+            waktu_snapshot=Subquery(snapshot.values('waktu')[:1]),
+            stok_snapshot=Coalesce(Subquery(snapshot.values('stok')[:1]), 0),
+        ).annotate(
+            mutasi=Coalesce(Sum('mutasistok__perubahan', filter=Q(mutasistok__tanggal__lt=waktu) & (
+                Q(waktu_snapshot__isnull=True) | Q(mutasistok__tanggal__gte=F('waktu_snapshot'))
+            )), 0),
+        )
+        return {
+            item['pk']: item['stok_snapshot'] + item['mutasi']
+            for item in produk_qs.values('pk', 'stok_snapshot', 'mutasi')
+        }
+    
+    @classmethod
+    def buat(cls, waktu=None):
+        """Simpan snapshot semua produk pada `waktu` (bawaan: sekarang)."""
+        if waktu is None:
+            waktu = timezone.now()
+        return cls.objects.bulk_create([
+            cls(idProduk_id=pk, waktu=waktu, stok=stok)
+            for pk, stok in cls.stok_pada(waktu).items()
+        ])
+    
+    def __str__(self):
+        return f'{self.waktu:%Y-%m-%d %H:%M} - {self.idProduk_id} ({self.stok})'
+    
+    class Meta:
+        verbose_name = 'Snapshot Stok'
+        verbose_name_plural = 'Snapshot Stok'
+        ordering = ['-waktu']
+        constraints = [
+            models.UniqueConstraint(fields=['idProduk', 'waktu'], name='snapshotstok_produk_waktu_unik'),
+        ]
+
+
+class LaporanJob(models.Model):
+    """
+    Permintaan render PDF laporan yang dikerjakan di luar request web oleh
+    `python manage.py proses_laporan_job`. Halaman status admin mem-poll job
+    ini sampai file PDF siap diunduh.
+    """
+    STATUS_CHOICES = [
+        ('Menunggu', 'Menunggu'),
+        ('Diproses', 'Diproses'),
+        ('Selesai', 'Selesai'),
+        ('Gagal', 'Gagal'),
+    ]
+    STATUS_AKTIF = ('Menunggu', 'Diproses')
+    
+    idJob = models.AutoField(primary_key=True, verbose_name='ID Job')
+    laporan = models.CharField(max_length=30, verbose_name='Laporan')
+    parameter = models.JSONField(default=dict, blank=True, verbose_name='Parameter Filter')
+    # Hash laporan + filter + versi data; PDF dengan kunci sama isinya identik
+    kunci = models.CharField(max_length=64, blank=True, db_index=True, verbose_name='Kunci Cache')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Menunggu', verbose_name='Status Job')
+    file = models.FileField(upload_to='laporan_job/', null=True, blank=True, verbose_name='File PDF')
+    pesanError = models.TextField(blank=True, verbose_name='Pesan Error')
+    dibuatOleh = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name='Dibuat Oleh')
+    tanggalDibuat = models.DateTimeField(default=timezone.now, verbose_name='Tanggal Dibuat')
+    tanggalMulai = models.DateTimeField(null=True, blank=True, verbose_name='Tanggal Mulai')
+    tanggalSelesai = models.DateTimeField(null=True, blank=True, verbose_name='Tanggal Selesai')
+    
+    def __str__(self):
+        return f'{self.laporan} #{self.idJob} ({self.status})'
+    
+    class Meta:
+        verbose_name = 'Job Laporan'
+        verbose_name_plural = 'Job Laporan'
+        ordering = ['-tanggalDibuat']
+        indexes = [
+            # Worker mengambil job 'Menunggu' terlama
+            models.Index(fields=['status', 'tanggalDibuat'], name='laporanjob_status_tgl_idx'),
+        ]
+        constraints = [
+            # Paling banyak satu job aktif per kunci: permintaan identik berbagi satu render
+            models.UniqueConstraint(
+                fields=['kunci'],
+                condition=models.Q(status__in=['Menunggu', 'Diproses']) & ~models.Q(kunci=''),
+                name='laporanjob_kunci_aktif_unik',
+            ),
+        ]
+
+class VersiLaporan(models.Model):
+    """
+    Cap versi data laporan (satu baris). Disimpan di database, bukan di cache
+    per proses, agar perubahan data dari worker web lain atau management command
+    ikut membuat PDF laporan yang tersimpan usang di semua proses.
+    """
+    idVersi = models.PositiveSmallIntegerField(primary_key=True, default=1, verbose_name='ID Versi')
+    versi = models.PositiveBigIntegerField(default=0, verbose_name='Versi Data')
+    
+    def __str__(self):
+        return f'Versi laporan {self.versi}'
+    
+    class Meta:
+        verbose_name = 'Versi Laporan'
+        verbose_name_plural = 'Versi Laporan'
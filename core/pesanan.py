@@ -0,0 +1,114 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .dashboard import bump_dashboard_version
+from .models import Pelanggan, Pemesanan, DetailPemesanan, Produk, MutasiStok, RekapPendapatanHarian
+from .reports.bulanan import hapus_laporan_bulanan
+from .reports.cache import bump_versi_laporan
+
+
+def catat_keluar_rekap(pesanan_list):
+    """Keluarkan pesanan 'Selesai' dari RekapPendapatanHarian, satu catat() per tanggal."""
+    rekap_per_hari = defaultdict(lambda: [0, Decimal('0')])
+    for pesanan in pesanan_list:
+        if pesanan['status'] == 'Selesai':
+            rekap = rekap_per_hari[timezone.localdate(pesanan['tanggalPemesanan'])]
+            rekap[0] += 1
+            rekap[1] += pesanan['total']
+    for tanggal, (jumlah, total) in rekap_per_hari.items():
+        RekapPendapatanHarian.catat(tanggal, -jumlah, -total)
+
+
+def get_perubahan_statistik_batal(pesanan_list):
+    """Selisih statistik Pelanggan {idPelanggan: (jumlah, total)} jika pesanan-pesanan ini dibatalkan."""
+    perubahan = defaultdict(lambda: (0, Decimal('0')))
+    for pesanan in pesanan_list:
+        jumlah, total = perubahan[pesanan['idPelanggan']]
+        perubahan[pesanan['idPelanggan']] = (jumlah - 1, total - pesanan['total'])
+    return dict(perubahan)
+
+
+def batalkan_pesanan(pesanan_qs):
+    """
+    Batalkan semua pesanan di `pesanan_qs` yang belum dibatalkan dan kembalikan
+    stoknya. Berapapun jumlah pesanan dan barisnya, stok dikembalikan dengan satu
+    UPDATE ... CASE per produk dan status diubah dengan satu queryset.update().
+    Mengembalikan jumlah pesanan yang dibatalkan.
+    """
+    with transaction.atomic():
+        pesanan_list = list(
+            pesanan_qs.exclude(status='Dibatalkan').values('pk', 'idPelanggan', 'status', 'tanggalPemesanan', 'total')
+        )
+        if not pesanan_list:
+            return 0
+        id_list = [pesanan['pk'] for pesanan in pesanan_list]
+
+        # UPDATE bersyarat: pesanan yang dibatalkan bersamaan oleh request lain tidak dikembalikan stoknya dua kali
+        dibatalkan = Pemesanan.objects.filter(pk__in=id_list).exclude(status='Dibatalkan').update(status='Dibatalkan')
+        if dibatalkan != len(id_list):
+            raise ValidationError('Sebagian pesanan berubah selama pembatalan, silakan coba lagi.')
+
+        jumlah_per_produk = dict(
+            DetailPemesanan.objects.filter(idPemesanan__in=id_list)
+            .values('idProduk').annotate(jumlah=Sum('jumlah')).order_by()
+            .values_list('idProduk', 'jumlah')
+        )
+        Produk.tambah_stok(jumlah_per_produk)
+        MutasiStok.catat(jumlah_per_produk, 'Pembatalan',
+                         f'Pemesanan {", ".join(f"#{pk}" for pk in id_list)}'[:200])
+
+        # queryset.update() tidak memanggil save() maupun signal
+        catat_keluar_rekap(pesanan_list)
+        Pelanggan.catat_pesanan(get_perubahan_statistik_batal(pesanan_list))
+        hapus_laporan_bulanan([pesanan['tanggalPemesanan'] for pesanan in pesanan_list])
+        bump_dashboard_version()
+        bump_versi_laporan()
+    return dibatalkan
+
+
+def hapus_pesanan(pesanan_qs):
+    """
+    Hapus semua pesanan di `pesanan_qs` dengan satu queryset.delete(), seperti aksi
+    "hapus" bawaan admin, tetapi tetap mengeluarkan pesanan 'Selesai' dari rekap
+    pendapatan dan memperbarui statistik pelanggan seperti Pemesanan.delete().
+    Mengembalikan jumlah pesanan yang dihapus.
+    """
+    with transaction.atomic():
+        pesanan_list = list(pesanan_qs.values('pk', 'idPelanggan', 'status', 'tanggalPemesanan', 'total'))
+        if not pesanan_list:
+            return 0
+        catat_keluar_rekap(pesanan_list)
+        # Pesanan 'Dibatalkan' sudah tidak dihitung di statistik pelanggan
+        perubahan = get_perubahan_statistik_batal(
+            [pesanan for pesanan in pesanan_list if pesanan['status'] != 'Dibatalkan']
+        )
+        # Signal post_delete tetap dikirim per objek oleh queryset.delete(), jadi cache ikut usang
+        Pemesanan.objects.filter(pk__in=[pesanan['pk'] for pesanan in pesanan_list]).delete()
+        # Pesanan terakhir dibaca ulang setelah penghapusan
+        Pelanggan.catat_pesanan(perubahan)
+    return len(pesanan_list)
+
+
+def kirim_pesanan(pesanan_qs, sopir):
+    """
+    Tugaskan `sopir` ke semua pesanan 'Diproses' di `pesanan_qs` dan ubah statusnya
+    menjadi 'Dikirim' dengan satu queryset.update(). Baris pesanan, stok, dan total
+    tidak disentuh. Pesanan dengan status lain dilewati. Mengembalikan jumlah
+    pesanan yang dikirim.
+    """
+    with transaction.atomic():
+        pesanan_diproses = Pemesanan.objects.filter(pk__in=pesanan_qs.values('pk'), status='Diproses')
+        tanggal_list = list(pesanan_diproses.values_list('tanggalPemesanan', flat=True))
+        dikirim = pesanan_diproses.update(idSopir=sopir, status='Dikirim')
+        if dikirim:
+            hapus_laporan_bulanan(tanggal_list)
+            # 'Diproses' dan 'Dikirim' sama-sama tidak masuk rekap pendapatan,
+            # tapi dashboard dan laporan sopir berubah
+            bump_dashboard_version()
+            bump_versi_laporan()
+    return dikirim
@@ -0,0 +1,15 @@
+from .filters import FilterLaporan, get_rentang_waktu
+from .ekspor import FORMAT_EKSPOR, EKSPOR_CHUNK_SIZE, iter_ekspor
+from .bulanan import (
+    LAPORAN_BULANAN_DIR, get_bulan_tutup, get_filter_bulan, get_laporan_bulanan, get_pdf_bulanan,
+    get_tabel_bulanan, hapus_laporan_bulanan, prerender_laporan_bulanan
+)
+from .bundel import BUNDEL, build_bundel_zip, get_filename_bundel
+from .jobs import LAPORAN_CACHE_TTL, bersihkan_cache_laporan, buat_job, get_laporan_job, klaim_job, proses_job
+from .keyset import KeysetPaginator, KeysetPage, CursorTidakValid, encode_cursor, decode_cursor
+from .kolom import Kolom, format_rupiah, format_tanggal
+from .laporan import (
+    Laporan, LaporanPelanggan, LaporanProduk, LaporanSopirKendaraan,
+    LaporanPemesananPendapatan, LaporanFeedback, LAPORAN, get_laporan
+)
+from .pdf import build_laporan_pdf, build_laporan_pdf_file, render_pdf
@@ -0,0 +1,146 @@
+from datetime import date, datetime, timedelta
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .filters import FilterLaporan
+from .laporan import LAPORAN
+from .pdf import build_laporan_pdf_file
+
+# Direktori (di storage default) untuk laporan bulan yang sudah tutup: laporan_bulanan/2025-01/produk.pdf
+LAPORAN_BULANAN_DIR = 'laporan_bulanan'
+
+
+def get_rentang_bulan(bulan):
+    """(tanggal pertama, tanggal terakhir) dari bulan 'YYYY-MM'."""
+    tahun, nomor_bulan = (int(bagian) for bagian in bulan.split('-'))
+    awal = date(tahun, nomor_bulan, 1)
+    akhir = (awal + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return awal, akhir
+
+
+def get_filter_bulan(bulan):
+    tgl_mulai, tgl_akhir = get_rentang_bulan(bulan)
+    return FilterLaporan(tgl_mulai=tgl_mulai, tgl_akhir=tgl_akhir)
+
+
+def get_bulan_tutup(filter_laporan, today=None):
+    """
+    'YYYY-MM' jika filter tepat satu bulan kalender penuh yang sudah berakhir
+    sebelum `today` tanpa filter lain, selain itu None. Hanya filter seperti ini
+    yang bisa dilayani dari hasil prerender_laporan_bulanan.
+    """
+    tgl_mulai, tgl_akhir = filter_laporan.tgl_mulai, filter_laporan.tgl_akhir
+    if not tgl_mulai or not tgl_akhir or tgl_mulai.day != 1:
+        return None
+    if set(filter_laporan.as_params()) != {'tgl_mulai', 'tgl_akhir'}:
+        return None
+    bulan = tgl_mulai.strftime('%Y-%m')
+    if tgl_akhir != get_rentang_bulan(bulan)[1]:
+        return None
+    if today is None:
+        today = timezone.localdate()
+    if tgl_akhir >= today:
+        return None
+    return bulan
+
+
+def get_laporan_bulanan():
+    """Laporan yang boleh di-prerender per bulan (Laporan.per_bulan)."""
+    return {nama: laporan for nama, laporan in LAPORAN.items() if laporan.per_bulan}
+
+
+def get_path_bulanan(laporan, bulan, ekstensi):
+    return f'{LAPORAN_BULANAN_DIR}/{bulan}/{laporan.nama}.{ekstensi}'
+
+
+def render_tabel_html(laporan, filter_laporan):
+    """Bagian tabel preview HTML berisi seluruh baris laporan, tanpa paginasi."""
+    context = {
+        **filter_laporan.as_context(),
+        **laporan.get_ringkasan(filter_laporan),
+        laporan.context_object_name: list(laporan.get_rows(filter_laporan)),
+    }
+    return render_to_string(laporan.template_tabel, context)
+
+
+def _simpan(path, isi):
+    # Render ulang sebuah bulan menimpa file lama, bukan membuat nama baru di sampingnya
+    if default_storage.exists(path):
+        default_storage.delete(path)
+    return default_storage.save(path, isi)
+
+
+def prerender_laporan_bulanan(laporan, bulan):
+    """
+    Render PDF dan tabel HTML sebuah laporan untuk bulan 'YYYY-MM' ke storage.
+    Perubahan data bulan itu setelah dirender menghapus hasilnya (lihat
+    hapus_laporan_bulanan), sehingga bulan tersebut kembali dihitung langsung
+    sampai dirender ulang.
+    """
+    if not laporan.per_bulan:
+        raise ValueError(f'Laporan "{laporan.nama}" tidak bisa di-prerender per bulan.')
+    filter_laporan = get_filter_bulan(bulan)
+    with build_laporan_pdf_file(laporan, filter_laporan) as pdf:
+        path_pdf = _simpan(get_path_bulanan(laporan, bulan, 'pdf'), File(pdf))
+    html = render_tabel_html(laporan, filter_laporan)
+    path_html = _simpan(get_path_bulanan(laporan, bulan, 'html'), ContentFile(html.encode('utf-8')))
+    return path_pdf, path_html
+
+
+def get_pdf_bulanan(laporan, filter_laporan):
+    """Path PDF hasil prerender untuk filter ini, atau None jika filter bukan bulan tutup atau belum dirender."""
+    bulan = get_bulan_tutup(filter_laporan) if laporan.per_bulan else None
+    if bulan is None:
+        return None
+    path = get_path_bulanan(laporan, bulan, 'pdf')
+    return path if default_storage.exists(path) else None
+
+
+def get_tabel_bulanan(laporan, filter_laporan):
+    """Tabel HTML hasil prerender untuk filter ini, atau None (lihat get_pdf_bulanan)."""
+    bulan = get_bulan_tutup(filter_laporan) if laporan.per_bulan else None
+    if bulan is None:
+        return None
+    path = get_path_bulanan(laporan, bulan, 'html')
+    if not default_storage.exists(path):
+        return None
+    with default_storage.open(path, 'rb') as f:
+        # Isi file adalah hasil render_to_string kita sendiri yang sudah di-escape
+        return mark_safe(f.read().decode('utf-8'))
+
+
+def _hapus_bulan(bulan_list):
+    for bulan in bulan_list:
+        direktori = f'{LAPORAN_BULANAN_DIR}/{bulan}'
+        try:
+            nama_file_list = default_storage.listdir(direktori)[1]
+        except FileNotFoundError:
+            continue
+        for nama_file in nama_file_list:
+            default_storage.delete(f'{direktori}/{nama_file}')
+
+
+def hapus_laporan_bulanan(tanggal_list, today=None):
+    """
+    Hapus hasil prerender bulan tutup yang memuat salah satu `tanggal_list` (date
+    atau datetime), setelah transaksi yang mengubah datanya ter-commit. Bulan itu
+    kembali dihitung langsung dari database sampai dirender ulang.
+    """
+    if today is None:
+        today = timezone.localdate()
+    bulan_ini = today.strftime('%Y-%m')
+    bulan_list = set()
+    for tanggal in tanggal_list:
+        if isinstance(tanggal, datetime):
+            tanggal = timezone.localdate(tanggal)
+        bulan = tanggal.strftime('%Y-%m')
+        if bulan < bulan_ini:
+            bulan_list.add(bulan)
+    if bulan_list:
+        transaction.on_commit(lambda: _hapus_bulan(sorted(bulan_list)))
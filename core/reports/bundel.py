@@ -0,0 +1,59 @@
+import zipfile
+from tempfile import SpooledTemporaryFile
+
+from django.core.files.storage import default_storage
+
+from core import worker
+from .cache import get_kunci_pdf, get_versi_laporan
+from .laporan import LAPORAN
+from .pdf import PDF_SPOOL_MAX_SIZE
+
+
+class LaporanBundel:
+    """
+    Pengganti objek Laporan untuk job ZIP semua laporan, agar bundel memakai antrean
+    LaporanJob yang sama (kunci, single-flight, halaman status) dengan PDF tunggal.
+    """
+    nama = 'semua'
+    judul_laporan = 'Semua Laporan (ZIP)'
+    content_type = 'application/zip'
+
+
+BUNDEL = LaporanBundel()
+
+
+def build_bundel_zip(filter_laporan, pool=None):
+    """
+    ZIP berisi PDF semua laporan untuk filter yang sama. Setiap laporan dirender ke
+    cache PDF (laporan yang sudah ada di cache tidak dirender ulang); jika `pool`
+    diberikan, semua laporan dirender bersamaan dengan pool.map sehingga total waktu
+    kira-kira sama dengan laporan paling lambat. Mengembalikan SpooledTemporaryFile
+    yang sudah di-seek ke awal.
+    """
+    versi = get_versi_laporan()
+    parameter = filter_laporan.as_params()
+    laporan_list = list(LAPORAN.values())
+
+    path_list = (pool.map if pool is not None else map)(
+        worker.simpan_pdf_cache,
+        [laporan.nama for laporan in laporan_list],
+        [parameter] * len(laporan_list),
+        [get_kunci_pdf(laporan, filter_laporan, versi) for laporan in laporan_list],
+    )
+
+    spool = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+    # PDF sudah terkompresi, jadi cukup disimpan apa adanya
+    with zipfile.ZipFile(spool, 'w', zipfile.ZIP_STORED) as arsip:
+        for laporan, path in zip(laporan_list, path_list):
+            with default_storage.open(path, 'rb') as pdf, arsip.open(laporan.filename, 'w') as entry:
+                while chunk := pdf.read(1024 * 1024):
+                    entry.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def get_filename_bundel(filter_laporan):
+    if filter_laporan.tgl_mulai or filter_laporan.tgl_akhir:
+        periode = f"{filter_laporan.tgl_mulai or 'awal'}_{filter_laporan.tgl_akhir or 'akhir'}"
+        return f"laporan_viquam_{periode}.zip"
+    return "laporan_viquam.zip"
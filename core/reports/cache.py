@@ -0,0 +1,63 @@
+import hashlib
+import json
+import time
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from core.models import VersiLaporan
+
+# Direktori (di storage default) untuk PDF laporan yang dinamai menurut kunci isinya
+LAPORAN_CACHE_DIR = 'laporan_cache'
+
+
+def get_versi_laporan():
+    """Cap versi data laporan, dibaca dari database agar sama di semua proses."""
+    return VersiLaporan.objects.filter(pk=1).values_list('versi', flat=True).first() or 0
+
+
+def bump_versi_laporan():
+    """
+    Tandai semua PDF laporan yang tersimpan sebagai usang (dipanggil dari signals).
+    Versi dinaikkan sekali per transaksi, setelah commit: UPDATE di dalam transaksi
+    akan mengunci baris VersiLaporan sampai commit sehingga semua transaksi yang
+    menulis (termasuk checkout) saling menunggu.
+    """
+    # Callback yang masih tertunda pasti ikut berjalan saat commit: callback milik savepoint
+    # yang di-rollback sudah dibuang Django, dan savepoint yang masih terbuka membungkus pemanggil
+    connection = transaction.get_connection()
+    if connection.in_atomic_block and any(func is _naikkan_versi_laporan for _, func, _ in connection.run_on_commit):
+        return
+    # robust: pesanan sudah ter-commit, jadi kegagalan menaikkan versi hanya dicatat ke log
+    transaction.on_commit(_naikkan_versi_laporan, robust=True)
+
+
+def _naikkan_versi_laporan():
+    if VersiLaporan.objects.filter(pk=1).update(versi=F('versi') + 1):
+        return
+    try:
+        # Nilai awal diambil dari jam, bukan 0, agar kunci PDF lama tidak terpakai ulang
+        with transaction.atomic():
+            VersiLaporan.objects.create(pk=1, versi=time.time_ns())
+    except IntegrityError:
+        # Baris baru saja dibuat oleh proses lain
+        VersiLaporan.objects.filter(pk=1).update(versi=F('versi') + 1)
+
+
+def get_kunci_pdf(laporan, filter_laporan, versi=None):
+    """
+    Kunci isi PDF: hash dari nama laporan, filter yang sudah dinormalisasi, dan
+    versi data. Dua permintaan dengan kunci sama pasti menghasilkan PDF yang sama.
+    """
+    if versi is None:
+        versi = get_versi_laporan()
+    isi = json.dumps({
+        'laporan': laporan.nama,
+        'filter': filter_laporan.as_params(),
+        'versi': versi,
+    }, sort_keys=True)
+    return hashlib.sha256(isi.encode('utf-8')).hexdigest()
+
+
+def get_path_cache_pdf(kunci, ekstensi='pdf'):
+    return f'{LAPORAN_CACHE_DIR}/{kunci}.{ekstensi}'
@@ -0,0 +1,144 @@
+import csv
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from django.utils import timezone
+
+FORMAT_EKSPOR = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+# Jumlah baris yang dibaca dari database per batch saat ekspor
+EKSPOR_CHUNK_SIZE = 2000
+# Awalan teks yang dibaca Excel/LibreOffice sebagai rumus
+AWALAN_RUMUS = ('=', '+', '-', '@', '\t', '\r')
+
+
+def nilai_ekspor(value):
+    """
+    Nilai mentah untuk sel ekspor: angka tetap angka, tanggal dalam waktu lokal.
+    Teks dari pelanggan (isi feedback, nama, alamat) yang diawali karakter rumus
+    diberi awalan ' agar tidak dijalankan sebagai rumus oleh aplikasi spreadsheet.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return timezone.localtime(value).strftime('%Y-%m-%d %H:%M')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(AWALAN_RUMUS):
+        return f"'{value}"
+    return value
+
+
+def iter_baris_ekspor(laporan, filter_laporan):
+    yield [kolom.judul for kolom in laporan.kolom]
+    for row in laporan.get_rows(filter_laporan, chunk_size=EKSPOR_CHUNK_SIZE):
+        yield [nilai_ekspor(kolom.nilai(row)) for kolom in laporan.kolom]
+
+
+class Echo:
+    """Objek mirip file yang mengembalikan apa yang ditulis, untuk csv.writer yang di-stream."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(laporan, filter_laporan):
+    # BOM agar Excel membaca file sebagai UTF-8
+    yield '\ufeff'
+    writer = csv.writer(Echo())
+    for baris in iter_baris_ekspor(laporan, filter_laporan):
+        yield writer.writerow(baris)
+
+
+class BufferStream:
+    """
+    Tujuan tulis zipfile yang tidak bisa di-seek. zipfile lalu menulis data descriptor
+    setelah setiap entry, sehingga isi arsip bisa dikirim bertahap lewat `ambil()`.
+    """
+
+    def __init__(self):
+        self.potongan = []
+
+    def write(self, data):
+        self.potongan.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def ambil(self):
+        data = b''.join(self.potongan)
+        self.potongan = []
+        return data
+
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Laporan" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>'
+)
+
+
+def sel_xlsx(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, Decimal)):
+        return f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>'
+    return f'<c><v>{value}</v></c>'
+
+
+def iter_xlsx(laporan, filter_laporan):
+    """
+    Workbook XLSX satu sheet yang ditulis baris demi baris tanpa dependensi tambahan.
+    Sel teks memakai inline string sehingga tidak perlu tabel sharedStrings di memori.
+    """
+    stream = BufferStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as arsip:
+        arsip.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        arsip.writestr('_rels/.rels', XLSX_RELS)
+        arsip.writestr('xl/workbook.xml', XLSX_WORKBOOK)
+        arsip.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+        yield stream.ambil()
+
+        with arsip.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            for nomor, baris in enumerate(iter_baris_ekspor(laporan, filter_laporan), start=1):
+                sheet.write(f'<row r="{nomor}">{"".join(sel_xlsx(value) for value in baris)}</row>'.encode('utf-8'))
+                if nomor % EKSPOR_CHUNK_SIZE == 0:
+                    yield stream.ambil()
+            sheet.write(b'</sheetData></worksheet>')
+    yield stream.ambil()
+
+
+def iter_ekspor(laporan, filter_laporan, format_ekspor):
+    if format_ekspor == 'xlsx':
+        return iter_xlsx(laporan, filter_laporan)
+    return iter_csv(laporan, filter_laporan)
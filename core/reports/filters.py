@@ -0,0 +1,133 @@
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from django.utils import timezone
+
+from core.models import Pemesanan
+
+FILTER_TIPE_CHOICES = ('terlaris', 'stok_menipis')
+STATUS_PESANAN_CHOICES = tuple(value for value, label in Pemesanan.STATUS_CHOICES)
+DEFAULT_BATAS_STOK = 10
+
+
+def get_rentang_waktu(tgl_mulai=None, tgl_akhir=None):
+    """
+    Ubah rentang tanggal inklusif menjadi rentang datetime setengah-terbuka
+    [awal, akhir) pada zona waktu lokal (Asia/Makassar). Dengan membandingkan
+    kolom datetime secara langsung, query tidak perlu membungkus kolom dengan
+    fungsi cast tanggal per baris sehingga index bisa dipakai.
+    """
+    tz = timezone.get_default_timezone()
+    awal = timezone.make_aware(datetime.combine(tgl_mulai, time.min), tz) if tgl_mulai else None
+    akhir = timezone.make_aware(datetime.combine(tgl_akhir + timedelta(days=1), time.min), tz) if tgl_akhir else None
+    return awal, akhir
+
+
+class FilterLaporan:
+    """
+    Filter laporan yang sudah diparse dan divalidasi satu kali dari query string.
+    Nilai yang tidak valid diabaikan dan pesannya dikumpulkan di `errors`.
+    """
+
+    def __init__(self, tgl_mulai=None, tgl_akhir=None, status_pesanan=None, filter_tipe=None,
+                 batas_stok=DEFAULT_BATAS_STOK):
+        self.tgl_mulai = tgl_mulai
+        self.tgl_akhir = tgl_akhir
+        self.status_pesanan = status_pesanan
+        self.filter_tipe = filter_tipe
+        self.batas_stok = batas_stok
+        self.errors = []
+
+    @classmethod
+    def from_querydict(cls, data):
+        filter_laporan = cls()
+        filter_laporan.tgl_mulai = filter_laporan._parse_tanggal(data.get('tgl_mulai'), 'Tanggal mulai')
+        filter_laporan.tgl_akhir = filter_laporan._parse_tanggal(data.get('tgl_akhir'), 'Tanggal akhir')
+        if filter_laporan.tgl_mulai and filter_laporan.tgl_akhir and filter_laporan.tgl_mulai > filter_laporan.tgl_akhir:
+            filter_laporan.errors.append('Tanggal mulai lebih besar dari tanggal akhir, rentang tanggal ditukar.')
+            filter_laporan.tgl_mulai, filter_laporan.tgl_akhir = filter_laporan.tgl_akhir, filter_laporan.tgl_mulai
+        filter_laporan._buang_tanggal_di_luar_rentang()
+
+        status_pesanan = data.get('status_pesanan')
+        if status_pesanan:
+            if status_pesanan in STATUS_PESANAN_CHOICES:
+                filter_laporan.status_pesanan = status_pesanan
+            else:
+                filter_laporan.errors.append(f'Status pesanan "{status_pesanan}" tidak dikenal.')
+
+        filter_tipe = data.get('filter_tipe')
+        if filter_tipe:
+            if filter_tipe in FILTER_TIPE_CHOICES:
+                filter_laporan.filter_tipe = filter_tipe
+            else:
+                filter_laporan.errors.append(f'Filter tipe "{filter_tipe}" tidak dikenal.')
+
+        batas_stok = data.get('batas_stok')
+        if batas_stok not in (None, ''):
+            try:
+                filter_laporan.batas_stok = max(int(batas_stok), 0)
+            except (TypeError, ValueError):
+                filter_laporan.errors.append('Batas stok harus berupa angka.')
+
+        return filter_laporan
+
+    def _parse_tanggal(self, value, label):
+        if not value:
+            return None
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            self.errors.append(f'{label} "{value}" tidak valid, gunakan format YYYY-MM-DD.')
+            return None
+
+    def _buang_tanggal_di_luar_rentang(self):
+        """
+        Batas rentang harus bisa diubah ke UTC saat query. Tanggal di ujung kalender
+        (0001-01-01 sebagai awal, 9999-12-31 sebagai akhir) meluap, jadi diabaikan.
+        """
+        for atribut, label, akhir in [('tgl_mulai', 'Tanggal mulai', False), ('tgl_akhir', 'Tanggal akhir', True)]:
+            tanggal = getattr(self, atribut)
+            if tanggal is None:
+                continue
+            try:
+                batas = get_rentang_waktu(None, tanggal)[1] if akhir else get_rentang_waktu(tanggal)[0]
+                batas.astimezone(dt_timezone.utc)
+            except OverflowError:
+                self.errors.append(f'{label} "{tanggal.isoformat()}" di luar rentang yang didukung, '
+                                   f'filter tanggal ini diabaikan.')
+                setattr(self, atribut, None)
+
+    @property
+    def rentang_waktu(self):
+        return get_rentang_waktu(self.tgl_mulai, self.tgl_akhir)
+
+    @property
+    def periode(self):
+        """Teks periode untuk judul laporan, kosong jika tanpa filter tanggal."""
+        if self.tgl_mulai and self.tgl_akhir:
+            return f"{self.tgl_mulai.isoformat()} - {self.tgl_akhir.isoformat()}"
+        if self.tgl_mulai:
+            return f"Sejak {self.tgl_mulai.isoformat()}"
+        if self.tgl_akhir:
+            return f"Sampai {self.tgl_akhir.isoformat()}"
+        return ""
+
+    def as_params(self):
+        """Filter yang sudah dinormalisasi sebagai dict string, tanpa nilai kosong."""
+        params = {
+            'tgl_mulai': self.tgl_mulai.isoformat() if self.tgl_mulai else None,
+            'tgl_akhir': self.tgl_akhir.isoformat() if self.tgl_akhir else None,
+            'status_pesanan': self.status_pesanan,
+            'filter_tipe': self.filter_tipe,
+            'batas_stok': str(self.batas_stok) if self.batas_stok != DEFAULT_BATAS_STOK else None,
+        }
+        return {key: value for key, value in params.items() if value}
+
+    def as_context(self):
+        """Nilai filter untuk mengisi ulang form filter pada template preview."""
+        return {
+            'tgl_mulai': self.tgl_mulai.isoformat() if self.tgl_mulai else '',
+            'tgl_akhir': self.tgl_akhir.isoformat() if self.tgl_akhir else '',
+            'status_pesanan': self.status_pesanan or '',
+            'filter_tipe': self.filter_tipe or '',
+            'batas_stok': self.batas_stok,
+        }
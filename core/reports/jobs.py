@@ -0,0 +1,154 @@
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, close_old_connections, transaction
+from django.utils import timezone
+
+from core.models import LaporanJob
+from .bundel import BUNDEL, build_bundel_zip
+from .cache import LAPORAN_CACHE_DIR, get_kunci_pdf, get_path_cache_pdf
+from .filters import FilterLaporan
+from .laporan import get_laporan
+from .pdf import build_laporan_pdf_file
+
+# Job 'Diproses' yang lebih lama dari ini dianggap ditinggal worker yang mati dan diklaim ulang
+JOB_TIMEOUT = timedelta(minutes=10)
+# Umur job selesai/gagal dan file cache yang tidak dipakai sebelum dibuang oleh bersihkan_cache_laporan
+LAPORAN_CACHE_TTL = timedelta(days=1)
+
+
+def simpan_pdf_cache(laporan, filter_laporan, kunci):
+    """
+    Path storage PDF untuk `kunci`, dirender lebih dulu jika belum ada. PDF dengan
+    kunci yang sama sudah pernah dirender berarti isinya dijamin identik.
+    """
+    path = get_path_cache_pdf(kunci)
+    if not default_storage.exists(path):
+        with build_laporan_pdf_file(laporan, filter_laporan) as pdf:
+            path = default_storage.save(path, File(pdf))
+    return path
+
+
+def simpan_bundel_cache(filter_laporan, kunci, pool=None):
+    """Path storage ZIP semua laporan untuk `kunci`, dibangun lebih dulu jika belum ada."""
+    path = get_path_cache_pdf(kunci, 'zip')
+    if not default_storage.exists(path):
+        with build_bundel_zip(filter_laporan, pool) as spool:
+            path = default_storage.save(path, File(spool))
+    return path
+
+
+def get_laporan_job(job):
+    """Objek laporan sebuah job: salah satu LAPORAN, atau BUNDEL untuk ZIP semua laporan."""
+    return BUNDEL if job.laporan == BUNDEL.nama else get_laporan(job.laporan)
+
+
+def buat_job(laporan, filter_laporan, user=None):
+    """
+    Job PDF untuk laporan dan filter ini. Jika PDF dengan kunci yang sama sudah
+    selesai atau sedang dirender, job itu yang dikembalikan, sehingga permintaan
+    identik hanya memicu satu render.
+    """
+    kunci = get_kunci_pdf(laporan, filter_laporan)
+    job = LaporanJob.objects.filter(kunci=kunci).exclude(status='Gagal').order_by('-idJob').first()
+    if job is not None and (job.status != 'Selesai' or job.file.storage.exists(job.file.name)):
+        return job
+
+    try:
+        with transaction.atomic():
+            return LaporanJob.objects.create(
+                laporan=laporan.nama,
+                parameter=filter_laporan.as_params(),
+                kunci=kunci,
+                dibuatOleh=user if user is not None and user.is_authenticated else None,
+            )
+    except IntegrityError:
+        # Permintaan identik lain baru saja membuat job aktif dengan kunci yang sama
+        return LaporanJob.objects.get(kunci=kunci, status__in=LaporanJob.STATUS_AKTIF)
+
+
+def klaim_job(batas):
+    """
+    Klaim sampai `batas` job untuk dikerjakan. Setiap job diklaim dengan UPDATE
+    bersyarat pada statusnya, sehingga beberapa worker yang berjalan bersamaan
+    tidak pernah mengerjakan job yang sama.
+    """
+    now = timezone.now()
+    kandidat = LaporanJob.objects.filter(status='Menunggu').order_by('tanggalDibuat', 'idJob')
+    macet = LaporanJob.objects.filter(status='Diproses', tanggalMulai__lt=now - JOB_TIMEOUT)
+
+    id_list = []
+    for job in list(kandidat.values('idJob', 'status')[:batas]) + list(macet.values('idJob', 'status')[:batas]):
+        if len(id_list) >= batas:
+            break
+        diklaim = LaporanJob.objects.filter(idJob=job['idJob'], status=job['status']).update(
+            status='Diproses', tanggalMulai=now,
+        )
+        if diklaim:
+            id_list.append(job['idJob'])
+    return id_list
+
+
+def proses_job(id_job, pool=None):
+    """
+    Render PDF (atau ZIP bundel) sebuah job yang sudah diklaim dan simpan hasilnya.
+    `pool` hanya dipakai job bundel untuk merender semua laporannya bersamaan.
+    Mengembalikan status akhir job.
+    """
+    close_old_connections()
+    job = LaporanJob.objects.get(pk=id_job)
+    try:
+        laporan = get_laporan_job(job)
+        filter_laporan = FilterLaporan.from_querydict(job.parameter)
+        if laporan is BUNDEL:
+            job.file.name = simpan_bundel_cache(filter_laporan, job.kunci, pool)
+        elif job.kunci:
+            job.file.name = simpan_pdf_cache(laporan, filter_laporan, job.kunci)
+        else:
+            with build_laporan_pdf_file(laporan, filter_laporan) as pdf:
+                job.file.save(f'{job.idJob}_{laporan.filename}', File(pdf), save=False)
+        job.status = 'Selesai'
+    except Exception as e:
+        job.status = 'Gagal'
+        job.pesanError = f'{type(e).__name__}: {e}'
+    job.tanggalSelesai = timezone.now()
+    job.save(update_fields=['file', 'status', 'pesanError', 'tanggalSelesai'])
+    return job.status
+
+
+
+def bersihkan_cache_laporan(umur=LAPORAN_CACHE_TTL, now=None):
+    """
+    Hapus job yang selesai atau gagal lebih dari `umur` lalu beserta PDF miliknya,
+    kemudian file di LAPORAN_CACHE_DIR yang tidak dipakai job tersisa dan lebih tua
+    dari `umur`. Kunci cache memuat versi data, jadi file untuk versi lama tidak
+    pernah dipakai lagi. Mengembalikan (jumlah job, jumlah file) yang dihapus.
+    """
+    if now is None:
+        now = timezone.now()
+    batas = now - umur
+
+    job_lama = LaporanJob.objects.filter(status__in=('Selesai', 'Gagal'), tanggalSelesai__lt=batas)
+    # PDF tanpa kunci disimpan per job di luar direktori cache, jadi ikut dihapus bersama job-nya
+    file_job = [nama for nama in job_lama.values_list('file', flat=True)
+                if nama and not nama.startswith(f'{LAPORAN_CACHE_DIR}/')]
+    jumlah_job = job_lama.delete()[1].get(LaporanJob._meta.label, 0)
+    for nama in file_job:
+        default_storage.delete(nama)
+
+    if not default_storage.exists(LAPORAN_CACHE_DIR):
+        return jumlah_job, 0
+    # Job yang masih aktif belum mengisi `file`, tetapi akan menulis ke path kuncinya
+    dipakai = set()
+    for kunci, nama in LaporanJob.objects.values_list('kunci', 'file'):
+        dipakai.update([kunci, nama])
+    jumlah_file = 0
+    for nama in default_storage.listdir(LAPORAN_CACHE_DIR)[1]:
+        path = f'{LAPORAN_CACHE_DIR}/{nama}'
+        if path in dipakai or nama.rsplit('.', 1)[0] in dipakai:
+            continue
+        if default_storage.get_modified_time(path) < batas:
+            default_storage.delete(path)
+            jumlah_file += 1
+    return jumlah_job, jumlah_file
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class CursorTidakValid(ValueError):
+    pass
+
+
+def encode_cursor(waktu, pk):
+    """Cursor "<mikrodetik sejak epoch>.<pk>" yang aman dipakai di query string."""
+    return f"{(waktu - EPOCH) // timedelta(microseconds=1)}.{pk}"
+
+
+def decode_cursor(cursor):
+    try:
+        mikrodetik, pk = cursor.split('.')
+        return EPOCH + timedelta(microseconds=int(mikrodetik)), int(pk)
+    except (AttributeError, ValueError, OverflowError):
+        raise CursorTidakValid(f'Cursor halaman "{cursor}" tidak valid.')
+
+
+class KeysetPage:
+    def __init__(self, object_list, cursor_sebelumnya, cursor_berikutnya, is_first):
+        self.object_list = object_list
+        self.cursor_sebelumnya = cursor_sebelumnya
+        self.cursor_berikutnya = cursor_berikutnya
+        self.is_first = is_first
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_previous(self):
+        return self.cursor_sebelumnya is not None
+
+    def has_next(self):
+        return self.cursor_berikutnya is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+
+class KeysetPaginator:
+    """
+    Paginasi keyset (seek) pada pasangan kolom (datetime, pk) yang unik dan terurut.
+    Setiap halaman hanya membaca `per_page + 1` baris melalui index, berapapun
+    posisinya, tanpa OFFSET dan tanpa COUNT(*) atas seluruh hasil.
+    """
+
+    def __init__(self, queryset, field_waktu, field_pk, per_page):
+        self.queryset = queryset
+        self.field_waktu = field_waktu
+        self.field_pk = field_pk
+        self.per_page = per_page
+
+    def _cursor(self, obj):
+        return encode_cursor(getattr(obj, self.field_waktu), getattr(obj, self.field_pk))
+
+    def _seek(self, cursor, arah):
+        waktu, pk = decode_cursor(cursor)
+        return Q(**{f'{self.field_waktu}__{arah}': waktu}) | Q(**{self.field_waktu: waktu, f'{self.field_pk}__{arah}': pk})
+
+    def get_page(self, sesudah=None, sebelum=None):
+        """
+        Halaman setelah cursor `sesudah`, halaman sebelum cursor `sebelum`,
+        atau halaman pertama jika keduanya kosong.
+        """
+        urutan = (self.field_waktu, self.field_pk)
+        if sebelum:
+            # Baca mundur dari cursor lalu balik urutannya
+            object_list = list(
+                self.queryset.filter(self._seek(sebelum, 'lt')).order_by(*[f'-{field}' for field in urutan])[:self.per_page + 1]
+            )
+            ada_sebelumnya = len(object_list) > self.per_page
+            object_list = object_list[:self.per_page][::-1]
+            ada_berikutnya = True
+        else:
+            queryset = self.queryset.order_by(*urutan)
+            if sesudah:
+                queryset = queryset.filter(self._seek(sesudah, 'gt'))
+            object_list = list(queryset[:self.per_page + 1])
+            ada_berikutnya = len(object_list) > self.per_page
+            object_list = object_list[:self.per_page]
+            ada_sebelumnya = bool(sesudah)
+
+        return KeysetPage(
+            object_list,
+            cursor_sebelumnya=self._cursor(object_list[0]) if ada_sebelumnya and object_list else None,
+            cursor_berikutnya=self._cursor(object_list[-1]) if ada_berikutnya and object_list else None,
+            is_first=not ada_sebelumnya,
+        )
@@ -0,0 +1,31 @@
+def format_rupiah(amount):
+    if amount is None:
+        return "Rp 0"
+    return f"Rp {int(amount):,}".replace(",", ".")
+
+
+def format_tanggal(value):
+    if value is None:
+        return "-"
+    return value.strftime("%d/%m/%Y")
+
+
+class Kolom:
+    """
+    Satu kolom tabel laporan: judul, key pada baris (atau fungsi pengambil nilai),
+    lebar kolom PDF, dan fungsi format untuk tampilan teks.
+    """
+
+    def __init__(self, judul, key, lebar, format=str):
+        self.judul = judul
+        self.key = key
+        self.lebar = lebar
+        self.format = format
+
+    def nilai(self, row):
+        if callable(self.key):
+            return self.key(row)
+        return row[self.key]
+
+    def teks(self, row):
+        return self.format(self.nilai(row))
@@ -0,0 +1,313 @@
+from decimal import Decimal
+
+from django.db.models import Sum, Count, Q, Value, DecimalField, Prefetch
+from django.db.models.functions import Coalesce
+from reportlab.lib.units import cm
+
+from core.models import Pelanggan, Sopir, Kendaraan, Produk, Pemesanan, Feedback, RekapPendapatanHarian
+from .kolom import Kolom, format_rupiah, format_tanggal
+
+
+def get_q_tanggal(filter_laporan, field):
+    """
+    Q untuk membatasi `field` (DateTimeField) pada rentang tanggal filter, sebagai
+    perbandingan rentang setengah-terbuka yang bisa memakai index.
+    """
+    awal, akhir = filter_laporan.rentang_waktu
+    q = Q()
+    if awal:
+        q &= Q(**{f'{field}__gte': awal})
+    if akhir:
+        q &= Q(**{f'{field}__lt': akhir})
+    return q
+
+
+class Laporan:
+    """
+    Spesifikasi satu laporan: query, bentuk baris, dan kolom tabel.
+    Baris yang dihasilkan dipakai bersama oleh template preview HTML dan PDF.
+    """
+    nama = None
+    # Judul pada halaman preview
+    judul_laporan = None
+    # Judul PDF: "Laporan Data {subjek} VIQUAM"
+    subjek = None
+    template = None
+    # Bagian tabel dari `template` yang bisa dirender sendiri (lihat core.reports.bulanan)
+    template_tabel = None
+    # True jika isi laporan hanya bergantung pada data bertanggal di dalam rentang filter,
+    # sehingga bulan yang sudah tutup boleh dilayani dari hasil prerender. Laporan yang
+    # memuat nilai saat ini (stok, statistik seumur hidup, kendaraan sopir) selalu dihitung langsung.
+    per_bulan = False
+    context_object_name = None
+    paginate_by = None
+    # (field datetime, field pk) untuk paginasi keyset; None berarti paginasi nomor halaman
+    keyset = None
+    kolom = []
+
+    def get_queryset(self, filter_laporan):
+        raise NotImplementedError
+
+    def get_row(self, obj):
+        raise NotImplementedError
+
+    def get_rows(self, filter_laporan, chunk_size=None):
+        """
+        Baris laporan. Dengan `chunk_size` queryset dibaca per batch lewat iterator()
+        sehingga memori tetap datar berapapun panjang rentang tanggalnya.
+        """
+        queryset = self.get_queryset(filter_laporan)
+        if chunk_size:
+            queryset = queryset.iterator(chunk_size=chunk_size)
+        for obj in queryset:
+            yield self.get_row(obj)
+
+    def get_ringkasan(self, filter_laporan):
+        """Nilai ringkasan laporan (misalnya total pendapatan) untuk context template."""
+        return {}
+
+    def get_baris_ringkasan(self, ringkasan):
+        """Baris ringkasan (markup Paragraph reportlab) yang ditampilkan di atas tabel PDF."""
+        return []
+
+    @property
+    def filename(self):
+        return self.get_filename('pdf')
+
+    def get_filename(self, ekstensi):
+        return f"laporan_{self.nama.replace('-', '_')}.{ekstensi}"
+
+
+CATATAN_STATISTIK_PELANGGAN = 'Jumlah pesanan dan total pembelian tidak termasuk pesanan yang dibatalkan.'
+
+
+class LaporanPelanggan(Laporan):
+    nama = 'pelanggan'
+    judul_laporan = 'Data Pelanggan'
+    subjek = 'Pelanggan'
+    template = 'core/laporan_pelanggan.html'
+    template_tabel = 'core/laporan_pelanggan_tabel.html'
+    context_object_name = 'pelanggan_list'
+    paginate_by = 50
+    kolom = [
+        Kolom('Nama', 'nama', 3*cm),
+        Kolom('No WA', 'noWa', 3*cm),
+        Kolom('Alamat', 'alamat', 4*cm),
+        Kolom('Username', 'username', 2.5*cm),
+        Kolom('Total Pembelian', 'total_pembelian', 3*cm, format_rupiah),
+    ]
+
+    def get_queryset(self, filter_laporan):
+        """
+        Pelanggan beserta statistik pesanannya, dibaca dari kolom Pelanggan yang
+        diperbarui setiap kali pesanan berubah, tanpa agregasi atas Pemesanan.
+        Jumlah pesanan dan total pembelian tidak termasuk pesanan 'Dibatalkan'.
+        """
+        pelanggan_list = Pelanggan.objects.order_by('nama', 'idPelanggan')
+
+        # Hanya pelanggan yang memesan dalam rentang tanggal
+        date_filter_q = get_q_tanggal(filter_laporan, 'tanggalPemesanan')
+        if date_filter_q:
+            pelanggan_dengan_pesanan = Pemesanan.objects.filter(date_filter_q).values('idPelanggan')
+            pelanggan_list = pelanggan_list.filter(idPelanggan__in=pelanggan_dengan_pesanan)
+
+        return pelanggan_list
+
+    def get_row(self, pelanggan):
+        return {
+            'nama': pelanggan.nama,
+            'noWa': pelanggan.noWa,
+            'alamat': pelanggan.alamat,
+            'username': pelanggan.username,
+            'jumlah_pesanan': pelanggan.jumlahPesanan,
+            'pesanan_terakhir': pelanggan.pesananTerakhir,
+            'total_pembelian': pelanggan.totalPembelian,
+        }
+
+    def get_baris_ringkasan(self, ringkasan):
+        return [CATATAN_STATISTIK_PELANGGAN]
+
+
+class LaporanProduk(Laporan):
+    nama = 'produk'
+    judul_laporan = 'Produk & Stok'
+    subjek = 'Produk & Stok'
+    template = 'core/laporan_produk.html'
+    template_tabel = 'core/laporan_produk_tabel.html'
+    context_object_name = 'produk_list'
+    kolom = [
+        Kolom('Nama Produk', 'namaProduk', 4*cm),
+        Kolom('Ukuran', 'ukuranKemasan', 2.5*cm),
+        Kolom('Harga', 'hargaPerDus', 3*cm, format_rupiah),
+        Kolom('Stok', 'stok', 2*cm),
+        Kolom('Terjual', 'total_terjual', 2.5*cm),
+    ]
+
+    def get_queryset(self, filter_laporan):
+        """
+        Produk beserta total_terjual dalam rentang tanggal, dihitung dalam satu query
+        teranotasi. Mode 'terlaris' dan 'stok_menipis' memakai query yang sama.
+        """
+        date_filter_q = get_q_tanggal(filter_laporan, 'detailpemesanan__idPemesanan__tanggalPemesanan')
+        produk_list = Produk.objects.annotate(
+            total_terjual=Coalesce(Sum('detailpemesanan__jumlah', filter=date_filter_q or None), 0)
+        )
+
+        if filter_laporan.filter_tipe == 'terlaris':
+            produk_list = produk_list.order_by('-total_terjual', 'namaProduk')
+        elif filter_laporan.filter_tipe == 'stok_menipis':
+            produk_list = produk_list.filter(stok__lte=filter_laporan.batas_stok).order_by('stok', 'namaProduk')
+        else:
+            produk_list = produk_list.order_by('idProduk')
+
+        return produk_list
+
+    def get_row(self, produk):
+        return {
+            'namaProduk': produk.namaProduk,
+            'ukuranKemasan': produk.ukuranKemasan,
+            'hargaPerDus': produk.hargaPerDus,
+            'stok': produk.stok,
+            'total_terjual': produk.total_terjual,
+        }
+
+
+class LaporanSopirKendaraan(Laporan):
+    nama = 'sopir-kendaraan'
+    judul_laporan = 'Sopir & Kendaraan'
+    subjek = 'Sopir & Kendaraan'
+    template = 'core/laporan_sopir_kendaraan.html'
+    template_tabel = 'core/laporan_sopir_kendaraan_tabel.html'
+    context_object_name = 'sopir_list'
+    kolom = [
+        Kolom('Nama Sopir', 'nama', 3*cm),
+        Kolom('No HP', 'noHp', 2.5*cm),
+        Kolom('Username', 'username', 2.5*cm),
+        Kolom('Kendaraan', 'kendaraan_nama', 3.5*cm, lambda nama: nama or "-"),
+        Kolom('Dikirim', 'pesanan_dikirim', 1.5*cm),
+        Kolom('Selesai', 'pesanan_selesai', 1.5*cm),
+        Kolom('Batal', 'pesanan_dibatalkan', 1.5*cm),
+    ]
+
+    def get_queryset(self, filter_laporan):
+        """
+        Sopir beserta jumlah pesanan per status (Dikirim, Selesai, Dibatalkan) dalam
+        rentang tanggal dan seluruh kendaraannya: satu query teranotasi + satu prefetch.
+        """
+        date_filter_q = get_q_tanggal(filter_laporan, 'pemesanan__tanggalPemesanan')
+        return Sopir.objects.annotate(
+            pesanan_dikirim=Count('pemesanan', filter=Q(pemesanan__status='Dikirim') & date_filter_q),
+            pesanan_selesai=Count('pemesanan', filter=Q(pemesanan__status='Selesai') & date_filter_q),
+            pesanan_dibatalkan=Count('pemesanan', filter=Q(pemesanan__status='Dibatalkan') & date_filter_q),
+        ).prefetch_related(
+            Prefetch('kendaraan_set', queryset=Kendaraan.objects.order_by('nomorPlat'), to_attr='kendaraan_list')
+        ).order_by('nama', 'idSopir')
+
+    def get_row(self, sopir):
+        return {
+            'nama': sopir.nama,
+            'noHp': sopir.noHp,
+            'username': sopir.username,
+            'kendaraan_list': sopir.kendaraan_list,
+            'kendaraan_nama': ", ".join(kendaraan.nama for kendaraan in sopir.kendaraan_list),
+            'pesanan_dikirim': sopir.pesanan_dikirim,
+            'pesanan_selesai': sopir.pesanan_selesai,
+            'pesanan_dibatalkan': sopir.pesanan_dibatalkan,
+        }
+
+
+class LaporanPemesananPendapatan(Laporan):
+    nama = 'pemesanan-pendapatan'
+    judul_laporan = 'Pemesanan & Pendapatan'
+    subjek = 'Pemesanan & Pendapatan'
+    template = 'core/laporan_pemesanan_pendapatan.html'
+    template_tabel = 'core/laporan_pemesanan_pendapatan_tabel.html'
+    per_bulan = True
+    context_object_name = 'pemesanan_list'
+    paginate_by = 50
+    keyset = ('tanggalPemesanan', 'idPemesanan')
+    kolom = [
+        Kolom('Tanggal', 'tanggalPemesanan', 3*cm, format_tanggal),
+        Kolom('Pelanggan', lambda row: row['idPelanggan'].nama, 3*cm),
+        Kolom('Alamat', 'alamatPengiriman', 4*cm),
+        Kolom('Status', 'status', 2.5*cm),
+        Kolom('Total', 'total', 3*cm, format_rupiah),
+    ]
+
+    def get_queryset(self, filter_laporan):
+        pemesanan_list = Pemesanan.objects.filter(
+            get_q_tanggal(filter_laporan, 'tanggalPemesanan')
+        ).select_related('idPelanggan').order_by('tanggalPemesanan', 'idPemesanan')
+        if filter_laporan.status_pesanan:
+            pemesanan_list = pemesanan_list.filter(status=filter_laporan.status_pesanan)
+        return pemesanan_list
+
+    def get_row(self, pemesanan):
+        return {
+            'idPemesanan': pemesanan.idPemesanan,
+            'tanggalPemesanan': pemesanan.tanggalPemesanan,
+            'idPelanggan': pemesanan.idPelanggan,
+            'alamatPengiriman': pemesanan.alamatPengiriman,
+            'status': pemesanan.status,
+            'total': pemesanan.total,
+        }
+
+    def get_ringkasan(self, filter_laporan):
+        # Jumlah dan nilai seluruh pesanan yang cocok dihitung dalam satu agregasi,
+        # bukan dari baris halaman yang sedang ditampilkan
+        ringkasan = self.get_queryset(filter_laporan).order_by().aggregate(
+            jumlah_pesanan=Count('pk'),
+            total_nilai_pesanan=Coalesce(Sum('total'), Value(Decimal('0')), output_field=DecimalField()),
+        )
+        # Pendapatan hanya dari pesanan 'Selesai', dibaca dari rekap harian
+        ringkasan['total_pendapatan'] = RekapPendapatanHarian.total_pendapatan(filter_laporan.tgl_mulai, filter_laporan.tgl_akhir)
+        return ringkasan
+
+    def get_baris_ringkasan(self, ringkasan):
+        return [
+            f"<b>Jumlah Pesanan:</b> {ringkasan['jumlah_pesanan']} (Total Nilai: {format_rupiah(ringkasan['total_nilai_pesanan'])})",
+            f"<b>Total Pendapatan:</b> {format_rupiah(ringkasan['total_pendapatan'])}",
+        ]
+
+
+class LaporanFeedback(Laporan):
+    nama = 'feedback'
+    judul_laporan = 'Feedback Pelanggan'
+    subjek = 'Feedback Pelanggan'
+    template = 'core/laporan_feedback.html'
+    template_tabel = 'core/laporan_feedback_tabel.html'
+    per_bulan = True
+    context_object_name = 'feedback_list'
+    kolom = [
+        Kolom('Nama Pelanggan', lambda row: row['idPelanggan'].nama, 4*cm),
+        Kolom('Subjek', 'isi', 6*cm, lambda isi: isi[:30] + "..." if len(isi) > 30 else isi),
+        Kolom('Tanggal', 'tanggal', 3*cm, format_tanggal),
+    ]
+
+    def get_queryset(self, filter_laporan):
+        return Feedback.objects.filter(
+            get_q_tanggal(filter_laporan, 'tanggal')
+        ).select_related('idPelanggan').order_by('tanggal', 'idFeedback')
+
+    def get_row(self, feedback):
+        return {
+            'tanggal': feedback.tanggal,
+            'idPelanggan': feedback.idPelanggan,
+            'isi': feedback.isi,
+        }
+
+
+LAPORAN = {
+    laporan.nama: laporan
+    for laporan in [
+        LaporanPelanggan(),
+        LaporanProduk(),
+        LaporanSopirKendaraan(),
+        LaporanPemesananPendapatan(),
+        LaporanFeedback(),
+    ]
+}
+
+
+def get_laporan(nama):
+    return LAPORAN[nama]
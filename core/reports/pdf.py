@@ -0,0 +1,192 @@
+import threading
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+ALAMAT_PERUSAHAAN = "Jl. Cendrawasih, Lahilai Bissi Kopan, Kec. Kota Lama, Kota Kupang Nusa Tenggara Timur."
+PENANDA_TANGAN = "(Alain N. Susanto)"
+LEBAR_KOLOM_NOMOR = 1.5*cm
+# Jumlah baris per tabel; setiap potongan tabel membawa baris judul kolomnya sendiri
+PDF_BARIS_PER_TABEL = 100
+# Baris dibaca dari database per batch ini lewat iterator()
+PDF_CHUNK_SIZE = 2000
+# PDF yang lebih besar dari ini ditulis ke file sementara di disk, bukan ke memori
+PDF_SPOOL_MAX_SIZE = 5 * 1024 * 1024
+
+# Style dibangun sekali per proses dari stylesheet contoh milik modul ini sendiri;
+# style turunan dibuat dengan ParagraphStyle(parent=...) sehingga tidak ada style yang diubah di tempat
+_sample_styles = getSampleStyleSheet()
+STYLE_NORMAL = _sample_styles['Normal']
+STYLE_JUDUL = ParagraphStyle('LaporanJudul', parent=_sample_styles['Title'], fontSize=12, alignment=TA_CENTER)
+STYLE_ALAMAT = ParagraphStyle('LaporanAlamat', parent=STYLE_NORMAL, fontSize=10, alignment=TA_CENTER)
+
+TABLE_STYLE_DATA = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.white),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+])
+TABLE_STYLE_GARIS = TableStyle([
+    ('LINEABOVE', (0, 0), (0, 0), 2, colors.black),
+    ('LEFTPADDING', (0, 0), (0, 0), 0),
+    ('RIGHTPADDING', (0, 0), (0, 0), 0),
+    ('TOPPADDING', (0, 0), (0, 0), 0),
+    ('BOTTOMPADDING', (0, 0), (0, 0), 0),
+])
+TABLE_STYLE_TANDA_TANGAN = TableStyle([
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('TOPPADDING', (1, -1), (1, -1), 30),
+    ('LINEBELOW', (1, -1), (1, -1), 1, colors.black),
+])
+
+# Flowable statis disimpan per thread: reportlab menyimpan hasil layout (wrap/split)
+# di objek flowable, jadi satu objek tidak boleh dipakai dua build yang berjalan bersamaan
+_flowable_statis = threading.local()
+
+
+def get_flowable_statis():
+    """(alamat, garis pemisah, blok tanda tangan) yang sama untuk setiap laporan."""
+    if not hasattr(_flowable_statis, 'alamat'):
+        _flowable_statis.alamat = Paragraph(ALAMAT_PERUSAHAAN, STYLE_ALAMAT)
+
+        garis = Table([['']], colWidths=[16*cm], rowHeights=[1])
+        garis.setStyle(TABLE_STYLE_GARIS)
+        _flowable_statis.garis = garis
+
+        tanda_tangan = Table([
+            ['', 'Kupang, ......................'],
+            ['', 'Mengetahui,'],
+            ['', ''],
+            ['', ''],
+            ['', PENANDA_TANGAN],
+        ], colWidths=[8*cm, 8*cm])
+        tanda_tangan.setStyle(TABLE_STYLE_TANDA_TANGAN)
+        _flowable_statis.tanda_tangan = tanda_tangan
+    return _flowable_statis.alamat, _flowable_statis.garis, _flowable_statis.tanda_tangan
+
+
+class StoryBertahap(list):
+    """
+    Daftar flowable untuk doc.build() yang diisi dari generator sesuai kebutuhan.
+    reportlab hanya membaca dan membuang flowables[0], jadi cukup satu flowable
+    yang dimaterialisasi pada satu waktu; flowable yang sudah digambar langsung
+    bisa dibuang dari memori.
+    """
+
+    def __init__(self, sumber):
+        super().__init__()
+        self._sumber = iter(sumber)
+
+    def _isi(self):
+        if self._sumber is not None and not list.__len__(self):
+            for flowable in self._sumber:
+                list.append(self, flowable)
+                break
+            else:
+                self._sumber = None
+
+    def __len__(self):
+        self._isi()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._isi()
+        return list.__getitem__(self, index)
+
+
+def iter_tabel(kolom, rows):
+    """Tabel data bernomor dalam potongan PDF_BARIS_PER_TABEL baris dengan header berulang."""
+    header = ['No.'] + [k.judul for k in kolom]
+    col_widths = [LEBAR_KOLOM_NOMOR] + [k.lebar for k in kolom]
+    rows = iter(rows)
+    nomor = 0
+    while True:
+        potongan = list(islice(rows, PDF_BARIS_PER_TABEL))
+        # Laporan tanpa baris tetap menampilkan tabel berisi header saja
+        if not potongan and nomor:
+            return
+        data = [header]
+        for row in potongan:
+            nomor += 1
+            data.append([str(nomor)] + [k.teks(row) for k in kolom])
+        # repeatRows mengulang header jika potongan ini sendiri terpotong pindah halaman
+        table = Table(data, colWidths=col_widths, repeatRows=1)
+        table.setStyle(TABLE_STYLE_DATA)
+        yield table
+        if len(potongan) < PDF_BARIS_PER_TABEL:
+            return
+
+
+def iter_story(judul, kolom, rows, periode, baris_ringkasan):
+    alamat, garis, tanda_tangan = get_flowable_statis()
+
+    yield Paragraph(judul, STYLE_JUDUL)
+    yield alamat
+    if periode:
+        yield Paragraph(f"Periode: {periode}", STYLE_ALAMAT)
+    yield Spacer(1, 12)
+
+    for baris in baris_ringkasan:
+        yield Paragraph(baris, STYLE_NORMAL)
+
+    yield garis
+    yield Spacer(1, 12)
+
+    yield from iter_tabel(kolom, rows)
+    yield Spacer(1, 24)
+
+    # Dorong blok tanda tangan ke bawah
+    yield Spacer(1, 200)
+    yield tanda_tangan
+
+
+def render_pdf(buffer, judul, kolom, rows, periode=None, baris_ringkasan=()):
+    """
+    Tulis PDF laporan standar VIQUAM ke `buffer`: kop, periode, baris ringkasan,
+    tabel bernomor dari `rows` (dict) menurut spesifikasi `kolom`, dan tanda tangan.
+    `rows` dibaca bertahap, sehingga hanya satu potongan tabel yang ada di memori.
+    """
+    doc = SimpleDocTemplate(buffer, pagesize=A4,
+                            leftMargin=2*cm, rightMargin=2*cm,
+                            topMargin=2*cm, bottomMargin=2*cm)
+    doc.build(StoryBertahap(iter_story(judul, kolom, rows, periode, baris_ringkasan)))
+
+
+def build_laporan_pdf(laporan, filter_laporan, buffer):
+    """Tulis PDF sebuah laporan ke `buffer` dari baris yang sama dengan preview HTML"""
+    render_pdf(
+        buffer,
+        f"Laporan Data {laporan.subjek} VIQUAM",
+        laporan.kolom,
+        laporan.get_rows(filter_laporan, chunk_size=PDF_CHUNK_SIZE),
+        periode=filter_laporan.periode,
+        baris_ringkasan=laporan.get_baris_ringkasan(laporan.get_ringkasan(filter_laporan)),
+    )
+
+
+def build_laporan_pdf_file(laporan, filter_laporan):
+    """
+    PDF laporan dalam SpooledTemporaryFile yang sudah di-seek ke awal: kecil tetap
+    di memori, besar pindah ke disk, dan bisa langsung diberikan ke File/FileResponse
+    tanpa menyalin seluruh isi dokumen ke bytes.
+    """
+    spool = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_SIZE)
+    build_laporan_pdf(laporan, filter_laporan, spool)
+    spool.seek(0)
+    return spool
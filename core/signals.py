@@ -0,0 +1,41 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .dashboard import bump_dashboard_version
+from .models import Pelanggan, Sopir, Kendaraan, Pemesanan, DetailPemesanan, Produk, StokMasuk, Feedback
+from .reports.bulanan import hapus_laporan_bulanan
+from .reports.cache import bump_versi_laporan
+
+
+@receiver([post_save, post_delete], sender=Pemesanan)
+@receiver([post_save, post_delete], sender=DetailPemesanan)
+@receiver([post_save, post_delete], sender=Produk)
+@receiver([post_save, post_delete], sender=StokMasuk)
+@receiver([post_save, post_delete], sender=Feedback)
+def invalidate_dashboard(sender, **kwargs):
+    """Setiap perubahan data yang tampil di dashboard membuat cache dashboard usang."""
+    bump_dashboard_version()
+
+
+@receiver([post_save, post_delete], sender=Pelanggan)
+@receiver([post_save, post_delete], sender=Sopir)
+@receiver([post_save, post_delete], sender=Kendaraan)
+@receiver([post_save, post_delete], sender=Pemesanan)
+@receiver([post_save, post_delete], sender=DetailPemesanan)
+@receiver([post_save, post_delete], sender=Produk)
+@receiver([post_save, post_delete], sender=StokMasuk)
+@receiver([post_save, post_delete], sender=Feedback)
+def invalidate_laporan(sender, **kwargs):
+    """Setiap perubahan data yang dipakai laporan membuat PDF laporan yang tersimpan usang."""
+    bump_versi_laporan()
+
+
+@receiver([post_save, post_delete], sender=Pemesanan)
+def invalidate_laporan_bulanan_pemesanan(sender, instance, **kwargs):
+    """Perubahan pesanan di bulan yang sudah tutup membuat hasil prerender bulan itu usang."""
+    hapus_laporan_bulanan(instance.get_tanggal_terdampak())
+
+
+@receiver([post_save, post_delete], sender=Feedback)
+def invalidate_laporan_bulanan_feedback(sender, instance, **kwargs):
+    hapus_laporan_bulanan([instance.tanggal])
@@ -0,0 +1,129 @@
+import csv
+import io
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q, Sum
+
+from .dashboard import bump_dashboard_version
+from .models import Produk, StokMasuk, MutasiStok
+from .reports.cache import bump_versi_laporan
+
+
+# Batas atas PositiveIntegerField (dan IntegerField) di semua backend Django
+BATAS_INT = 2147483647
+
+
+def _ke_int(teks):
+    """
+    int(teks), atau None jika teks bukan deret angka ASCII 0-9 atau melebihi BATAS_INT.
+    int() sendiri juga menerima '٣', '1_000', spasi dan tanda, sedangkan str.isdigit()
+    menerima '²' dan '①'.
+    """
+    if not (teks.isascii() and teks.isdigit()):
+        return None
+    nilai = int(teks)
+    return nilai if nilai <= BATAS_INT else None
+
+
+def baca_impor_stok(file):
+    """
+    Baca file CSV/TSV stok masuk (baris pertama header: produk, jumlah, keterangan)
+    menjadi daftar StokMasuk yang belum disimpan. Semua baris divalidasi lebih dulu;
+    jika ada yang salah, ValidationError berisi semua kesalahan per baris.
+    """
+    try:
+        teks = file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValidationError('File harus berupa teks UTF-8.')
+
+    baris_pertama = teks.split('\n', 1)[0]
+    reader = csv.DictReader(io.StringIO(teks), delimiter='\t' if '\t' in baris_pertama else ',')
+    header = [kolom.strip().lower() for kolom in reader.fieldnames or []]
+    if 'produk' not in header or 'jumlah' not in header:
+        raise ValidationError('Header file harus memuat kolom "produk" dan "jumlah".')
+    reader.fieldnames = header
+
+    baris_list = [(nomor, baris) for nomor, baris in enumerate(reader, start=2)
+                  if any((nilai or '').strip() for nilai in baris.values() if isinstance(nilai, str))]
+    if not baris_list:
+        raise ValidationError('File tidak berisi baris stok masuk.')
+
+    # Semua produk yang disebut file diambil dengan satu query
+    acuan = {(baris.get('produk') or '').strip() for nomor, baris in baris_list}
+    id_list = [pk for pk in map(_ke_int, acuan) if pk is not None]
+    produk_per_id, id_per_nama = {}, defaultdict(list)
+    for pk, nama in Produk.objects.filter(Q(pk__in=id_list) | Q(namaProduk__in=acuan)).values_list('pk', 'namaProduk'):
+        produk_per_id[pk] = pk
+        id_per_nama[nama].append(pk)
+
+    stok_masuk_list, errors = [], []
+    for nomor, baris in baris_list:
+        produk = (baris.get('produk') or '').strip()
+        jumlah = (baris.get('jumlah') or '').strip()
+        keterangan = (baris.get('keterangan') or '').strip()
+        id_produk = produk_per_id.get(_ke_int(produk))
+        if id_produk is None and len(id_per_nama.get(produk, [])) > 1:
+            errors.append(f'Baris {nomor}: nama produk "{produk}" tidak unik, gunakan ID produk.')
+            continue
+        if id_produk is None and id_per_nama.get(produk):
+            id_produk = id_per_nama[produk][0]
+        if id_produk is None:
+            errors.append(f'Baris {nomor}: produk "{produk}" tidak ditemukan.')
+        elif (_ke_int(jumlah) or 0) <= 0:
+            errors.append(f'Baris {nomor}: jumlah "{jumlah}" harus bilangan bulat antara 1 dan {BATAS_INT}.')
+        elif len(keterangan) > 200:
+            errors.append(f'Baris {nomor}: keterangan lebih dari 200 karakter.')
+        else:
+            stok_masuk_list.append(StokMasuk(idProduk_id=id_produk, jumlah=_ke_int(jumlah), keterangan=keterangan))
+    if errors:
+        raise ValidationError(errors)
+    return stok_masuk_list
+
+
+def impor_stok_masuk(stok_masuk_list):
+    """
+    Simpan hasil baca_impor_stok sekaligus: bulk_create StokMasuk, satu
+    UPDATE ... CASE yang menambah stok semua produk, dan satu catatan mutasi
+    per produk. Semua atau tidak sama sekali.
+    """
+    jumlah_per_produk = {}
+    for stok_masuk in stok_masuk_list:
+        jumlah_per_produk[stok_masuk.idProduk_id] = jumlah_per_produk.get(stok_masuk.idProduk_id, 0) + stok_masuk.jumlah
+
+    with transaction.atomic():
+        # bulk_create tidak memanggil StokMasuk.save() maupun signal, jadi stok ditambah sekali di sini
+        StokMasuk.objects.bulk_create(stok_masuk_list)
+        Produk.tambah_stok(jumlah_per_produk)
+        MutasiStok.catat(jumlah_per_produk, 'Stok Masuk', f'Impor {len(stok_masuk_list)} baris stok masuk')
+        bump_dashboard_version()
+        bump_versi_laporan()
+    return jumlah_per_produk
+
+
+def hapus_stok_masuk(stok_masuk_qs):
+    """
+    Hapus semua StokMasuk di `stok_masuk_qs` dengan satu queryset.delete() dan tarik
+    kembali stoknya dengan satu UPDATE bersyarat. Jika stok salah satu produk sudah
+    terjual sehingga tidak cukup untuk ditarik, tidak ada yang dihapus dan
+    ValidationError dilempar. Mengembalikan jumlah stok masuk yang dihapus.
+    """
+    with transaction.atomic():
+        jumlah_per_produk = dict(
+            stok_masuk_qs.values('idProduk').annotate(jumlah=Sum('jumlah')).order_by()
+            .values_list('idProduk', 'jumlah')
+        )
+        if not jumlah_per_produk:
+            return 0
+        if not Produk.kurangi_stok(jumlah_per_produk):
+            produk_list = Produk.objects.filter(pk__in=jumlah_per_produk).values_list('pk', 'namaProduk', 'stok')
+            kurang = [f'{nama} ({stok})' for pk, nama, stok in produk_list if stok < jumlah_per_produk[pk]]
+            raise ValidationError(
+                f'Stok {", ".join(kurang) or "produk"} tidak mencukupi untuk menghapus stok masuk terpilih.'
+            )
+        MutasiStok.catat({pk: -jumlah for pk, jumlah in jumlah_per_produk.items()}, 'Stok Masuk',
+                         'Stok masuk dihapus dari admin')
+        # queryset.delete() tidak memanggil StokMasuk.delete(); signal post_delete tetap dikirim per objek
+        jumlah, _ = stok_masuk_qs.delete()
+    return jumlah
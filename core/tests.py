@@ -1,3 +1,1346 @@
-from django.test import TestCase
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import F, Sum
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import (
+    Pelanggan, Sopir, Kendaraan, Produk, StokMasuk, Pemesanan, DetailPemesanan, Feedback, RekapPendapatanHarian,
+    LaporanJob, MutasiStok, SnapshotStok
+)
+from . import views
+from .dashboard import DASHBOARD_LOCK_KEY, bump_dashboard_version, get_rentang_bulan_lalu
+from .reports import (
+    LAPORAN, FilterLaporan, LaporanPelanggan, LaporanProduk, LaporanSopirKendaraan,
+    build_laporan_pdf, build_laporan_pdf_file, buat_job, klaim_job, proses_job
+)
+from .reports import pdf as pdf_engine
+from .reports.bulanan import get_bulan_tutup, get_laporan_bulanan
+from .reports.ekspor import nilai_ekspor
+from .reports.cache import get_versi_laporan
+from .pesanan import batalkan_pesanan
+
+# File hasil render (PDF job, cache laporan) ditulis ke direktori sementara, bukan media/
+MEDIA_ROOT_TEST = tempfile.mkdtemp(prefix='viquam-test-')
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT_TEST, ignore_errors=True)
+
+
+def jalankan_on_commit():
+    """TestCase tidak pernah commit: jalankan lalu buang callback on_commit yang tertunda."""
+    callback_list = list(connection.run_on_commit)
+    connection.run_on_commit.clear()
+    for _, callback, _ in callback_list:
+        callback()
+
+
+def buat_pelanggan(username='budi', **kwargs):
+    data = {
+        'nama': 'Budi',
+        'noWa': '08123456789',
+        'alamat': 'Kupang',
+        'username': username,
+        'password': 'rahasia123',
+    }
+    data.update(kwargs)
+    return Pelanggan.objects.create(**data)
+
+
+def buat_produk(nama='Aqua Galon', harga=20000, stok=100, **kwargs):
+    return Produk.objects.create(namaProduk=nama, ukuranKemasan='19L', hargaPerDus=harga, stok=stok, **kwargs)
+
+
+class DashboardContextTest(TestCase):
+    # Batas query untuk satu kali render dashboard admin:
+    # KPI pemesanan, grafik pendapatan, produk stok menipis, feedback terbaru
+    DASHBOARD_QUERY_BUDGET = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.pelanggan = buat_pelanggan()
+        now = timezone.now()
+        for status, total, umur in [
+            ('Diproses', 10000, timedelta(hours=30)),
+            ('Diproses', 20000, timedelta(hours=1)),
+            ('Dikirim', 30000, timedelta(hours=2)),
+            ('Selesai', 40000, timedelta(hours=3)),
+            ('Selesai', 50000, timedelta(days=400)),
+            ('Dibatalkan', 60000, timedelta(hours=4)),
+        ]:
+            Pemesanan.objects.create(
+                idPelanggan=cls.pelanggan,
+                alamatPengiriman='Kupang',
+                total=total,
+                status=status,
+                tanggalPemesanan=now - umur,
+            )
+        buat_produk(stok=5)
+        buat_produk(nama='Aqua Botol', stok=50)
+        Feedback.objects.create(idPelanggan=cls.pelanggan, isi='Mantap')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_dashboard_within_query_budget(self):
+        with self.assertNumQueries(self.DASHBOARD_QUERY_BUDGET):
+            context = views.get_dashboard_context()
+            # Template membaca nama pelanggan dari feedback terbaru
+            [feedback.idPelanggan.nama for feedback in context['feedback_terbaru']]
+
+    def test_dashboard_kpi_values(self):
+        context = views.get_dashboard_context()
+        self.assertEqual(context['pesanan_perlu_perhatian'], 1)
+        self.assertEqual(context['total_pesanan_diproses'], 2)
+        self.assertEqual(context['total_pengiriman_aktif'], 1)
+        self.assertEqual(context['transaksi_selesai_keseluruhan'], 2)
+        self.assertEqual(context['total_pendapatan_keseluruhan'], Decimal('90000'))
+        self.assertEqual(context['produk_stok_menipis'], 1)
+        self.assertEqual(len(context['feedback_terbaru']), 1)
+
+    def test_dashboard_served_from_cache(self):
+        views.get_dashboard_context()
+        with self.assertNumQueries(0):
+            views.get_dashboard_context()
+
+    def test_dashboard_invalidated_by_signals(self):
+        self.assertEqual(views.get_dashboard_context()['total_pengiriman_aktif'], 1)
+        Pemesanan.objects.create(idPelanggan=self.pelanggan, alamatPengiriman='Kupang', status='Dikirim')
+        self.assertEqual(views.get_dashboard_context()['total_pengiriman_aktif'], 2)
+
+    def test_dashboard_serves_stale_while_rebuilding(self):
+        views.get_dashboard_context()
+        bump_dashboard_version()
+        # Proses lain sedang menghitung ulang dashboard
+        cache.add(DASHBOARD_LOCK_KEY, 1)
+        with self.assertNumQueries(0):
+            context = views.get_dashboard_context()
+        self.assertEqual(context['total_pengiriman_aktif'], 1)
+
+
+class RekapPendapatanHarianTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pelanggan = buat_pelanggan()
+
+    def buat_pemesanan(self, status='Diproses', total=10000, **kwargs):
+        return Pemesanan.objects.create(
+            idPelanggan=self.pelanggan, alamatPengiriman='Kupang', total=total, status=status, **kwargs
+        )
+
+    def test_rekap_follows_status_selesai(self):
+        pemesanan = self.buat_pemesanan()
+        self.assertFalse(RekapPendapatanHarian.objects.exists())
+
+        pemesanan.status = 'Selesai'
+        pemesanan.save()
+        rekap = RekapPendapatanHarian.objects.get(tanggal=timezone.localdate(pemesanan.tanggalPemesanan))
+        self.assertEqual(rekap.jumlahPesanan, 1)
+        self.assertEqual(rekap.pendapatan, Decimal('10000'))
+
+        pemesanan.status = 'Dibatalkan'
+        pemesanan.save()
+        rekap.refresh_from_db()
+        self.assertEqual(rekap.jumlahPesanan, 0)
+        self.assertEqual(rekap.pendapatan, Decimal('0'))
+
+    def test_rekap_follows_total_and_delete(self):
+        pemesanan = self.buat_pemesanan(status='Selesai')
+        pemesanan = Pemesanan.objects.get(pk=pemesanan.pk)
+        pemesanan.total = 25000
+        pemesanan.save(update_fields=['total'])
+        self.assertEqual(RekapPendapatanHarian.total_pendapatan(), Decimal('25000'))
+
+        pemesanan.delete()
+        self.assertEqual(RekapPendapatanHarian.total_pendapatan(), Decimal('0'))
+
+    def test_admin_bulk_delete_updates_rekap(self):
+        pemesanan_list = [self.buat_pemesanan(status='Selesai'), self.buat_pemesanan(status='Selesai', total=5000),
+                          self.buat_pemesanan()]
+        self.assertEqual(RekapPendapatanHarian.total_pendapatan(), Decimal('15000'))
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123'))
+        data = {'action': 'delete_selected', '_selected_action': [p.pk for p in pemesanan_list], 'post': 'yes'}
+        response = self.client.post(reverse('admin:core_pemesanan_changelist'), data)
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Pemesanan.objects.exists())
+        self.assertEqual(RekapPendapatanHarian.total_pendapatan(), Decimal('0'))
+
+    def test_rebuild_matches_incremental(self):
+        now = timezone.now()
+        self.buat_pemesanan(status='Selesai', total=10000, tanggalPemesanan=now)
+        self.buat_pemesanan(status='Selesai', total=15000, tanggalPemesanan=now - timedelta(days=3))
+        self.buat_pemesanan(status='Dikirim', total=99000, tanggalPemesanan=now)
+        incremental = list(RekapPendapatanHarian.objects.values_list('tanggal', 'jumlahPesanan', 'pendapatan'))
+
+        RekapPendapatanHarian.objects.update(jumlahPesanan=0, pendapatan=0)
+        RekapPendapatanHarian.rebuild()
+        rebuilt = list(RekapPendapatanHarian.objects.values_list('tanggal', 'jumlahPesanan', 'pendapatan'))
+        self.assertEqual(incremental, rebuilt)
+
+
+class PemesananAddLinesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pelanggan = buat_pelanggan()
+        cls.produk_list = [buat_produk(f'Produk {i}', harga=1000 * (i + 1), stok=10) for i in range(10)]
+
+    def setUp(self):
+        self.pemesanan = Pemesanan.objects.create(idPelanggan=self.pelanggan, alamatPengiriman='Kupang')
+
+    def test_add_lines_constant_queries(self):
+        items = [(produk.idProduk, 2) for produk in self.produk_list]
+        with CaptureQueriesContext(connection) as queries:
+            detail_list = self.pemesanan.add_lines(items)
+        # in_bulk harga, UPDATE stok, mutasi stok, bulk_create baris, satu tulis total dan statistik pelanggan;
+        # versi laporan baru dinaikkan setelah commit
+        self.assertEqual(len([q for q in queries if '"core_' in q['sql']]), 6)
+
+        self.assertEqual(len(detail_list), 10)
+        self.pemesanan.refresh_from_db()
+        self.assertEqual(self.pemesanan.total, Decimal('110000'))
+        self.assertEqual(set(Produk.objects.values_list('stok', flat=True)), {8})
+
+        # Baris hasil bulk_create yang disimpan ulang hanya memotong selisihnya
+        detail = detail_list[0]
+        detail.jumlah = 3
+        detail.save()
+        self.assertEqual(Produk.objects.get(pk=detail.idProduk_id).stok, 7)
+
+    def test_add_lines_insufficient_stock_changes_nothing(self):
+        items = [(self.produk_list[0].idProduk, 5), (self.produk_list[1].idProduk, 11)]
+        with self.assertRaisesMessage(ValidationError, 'Produk 1 (10)'):
+            self.pemesanan.add_lines(items)
+        self.assertFalse(DetailPemesanan.objects.exists())
+        self.assertEqual(set(Produk.objects.values_list('stok', flat=True)), {10})
+        self.pemesanan.refresh_from_db()
+        self.assertEqual(self.pemesanan.total, Decimal('0'))
+
+
+# GIF 1x1 piksel untuk bukti pembayaran
+GAMBAR_GIF = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT_TEST)
+@override_settings(MEDIA_ROOT=MEDIA_ROOT_TEST)
+class CheckoutPemesananTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('budi', password='rahasia123')
+        cls.pelanggan = buat_pelanggan()
+        cls.produk_list = [buat_produk(f'Produk {i}', harga=1000 * (i + 1), stok=10) for i in range(20)]
+
+    def isi_keranjang(self, produk_list, quantity=2):
+        self.client.force_login(self.user)
+        session = self.client.session
+        session['pelanggan_id'] = self.pelanggan.pk
+        session['cart'] = {
+            str(produk.idProduk): {
+                'nama': produk.namaProduk, 'harga': float(produk.hargaPerDus), 'quantity': quantity, 'stok': produk.stok,
+            }
+            for produk in produk_list
+        }
+        session.save()
+
+    def checkout(self):
+        bukti = SimpleUploadedFile('bukti.gif', GAMBAR_GIF, content_type='image/gif')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('checkout_pemesanan'), {'alamatPengiriman': 'Kupang', 'buktiBayar': bukti})
+        return response, len([q for q in queries if '"core_' in q['sql']])
+
+    def test_checkout_constant_queries(self):
+        self.isi_keranjang(self.produk_list[:1])
+        response, jumlah_query_satu = self.checkout()
+        self.assertRedirects(response, reverse('riwayat_pesanan'), fetch_redirect_response=False)
+
+        self.isi_keranjang(self.produk_list)
+        response, jumlah_query_dua_puluh = self.checkout()
+        self.assertRedirects(response, reverse('riwayat_pesanan'), fetch_redirect_response=False)
+        # in_bulk produk, INSERT pesanan, UPDATE stok, mutasi stok, bulk_create baris, tulis total,
+        # serta statistik pelanggan saat pesanan dibuat dan saat total ditulis
+        self.assertEqual(jumlah_query_satu, 8)
+        self.assertEqual(jumlah_query_dua_puluh, 8)
+
+        pemesanan = Pemesanan.objects.latest('idPemesanan')
+        self.assertEqual(pemesanan.detailpemesanan_set.count(), 20)
+        self.assertEqual(pemesanan.total, Decimal(2 * sum(1000 * (i + 1) for i in range(20))))
+        self.assertEqual(Produk.objects.get(pk=self.produk_list[0].pk).stok, 6)
+        self.assertNotIn('cart', self.client.session)
+
+    def test_checkout_revalidates_price_and_stock(self):
+        self.isi_keranjang(self.produk_list[:2])
+        Produk.objects.filter(pk=self.produk_list[0].pk).update(hargaPerDus=1500)
+        Produk.objects.filter(pk=self.produk_list[1].pk).update(stok=1)
+
+        response, jumlah_query = self.checkout()
+        self.assertRedirects(response, reverse('view_keranjang'), fetch_redirect_response=False)
+        self.assertFalse(Pemesanan.objects.exists())
+        keranjang = self.client.session['cart']
+        self.assertEqual(keranjang[str(self.produk_list[0].pk)]['harga'], 1500)
+        self.assertEqual(keranjang[str(self.produk_list[1].pk)]['stok'], 1)
+
+    def test_checkout_race_does_not_leave_bukti_bayar(self):
+        def daftar_bukti():
+            return set(default_storage.listdir('bukti_pembayaran')[1]) if default_storage.exists('bukti_pembayaran') else set()
+
+        self.isi_keranjang(self.produk_list[:1])
+        sebelum = daftar_bukti()
+        # Stok habis oleh checkout lain di antara pengecekan dan UPDATE bersyarat
+        with mock.patch.object(Produk, 'kurangi_stok', return_value=False):
+            response, jumlah_query = self.checkout()
+        self.assertRedirects(response, reverse('view_keranjang'), fetch_redirect_response=False)
+        self.assertFalse(Pemesanan.objects.exists())
+        self.assertEqual(daftar_bukti(), sebelum)
+
+
+class StokTest(TestCase):
+    def test_stok_tidak_bisa_negatif(self):
+        produk = buat_produk(stok=3)
+        pemesanan = Pemesanan.objects.create(idPelanggan=buat_pelanggan(), alamatPengiriman='Kupang')
+        # Instance produk yang usang (stok=3) tidak lagi menentukan cukup tidaknya stok
+        Produk.objects.filter(pk=produk.pk).update(stok=1)
+        with self.assertRaisesMessage(ValidationError, 'tidak mencukupi (1)'):
+            DetailPemesanan.objects.create(idPemesanan=pemesanan, idProduk=produk, jumlah=2)
+        self.assertFalse(DetailPemesanan.objects.exists())
+        self.assertEqual(Produk.objects.get(pk=produk.pk).stok, 1)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Produk.objects.filter(pk=produk.pk).update(stok=F('stok') - 2)
+
+
+class HapusStokMasukAdminTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.produk = buat_produk(stok=0)
+        self.stok_masuk_list = [StokMasuk.objects.create(idProduk=self.produk, jumlah=jumlah) for jumlah in (5, 3)]
+
+    def hapus_terpilih(self):
+        data = {'action': 'delete_selected', '_selected_action': [s.pk for s in self.stok_masuk_list], 'post': 'yes'}
+        return self.client.post(reverse('admin:core_stokmasuk_changelist'), data, follow=True)
+
+    def test_bulk_delete_reverses_stock(self):
+        self.assertContains(self.hapus_terpilih(), 'Sukses menghapus 2')
+        self.assertFalse(StokMasuk.objects.exists())
+        self.assertEqual(Produk.objects.get(pk=self.produk.pk).stok, 0)
+        self.assertEqual(MutasiStok.objects.filter(idProduk=self.produk).aggregate(total=Sum('perubahan'))['total'], 0)
+
+    def test_delete_sold_stock_shows_error(self):
+        pemesanan = Pemesanan.objects.create(idPelanggan=buat_pelanggan(), alamatPengiriman='Kupang')
+        pemesanan.add_lines([(self.produk.pk, 4)])
+
+        response = self.hapus_terpilih()
+        self.assertContains(response, 'tidak mencukupi untuk menghapus stok masuk terpilih')
+        self.assertNotContains(response, 'Sukses menghapus')
+        self.assertEqual(StokMasuk.objects.count(), 2)
+        self.assertEqual(Produk.objects.get(pk=self.produk.pk).stok, 4)
+
+        url = reverse('admin:core_stokmasuk_delete', args=[self.stok_masuk_list[0].pk])
+        response = self.client.post(url, {'post': 'yes'}, follow=True)
+        self.assertContains(response, 'tidak mencukupi untuk mengurangi stok masuk ini')
+        self.assertEqual(StokMasuk.objects.count(), 2)
+
+    def ubah(self, jumlah):
+        stok_masuk = self.stok_masuk_list[0]
+        data = {'idProduk': self.produk.pk, 'jumlah': jumlah, 'keterangan': ''}
+        return self.client.post(reverse('admin:core_stokmasuk_change', args=[stok_masuk.pk]), data, follow=True)
+
+    def test_edit_below_sold_stock_shows_error(self):
+        pemesanan = Pemesanan.objects.create(idPelanggan=buat_pelanggan(), alamatPengiriman='Kupang')
+        pemesanan.add_lines([(self.produk.pk, 6)])
+
+        response = self.ubah(1)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'jumlah stok masuk paling sedikit 3')
+        self.assertEqual(StokMasuk.objects.get(pk=self.stok_masuk_list[0].pk).jumlah, 5)
+        self.assertEqual(Produk.objects.get(pk=self.produk.pk).stok, 2)
+
+        self.assertContains(self.ubah(3), 'berhasil diubah')
+        self.assertEqual(Produk.objects.get(pk=self.produk.pk).stok, 0)
+
+    def test_edit_race_shows_error(self):
+        # Stok terjual setelah form divalidasi: UPDATE bersyarat di StokMasuk.save() yang menolak
+        with mock.patch.object(Produk, 'kurangi_stok', return_value=False):
+            response = self.ubah(1)
+        self.assertContains(response, 'tidak mencukupi untuk mengurangi stok masuk ini')
+        self.assertNotContains(response, 'berhasil diubah')
+        self.assertEqual(StokMasuk.objects.get(pk=self.stok_masuk_list[0].pk).jumlah, 5)
+        self.assertFalse(MutasiStok.objects.filter(keterangan__contains='#%d' % self.stok_masuk_list[0].pk)
+                         .exclude(perubahan=5).exists())
+
+
+class MutasiStokTest(TestCase):
+    def setUp(self):
+        self.produk = buat_produk(stok=10)
+        self.pemesanan = Pemesanan.objects.create(idPelanggan=buat_pelanggan(), alamatPengiriman='Kupang')
+
+    def cek_buku_besar(self):
+        total = MutasiStok.objects.filter(idProduk=self.produk).aggregate(total=Sum('perubahan'))['total']
+        self.assertEqual(total, Produk.objects.get(pk=self.produk.pk).stok)
+
+    def test_all_stock_paths_write_ledger(self):
+        stok_masuk = StokMasuk.objects.create(idProduk=self.produk, jumlah=5)
+        detail = DetailPemesanan.objects.create(idPemesanan=self.pemesanan, idProduk=self.produk, jumlah=3)
+        detail.jumlah = 1
+        detail.save()
+        self.pemesanan.add_lines([(self.produk.pk, 2)])
+        stok_masuk.delete()
+        detail.delete()
+        self.cek_buku_besar()
+        self.assertEqual(
+            list(MutasiStok.objects.values_list('jenis', 'perubahan')),
+            [('Saldo Awal', 10), ('Stok Masuk', 5), ('Penjualan', -3), ('Penjualan', 2),
+             ('Penjualan', -2), ('Stok Masuk', -5), ('Penjualan', 1)],
+        )
+
+        # Menyimpan instance lama (misalnya list_editable harga) tidak menimpa stok terbaru
+        self.produk.hargaPerDus = 25000
+        self.produk.save()
+        self.assertEqual(Produk.objects.get(pk=self.produk.pk).stok, 8)
+        self.produk.refresh_from_db()
+        self.produk.stok = 6
+        self.produk.save()
+        self.assertEqual(MutasiStok.objects.last().jenis, 'Koreksi')
+        self.cek_buku_besar()
+
+    def test_stok_pada_tanggal(self):
+        awal = timezone.now()
+        StokMasuk.objects.create(idProduk=self.produk, jumlah=5)
+        SnapshotStok.buat()
+        DetailPemesanan.objects.create(idPemesanan=self.pemesanan, idProduk=self.produk, jumlah=4)
+        MutasiStok.objects.filter(jenis='Penjualan').update(tanggal=timezone.now() + timedelta(seconds=1))
+        sesudah_snapshot = timezone.now()
+
+        self.assertEqual(SnapshotStok.stok_pada(awal)[self.produk.pk], 10)
+        self.assertEqual(SnapshotStok.stok_pada(sesudah_snapshot)[self.produk.pk], 15)
+        self.assertEqual(SnapshotStok.stok_pada(sesudah_snapshot + timedelta(seconds=2))[self.produk.pk], 11)
+        # Snapshot hanya mempercepat; hasilnya sama dengan menjumlah seluruh buku besar
+        SnapshotStok.objects.all().delete()
+        self.assertEqual(SnapshotStok.stok_pada(sesudah_snapshot + timedelta(seconds=2))[self.produk.pk], 11)
+
+        with CaptureQueriesContext(connection) as queries:
+            SnapshotStok.stok_pada(timezone.now())
+        self.assertEqual(len(queries), 1)
+
+
+class PembatalanPesananTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123')
+        cls.pelanggan = buat_pelanggan()
+        cls.sopir = Sopir.objects.create(nama='Yanto', noHp='0812', username='yanto', password='rahasia123')
+
+    def setUp(self):
+        self.produk_list = [buat_produk(f'Produk {i}', harga=1000, stok=20) for i in range(3)]
+
+    def buat_pesanan(self, status='Diproses', **kwargs):
+        pesanan = Pemesanan.objects.create(idPelanggan=self.pelanggan, alamatPengiriman='Kupang', **kwargs)
+        pesanan.add_lines([(produk.pk, 2) for produk in self.produk_list])
+        if status != 'Diproses':
+            pesanan.status = status
+            pesanan.save()
+        return pesanan
+
+    def test_admin_action_cancels_many(self):
+        pesanan_list = [self.buat_pesanan(), self.buat_pesanan('Selesai'), self.buat_pesanan('Dibatalkan')]
+        self.assertEqual(RekapPendapatanHarian.total_pendapatan(), Decimal('6000'))
+        self.client.force_login(self.admin)
+        data = {'action': 'batalkan_pesanan_terpilih', '_selected_action': [p.pk for p in pesanan_list]}
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('admin:core_pemesanan_changelist'), data, follow=True)
+        self.assertContains(response, '2 pesanan dibatalkan')
+
+        self.assertEqual(set(Pemesanan.objects.values_list('status', flat=True)), {'Dibatalkan'})
+        # Pesanan yang sudah dibatalkan sebelumnya tidak mengembalikan stok lagi
+        self.assertEqual(set(Produk.objects.values_list('stok', flat=True)), {18})
+        self.assertEqual(RekapPendapatanHarian.total_pendapatan(), Decimal('0'))
+        for produk in self.produk_list:
+            self.assertEqual(MutasiStok.objects.filter(idProduk=produk).aggregate(total=Sum('perubahan'))['total'], 18)
+        self.assertEqual(len([q for q in queries if 'UPDATE "core_produk"' in q['sql']]), 1)
+        self.assertEqual(len([q for q in queries if 'UPDATE "core_pemesanan"' in q['sql']]), 1)
+
+    def test_change_form_and_sopir_use_same_path(self):
+        pesanan = self.buat_pesanan()
+        self.client.force_login(self.admin)
+        url = reverse('admin:core_pemesanan_change', args=[pesanan.pk])
+        data = {
+            'idPelanggan': self.pelanggan.pk, 'alamatPengiriman': 'Kupang', 'status': 'Dibatalkan',
+            'tanggalPemesanan_0': '2025-01-01', 'tanggalPemesanan_1': '10:00:00',
+            'detailpemesanan_set-TOTAL_FORMS': '0', 'detailpemesanan_set-INITIAL_FORMS': '0',
+        }
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Produk.objects.get(pk=self.produk_list[0].pk).stok, 20)
+
+        pesanan = self.buat_pesanan('Dikirim', idSopir=self.sopir)
+        session = self.client.session
+        session['sopir_id'] = self.sopir.pk
+        session.save()
+        response = self.client.post(reverse('sopir-edit-pengiriman', args=[pesanan.pk]), {'status': 'Dibatalkan'})
+        self.assertRedirects(response, reverse('sopir-dashboard'))
+        self.assertEqual(Pemesanan.objects.get(pk=pesanan.pk).status, 'Dibatalkan')
+        self.assertEqual(Produk.objects.get(pk=self.produk_list[0].pk).stok, 20)
+        self.assertEqual(MutasiStok.objects.filter(jenis='Pembatalan').count(), 6)
+
+    def test_concurrent_change_reported_not_500(self):
+        pesanan = self.buat_pesanan()
+        self.client.force_login(self.admin)
+        gagal = ValidationError('Sebagian pesanan berubah selama pembatalan, silakan coba lagi.')
+        with mock.patch('core.admin.batalkan_pesanan', side_effect=gagal):
+            data = {'action': 'batalkan_pesanan_terpilih', '_selected_action': [pesanan.pk]}
+            response = self.client.post(reverse('admin:core_pemesanan_changelist'), data, follow=True)
+            self.assertContains(response, 'berubah selama pembatalan')
+
+            url = reverse('admin:core_pemesanan_change', args=[pesanan.pk])
+            data = {
+                'idPelanggan': self.pelanggan.pk, 'alamatPengiriman': 'Oesapa', 'status': 'Dibatalkan',
+                'tanggalPemesanan_0': '2025-01-01', 'tanggalPemesanan_1': '10:00:00',
+                'detailpemesanan_set-TOTAL_FORMS': '0', 'detailpemesanan_set-INITIAL_FORMS': '0',
+            }
+            response = self.client.post(url, data, follow=True)
+            self.assertContains(response, 'berubah selama pembatalan')
+        pesanan.refresh_from_db()
+        # Simpanan form ikut dibatalkan, bukan tersimpan setengah
+        self.assertEqual((pesanan.status, pesanan.alamatPengiriman), ('Diproses', 'Kupang'))
+
+
+class KirimPesananTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123')
+        cls.sopir = Sopir.objects.create(nama='Yanto', noHp='0812', username='yanto', password='rahasia123')
+        pelanggan = buat_pelanggan()
+        produk = buat_produk()
+        cls.pesanan_list = []
+        for status in ['Diproses'] * 5 + ['Selesai']:
+            pesanan = Pemesanan.objects.create(idPelanggan=pelanggan, alamatPengiriman='Kupang', status=status)
+            DetailPemesanan.objects.create(idPemesanan=pesanan, idProduk=produk, jumlah=1)
+            cls.pesanan_list.append(pesanan)
+
+    def test_bulk_dispatch(self):
+        self.client.force_login(self.admin)
+        url = reverse('admin:core_pemesanan_changelist')
+        data = {'action': 'kirim_pesanan_terpilih', '_selected_action': [p.pk for p in self.pesanan_list]}
+
+        # Langkah pertama hanya menampilkan pilihan sopir
+        response = self.client.post(url, data)
+        self.assertContains(response, 'Yanto')
+        self.assertFalse(Pemesanan.objects.filter(status='Dikirim').exists())
+
+        stok = Produk.objects.get().stok
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {**data, 'kirim': 'Kirim', 'idSopir': self.sopir.pk}, follow=True)
+        self.assertContains(response, '5 pesanan dikirim oleh Yanto')
+        self.assertContains(response, '1 pesanan dilewati')
+        self.assertEqual(Pemesanan.objects.filter(status='Dikirim', idSopir=self.sopir).count(), 5)
+        self.assertEqual(Pemesanan.objects.get(pk=self.pesanan_list[-1].pk).status, 'Selesai')
+        # Baris pesanan dan stok tidak disentuh
+        self.assertFalse([q for q in queries if '"core_detailpemesanan"' in q['sql'] or 'UPDATE "core_produk"' in q['sql']])
+        self.assertEqual(len([q for q in queries if 'UPDATE "core_pemesanan"' in q['sql']]), 1)
+        self.assertEqual(Produk.objects.get().stok, stok)
+
+
+class ImporStokMasukTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:core_stokmasuk_impor')
+        self.produk_list = [buat_produk(f'Produk {i}', stok=0) for i in range(3)]
+
+    def unggah(self, isi, nama='stok.csv'):
+        return self.client.post(self.url, {'file': SimpleUploadedFile(nama, isi.encode('utf-8'))}, follow=True)
+
+    def test_impor_tsv_in_few_queries(self):
+        baris = ['produk\tjumlah\tketerangan'] + [
+            f'{self.produk_list[i % 3].pk if i % 2 else self.produk_list[i % 3].namaProduk}\t2\tDepot {i}'
+            for i in range(500)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.unggah('\n'.join(baris), 'stok.tsv')
+        self.assertContains(response, '500 stok masuk untuk 3 produk berhasil diimpor')
+        self.assertEqual(StokMasuk.objects.count(), 500)
+        self.assertEqual(sorted(Produk.objects.values_list('stok', flat=True)), [332, 334, 334])
+        self.assertEqual(MutasiStok.objects.filter(jenis='Stok Masuk').count(), 3)
+        # Satu query produk, bulk_create per batch, satu UPDATE stok, satu bulk_create mutasi
+        query_tulis = [q for q in queries if q['sql'].startswith(('INSERT', 'UPDATE')) and '"core_' in q['sql']]
+        self.assertLessEqual(len(query_tulis), 6)
+        self.assertEqual(len([q for q in query_tulis if 'UPDATE "core_produk"' in q['sql']]), 1)
+
+    def test_changelist_links_import(self):
+        self.assertContains(self.client.get(reverse('admin:core_stokmasuk_changelist')), self.url)
+
+    def test_satu_baris_salah_membatalkan_semua(self):
+        isi = 'produk,jumlah\nProduk 0,5\nTidak Ada,3\nProduk 1,-2\nProduk 2,²\n①,4\n'
+        response = self.unggah(isi)
+        self.assertContains(response, 'Baris 3: produk &quot;Tidak Ada&quot; tidak ditemukan.')
+        self.assertContains(response, 'Baris 4: jumlah &quot;-2&quot;')
+        # Karakter yang lolos str.isdigit() tetapi bukan angka ASCII menjadi kesalahan per baris
+        self.assertContains(response, 'Baris 5: jumlah &quot;²&quot;')
+        self.assertContains(response, 'Baris 6: produk &quot;①&quot; tidak ditemukan.')
+        self.assertFalse(StokMasuk.objects.exists())
+        self.assertEqual(set(Produk.objects.values_list('stok', flat=True)), {0})
+
+    def test_angka_non_ascii_dan_terlalu_besar_ditolak(self):
+        isi = ('produk,jumlah\nProduk 0,\u0663\nProduk 1,1_000\nProduk 2,99999999999999999999999\n'
+               '99999999999999999999999,1\nProduk 0,2147483647\n')
+        response = self.unggah(isi)
+        self.assertContains(response, 'Baris 2: jumlah &quot;\u0663&quot;')
+        self.assertContains(response, 'Baris 3: jumlah &quot;1_000&quot;')
+        self.assertContains(response, 'Baris 4: jumlah &quot;99999999999999999999999&quot;')
+        self.assertContains(response, 'Baris 5: produk &quot;99999999999999999999999&quot; tidak ditemukan.')
+        self.assertNotContains(response, 'Baris 6:')
+        self.assertFalse(StokMasuk.objects.exists())
+        self.assertEqual(set(Produk.objects.values_list('stok', flat=True)), {0})
+
+
+class StokKonkurenTest(TransactionTestCase):
+    def test_checkout_bersamaan_tidak_oversell(self):
+        produk = buat_produk(stok=12)
+        pelanggan = buat_pelanggan()
+        jumlah_thread, percobaan_per_thread, batas_ulang = 8, 3, 50
+        mulai = threading.Barrier(jumlah_thread)
+        hasil = {'berhasil': 0, 'ditolak': 0, 'menyerah': 0}
+        hasil_lock = threading.Lock()
+
+        def checkout():
+            mulai.wait()
+            try:
+                for i in range(percobaan_per_thread):
+                    status = 'menyerah'
+                    for ulang in range(batas_ulang):
+                        try:
+                            with transaction.atomic():
+                                pemesanan = Pemesanan.objects.create(idPelanggan=pelanggan, alamatPengiriman='Kupang')
+                                DetailPemesanan.objects.create(idPemesanan=pemesanan, idProduk=produk, jumlah=1)
+                            status = 'berhasil'
+                        except ValidationError:
+                            status = 'ditolak'
+                        except OperationalError:
+                            # SQLite menolak penulis kedua selagi tabel terkunci; coba lagi sampai batas_ulang
+                            time.sleep(random.uniform(0, 0.02))
+                            continue
+                        break
+                    with hasil_lock:
+                        hasil[status] += 1
+            finally:
+                connection.close()
+
+        thread_list = [threading.Thread(target=checkout) for i in range(jumlah_thread)]
+        for thread in thread_list:
+            thread.start()
+        for thread in thread_list:
+            thread.join()
+
+        self.assertEqual(hasil, {'berhasil': 12, 'ditolak': jumlah_thread * percobaan_per_thread - 12, 'menyerah': 0})
+        # Percobaan yang ditolak atau terkunci tidak meninggalkan pesanan
+        self.assertEqual(Pemesanan.objects.count(), 12)
+        self.assertEqual(Produk.objects.get(pk=produk.pk).stok, 0)
+        self.assertEqual(DetailPemesanan.objects.aggregate(total=Sum('jumlah'))['total'], 12)
+
+
+class DashboardDeretWaktuTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123')
+        RekapPendapatanHarian.objects.create(tanggal=date(2025, 3, 3), jumlahPesanan=2, pendapatan=30000)
+        RekapPendapatanHarian.objects.create(tanggal=date(2025, 3, 9), jumlahPesanan=1, pendapatan=10000)
+        RekapPendapatanHarian.objects.create(tanggal=date(2025, 3, 10), jumlahPesanan=1, pendapatan=5000)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:dashboard-deret-waktu')
+
+    def test_deret_mingguan(self):
+        response = self.client.get(self.url, {'granularitas': 'mingguan', 'tgl_mulai': '2025-03-01', 'tgl_akhir': '2025-03-16'})
+        self.assertEqual(response.status_code, 200)
+        deret = response.json()
+        self.assertEqual(deret['periode'], ['2025-02-24', '2025-03-03', '2025-03-10'])
+        self.assertEqual(deret['jumlah_pesanan_selesai'], [0, 3, 1])
+        self.assertEqual(deret['pendapatan'], [0.0, 40000.0, 5000.0])
+
+    def test_deret_harian_dan_bulanan(self):
+        harian = self.client.get(self.url, {'granularitas': 'harian', 'tgl_mulai': '2025-03-09', 'tgl_akhir': '2025-03-11'}).json()
+        self.assertEqual(harian['pendapatan'], [10000.0, 5000.0, 0.0])
+        bulanan = self.client.get(self.url, {'granularitas': 'bulanan', 'tgl_mulai': '2025-02-01', 'tgl_akhir': '2025-03-31'}).json()
+        self.assertEqual(bulanan['labels'], ['Feb 25', 'Mar 25'])
+        self.assertEqual(bulanan['pendapatan'], [0.0, 45000.0])
+
+    def test_deret_counts_only_selesai(self):
+        pelanggan = buat_pelanggan()
+        tanggal = timezone.make_aware(datetime(2025, 4, 2, 10))
+        for status in ('Diproses', 'Dikirim', 'Selesai', 'Dibatalkan'):
+            Pemesanan.objects.create(idPelanggan=pelanggan, alamatPengiriman='Kupang', total=1000,
+                                     status=status, tanggalPemesanan=tanggal)
+        deret = self.client.get(self.url, {'granularitas': 'harian', 'tgl_mulai': '2025-04-02', 'tgl_akhir': '2025-04-02'}).json()
+        self.assertNotIn('jumlah_pesanan', deret)
+        self.assertEqual(deret['jumlah_pesanan_selesai'], [1])
+        self.assertEqual(deret['pendapatan'], [1000.0])
+
+    def test_deret_not_modified(self):
+        params = {'granularitas': 'harian', 'tgl_mulai': '2025-03-01', 'tgl_akhir': '2025-03-31'}
+        response = self.client.get(self.url, params)
+        etag = response['ETag']
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Cache per proses tidak dipakai: worker lain yang tidak menangani perubahan tetap 304
+        bump_dashboard_version()
+        cache.clear()
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # Perubahan data dari proses mana pun menaikkan versi di database
+        Pemesanan.objects.create(idPelanggan=buat_pelanggan(), alamatPengiriman='Kupang', status='Selesai',
+                                 total=1000, tanggalPemesanan=timezone.make_aware(datetime(2025, 3, 5)))
+        jalankan_on_commit()
+        response = self.client.get(self.url, params, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['jumlah_pesanan_selesai'][4], 1)
+
+    def test_deret_invalid(self):
+        self.assertEqual(self.client.get(self.url, {'granularitas': 'tahunan'}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'tgl_mulai': 'kemarin'}).status_code, 400)
+
+
+class LaporanPelangganTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123')
+        cls.pelanggan = buat_pelanggan()
+        for total, status in [(10000, 'Selesai'), (15000, 'Diproses')]:
+            Pemesanan.objects.create(idPelanggan=cls.pelanggan, alamatPengiriman='Kupang', total=total, status=status)
+        buat_pelanggan(username='tanpa_pesanan', nama='Ani')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def hitung_query(self, render):
+        with CaptureQueriesContext(connection) as queries:
+            render()
+        return len(queries)
+
+    def test_statistik_totals(self):
+        pelanggan_list = {p.username: p for p in LaporanPelanggan().get_queryset(FilterLaporan())}
+        budi = pelanggan_list['budi']
+        self.assertEqual(budi.totalPembelian, Decimal('25000'))
+        self.assertEqual(budi.jumlahPesanan, 2)
+        self.assertIsNotNone(budi.pesananTerakhir)
+        self.assertEqual(pelanggan_list['tanpa_pesanan'].totalPembelian, Decimal('0'))
+        self.assertEqual(pelanggan_list['tanpa_pesanan'].jumlahPesanan, 0)
+
+    def test_statistik_follows_orders(self):
+        def statistik():
+            return Pelanggan.objects.values_list(*Pelanggan.FIELD_STATISTIK).get(pk=self.pelanggan.pk)
+
+        produk = buat_produk()
+        pesanan = Pemesanan.objects.create(idPelanggan=self.pelanggan, alamatPengiriman='Kupang',
+                                           tanggalPemesanan=timezone.now() + timedelta(days=1))
+        pesanan.add_lines([(produk.pk, 2)])
+        self.assertEqual(statistik(), (Decimal('65000'), 3, pesanan.tanggalPemesanan))
+
+        # Menyimpan profil pelanggan dari instance lama tidak menimpa statistik
+        self.pelanggan.alamat = 'Oesapa'
+        self.pelanggan.save()
+        self.assertEqual(statistik()[:2], (Decimal('65000'), 3))
+
+        batalkan_pesanan(Pemesanan.objects.filter(pk=pesanan.pk))
+        total, jumlah, terakhir = statistik()
+        self.assertEqual((total, jumlah), (Decimal('25000'), 2))
+        self.assertLess(terakhir, pesanan.tanggalPemesanan)
+
+        Pemesanan.objects.filter(idPelanggan=self.pelanggan, status='Diproses').get().delete()
+        self.assertEqual(statistik()[:2], (Decimal('10000'), 1))
+
+        sebelum = statistik()
+        Pelanggan.objects.update(jumlahPesanan=99)
+        call_command('rekonsiliasi_pelanggan', stdout=StringIO())
+        self.assertEqual(statistik(), sebelum)
+
+    def test_statistik_excludes_dibatalkan(self):
+        # Berbeda dengan laporan lama yang menjumlahkan semua pesanan, pesanan batal tidak dihitung
+        Pemesanan.objects.create(idPelanggan=self.pelanggan, alamatPengiriman='Kupang', total=99000, status='Dibatalkan')
+        budi = Pelanggan.objects.get(pk=self.pelanggan.pk)
+        self.assertEqual((budi.jumlahPesanan, budi.totalPembelian), (2, Decimal('25000')))
+        response = self.client.get(reverse('admin:laporan-pelanggan'))
+        self.assertContains(response, 'tidak termasuk pesanan yang dibatalkan')
+
+    def test_admin_bulk_delete_updates_statistik(self):
+        pesanan_list = list(Pemesanan.objects.filter(idPelanggan=self.pelanggan))
+        pesanan_list.append(Pemesanan.objects.create(idPelanggan=self.pelanggan, alamatPengiriman='Kupang',
+                                                     total=5000, status='Dibatalkan'))
+        data = {'action': 'delete_selected', '_selected_action': [p.pk for p in pesanan_list[1:]], 'post': 'yes'}
+        self.client.post(reverse('admin:core_pemesanan_changelist'), data)
+        budi = Pelanggan.objects.get(pk=self.pelanggan.pk)
+        self.assertEqual((budi.jumlahPesanan, budi.totalPembelian), (1, Decimal(str(pesanan_list[0].total))))
+        self.assertEqual(budi.pesananTerakhir, pesanan_list[0].tanggalPemesanan)
+
+    def test_pelanggan_home_shows_statistik(self):
+        self.client.force_login(self.admin)
+        session = self.client.session
+        session['pelanggan_id'] = self.pelanggan.pk
+        session.save()
+        response = self.client.get(reverse('pelanggan_home'))
+        self.assertContains(response, 'Rp 25.000')
+        self.assertContains(self.client.get(reverse('admin:core_pelanggan_changelist')), 'Rp 25.000')
+
+    def test_constant_queries(self):
+        preview = lambda: self.assertEqual(self.client.get(reverse('admin:laporan-pelanggan')).status_code, 200)
+        pdf = lambda: build_laporan_pdf(LAPORAN['pelanggan'], FilterLaporan(), BytesIO())
+        for nama, render in [('preview', preview), ('pdf', pdf)]:
+            sebelum = self.hitung_query(render)
+            pelanggan_list = Pelanggan.objects.bulk_create([
+                Pelanggan(nama='Baru', noWa='0812', alamat='Kupang', username=f'{nama}{i}', password='x')
+                for i in range(5)
+            ])
+            Pemesanan.objects.bulk_create([
+                Pemesanan(idPelanggan=pelanggan, alamatPengiriman='Kupang', total=5000) for pelanggan in pelanggan_list
+            ])
+            self.assertEqual(self.hitung_query(render), sebelum)
+
+    def test_preview_paginated(self):
+        Pelanggan.objects.bulk_create([
+            Pelanggan(nama=f'Pelanggan {i:03d}', noWa='0812', alamat='Kupang', username=f'p{i:03d}', password='x')
+            for i in range(60)
+        ])
+        response = self.client.get(reverse('admin:laporan-pelanggan'), {'page': 2})
+        self.assertEqual(len(response.context['pelanggan_list']), 12)
+        self.assertEqual(response.context['page_obj'].paginator.count, 62)
+
+
+class LaporanProdukTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123')
+        pelanggan = buat_pelanggan()
+        cls.galon = buat_produk(stok=100)
+        cls.botol = buat_produk(nama='Aqua Botol', harga=5000, stok=5)
+        cls.gelas = buat_produk(nama='Aqua Gelas', harga=3000, stok=8)
+        lama = Pemesanan.objects.create(idPelanggan=pelanggan, alamatPengiriman='Kupang',
+                                        tanggalPemesanan=timezone.now() - timedelta(days=60))
+        baru = Pemesanan.objects.create(idPelanggan=pelanggan, alamatPengiriman='Kupang')
+        DetailPemesanan.objects.create(idPemesanan=lama, idProduk=cls.galon, jumlah=7)
+        DetailPemesanan.objects.create(idPemesanan=baru, idProduk=cls.galon, jumlah=2)
+        DetailPemesanan.objects.create(idPemesanan=baru, idProduk=cls.botol, jumlah=3)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_total_terjual(self):
+        terjual = {p.idProduk: p.total_terjual for p in LaporanProduk().get_queryset(FilterLaporan())}
+        self.assertEqual(terjual, {self.galon.pk: 9, self.botol.pk: 3, self.gelas.pk: 0})
+
+        tgl_mulai = timezone.localdate() - timedelta(days=7)
+        terjual = {p.idProduk: p.total_terjual for p in LaporanProduk().get_queryset(FilterLaporan(tgl_mulai=tgl_mulai))}
+        self.assertEqual(terjual, {self.galon.pk: 2, self.botol.pk: 3, self.gelas.pk: 0})
+
+    def test_filter_modes(self):
+        terlaris = [p.idProduk for p in LaporanProduk().get_queryset(FilterLaporan(filter_tipe='terlaris'))]
+        self.assertEqual(terlaris, [self.galon.pk, self.botol.pk, self.gelas.pk])
+        menipis = [p.idProduk for p in LaporanProduk().get_queryset(FilterLaporan(filter_tipe='stok_menipis', batas_stok=5))]
+        self.assertEqual(menipis, [self.botol.pk])
+
+    def test_report_query_count(self):
+        with self.assertNumQueries(1):
+            list(LaporanProduk().get_queryset(FilterLaporan(date(2020, 1, 1), date(2030, 12, 31), filter_tipe='terlaris')))
+
+        for params in [{}, {'filter_tipe': 'terlaris', 'tgl_mulai': '2020-01-01'}, {'filter_tipe': 'stok_menipis'}]:
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('admin:laporan-produk'), params)
+            # Di luar query sesi/izin admin, laporan hanya boleh menjalankan satu query
+            query_laporan = [q for q in queries if '"core_' in q['sql']]
+            self.assertEqual(len(query_laporan), 1, params)
+
+            with self.assertNumQueries(1):
+                build_laporan_pdf(LAPORAN['produk'], FilterLaporan.from_querydict(params), BytesIO())
+
+
+class LaporanSopirKendaraanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123')
+        cls.pelanggan = buat_pelanggan()
+        cls.sopir = Sopir.objects.create(nama='Yosef', noHp='0813', username='yosef', password='rahasia123')
+        Kendaraan.objects.create(nomorPlat='DH 1 AB', nama='Truk Besar', jenis='Roda 6', idSopir=cls.sopir)
+        Kendaraan.objects.create(nomorPlat='DH 2 AB', nama='Pick Up', idSopir=cls.sopir)
+        for status in ['Dikirim', 'Selesai', 'Selesai', 'Dibatalkan']:
+            Pemesanan.objects.create(idPelanggan=cls.pelanggan, alamatPengiriman='Kupang', status=status, idSopir=cls.sopir)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def test_counts_and_all_vehicles(self):
+        sopir = LaporanSopirKendaraan().get_queryset(FilterLaporan()).get()
+        self.assertEqual((sopir.pesanan_dikirim, sopir.pesanan_selesai, sopir.pesanan_dibatalkan), (1, 2, 1))
+        self.assertEqual([k.nomorPlat for k in sopir.kendaraan_list], ['DH 1 AB', 'DH 2 AB'])
+
+    def test_constant_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:laporan-sopir-kendaraan'), {'tgl_mulai': '2020-01-01'})
+        self.assertEqual(response.status_code, 200)
+        # Satu query sopir teranotasi + satu prefetch kendaraan
+        query_laporan = [q for q in queries if '"core_' in q['sql']]
+        self.assertEqual(len(query_laporan), 2)
+
+        with self.assertNumQueries(2):
+            build_laporan_pdf(LAPORAN['sopir-kendaraan'], FilterLaporan(tgl_mulai=date(2020, 1, 1)), BytesIO())
+
+
+class FilterLaporanTest(TestCase):
+    def test_parse_valid(self):
+        filter_laporan = FilterLaporan.from_querydict(QueryDict(
+            'tgl_mulai=2025-01-01&tgl_akhir=2025-01-31&status_pesanan=Selesai&filter_tipe=terlaris&batas_stok=5'
+        ))
+        self.assertEqual(filter_laporan.errors, [])
+        self.assertEqual((filter_laporan.tgl_mulai, filter_laporan.tgl_akhir), (date(2025, 1, 1), date(2025, 1, 31)))
+        self.assertEqual(filter_laporan.periode, '2025-01-01 - 2025-01-31')
+        self.assertEqual(filter_laporan.as_params(), {
+            'tgl_mulai': '2025-01-01', 'tgl_akhir': '2025-01-31', 'status_pesanan': 'Selesai',
+            'filter_tipe': 'terlaris', 'batas_stok': '5',
+        })
+
+    def test_parse_invalid(self):
+        filter_laporan = FilterLaporan.from_querydict(QueryDict(
+            'tgl_mulai=kemarin&tgl_akhir=&status_pesanan=Hilang&filter_tipe=x&batas_stok=banyak'
+        ))
+        self.assertEqual(len(filter_laporan.errors), 4)
+        self.assertEqual(filter_laporan.as_params(), {})
+
+    def test_tanggal_di_ujung_kalender_diabaikan(self):
+        filter_laporan = FilterLaporan.from_querydict(QueryDict('tgl_mulai=0001-01-01&tgl_akhir=9999-12-31'))
+        self.assertEqual(len(filter_laporan.errors), 2)
+        self.assertEqual((filter_laporan.tgl_mulai, filter_laporan.tgl_akhir), (None, None))
+        self.assertEqual(filter_laporan.rentang_waktu, (None, None))
+        # Diperiksa setelah rentang ditukar; ujung yang tidak meluap tetap dipakai
+        filter_laporan = FilterLaporan.from_querydict(QueryDict('tgl_mulai=9999-12-31&tgl_akhir=0001-01-02'))
+        self.assertEqual((filter_laporan.tgl_mulai, filter_laporan.tgl_akhir), (date(1, 1, 2), None))
+        for nama in ['produk', 'pemesanan-pendapatan', 'feedback']:
+            list(LAPORAN[nama].get_queryset(filter_laporan))
+
+    def test_swapped_range(self):
+        filter_laporan = FilterLaporan.from_querydict(QueryDict('tgl_mulai=2025-02-01&tgl_akhir=2025-01-01'))
+        self.assertEqual((filter_laporan.tgl_mulai, filter_laporan.tgl_akhir), (date(2025, 1, 1), date(2025, 2, 1)))
+
+    def test_rentang_waktu_follows_local_day(self):
+        pelanggan = buat_pelanggan()
+        tz = timezone.get_default_timezone()
+        for jam in [(0, 0), (23, 30)]:
+            Pemesanan.objects.create(idPelanggan=pelanggan, alamatPengiriman='Kupang', status='Selesai',
+                                     tanggalPemesanan=timezone.make_aware(datetime(2025, 1, 31, *jam), tz))
+        Pemesanan.objects.create(idPelanggan=pelanggan, alamatPengiriman='Kupang', status='Selesai',
+                                 tanggalPemesanan=timezone.make_aware(datetime(2025, 2, 1), tz))
+        laporan = LAPORAN['pemesanan-pendapatan']
+        filter_laporan = FilterLaporan(tgl_mulai=date(2025, 1, 31), tgl_akhir=date(2025, 1, 31))
+        self.assertEqual(laporan.get_queryset(filter_laporan).count(), 2)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT_TEST)
+class LaporanViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123')
+        pelanggan = buat_pelanggan()
+        Feedback.objects.create(idPelanggan=pelanggan, isi='Pengiriman cepat sekali, terima kasih banyak!')
+        for status, total in [('Selesai', 10000), ('Dikirim', 20000)]:
+            Pemesanan.objects.create(idPelanggan=pelanggan, alamatPengiriman='Kupang', total=total, status=status)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_all_reports_render(self):
+        for nama in LAPORAN:
+            url_name = 'core_pemesanan_laporan' if nama == 'pemesanan-pendapatan' else f'laporan-{nama}'
+            response = self.client.get(reverse(f'admin:{url_name}'))
+            self.assertEqual(response.status_code, 200, nama)
+            self.assertEqual(self.cetak_pdf(nama)['Content-Type'], 'application/pdf')
+
+    def cetak_pdf(self, nama, params=None):
+        """Antrekan PDF lewat admin, kerjakan job-nya seperti worker, lalu unduh hasilnya."""
+        response = self.client.get(reverse(f'admin:laporan-{nama}-pdf'), params or {})
+        job = LaporanJob.objects.latest('idJob')
+        self.assertRedirects(response, reverse('admin:laporan-job-status', args=[job.idJob]))
+        self.assertEqual(self.client.get(response.url).status_code, 200)
+        self.assertFalse(self.client.get(reverse('admin:laporan-job-status-json', args=[job.idJob])).json()['selesai'])
+
+        self.assertEqual(klaim_job(5), [job.idJob])
+        self.assertEqual(proses_job(job.idJob), 'Selesai')
+        status = self.client.get(reverse('admin:laporan-job-status-json', args=[job.idJob])).json()
+        response = self.client.get(status['url_unduh'])
+        self.assertEqual(response.status_code, 200, nama)
+        b''.join(response.streaming_content)
+        response.close()
+        return response
+
+    def test_pdf_engine_keeps_sample_styles(self):
+        from reportlab.lib.styles import getSampleStyleSheet
+        ukuran_judul = pdf_engine._sample_styles['Title'].fontSize
+        for i in range(2):
+            buffer = BytesIO()
+            build_laporan_pdf(LAPORAN['feedback'], FilterLaporan(), buffer)
+            self.assertTrue(buffer.getvalue().startswith(b'%PDF'))
+        self.assertEqual(pdf_engine._sample_styles['Title'].fontSize, ukuran_judul)
+        self.assertEqual(getSampleStyleSheet()['Title'].fontSize, ukuran_judul)
+        self.assertEqual(pdf_engine.STYLE_JUDUL.fontSize, 12)
+
+    def test_pdf_large_report_in_chunks(self):
+        pelanggan = Pelanggan.objects.get()
+        Pemesanan.objects.bulk_create([
+            Pemesanan(idPelanggan=pelanggan, alamatPengiriman='Kupang', total=1000, status='Diproses')
+            for i in range(248)
+        ])
+        laporan = LAPORAN['pemesanan-pendapatan']
+        tabel_list = list(pdf_engine.iter_tabel(laporan.kolom, laporan.get_rows(FilterLaporan())))
+        self.assertEqual([len(tabel._cellvalues) for tabel in tabel_list], [101, 101, 51])
+        self.assertTrue(all(tabel._cellvalues[0][0] == 'No.' and tabel.repeatRows == 1 for tabel in tabel_list))
+        self.assertEqual(tabel_list[-1]._cellvalues[-1][0], '250')
+
+        with build_laporan_pdf_file(laporan, FilterLaporan()) as spool:
+            isi = spool.read()
+        self.assertTrue(isi.startswith(b'%PDF'))
+        self.assertGreater(isi.count(b'/Type /Page\n'), 3)
+
+    def test_pdf_cache_and_single_flight(self):
+        url = reverse('admin:laporan-pemesanan-pendapatan-pdf')
+        self.client.get(url, {'status_pesanan': 'Selesai'})
+        # Permintaan identik yang datang selagi job masih antre memakai job yang sama
+        self.client.get(url, {'status_pesanan': 'Selesai'})
+        job = LaporanJob.objects.get()
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            LaporanJob.objects.create(laporan=job.laporan, kunci=job.kunci)
+
+        klaim_job(5)
+        proses_job(job.idJob)
+        response = self.client.get(url, {'status_pesanan': 'Selesai'})
+        url_unduh = reverse('admin:laporan-job-unduh', args=[job.idJob])
+        self.assertRedirects(response, url_unduh, fetch_redirect_response=False)
+        self.assertEqual(LaporanJob.objects.count(), 1)
+
+        response = self.client.get(url_unduh)
+        response.close()
+        self.assertEqual(response['ETag'], f'"{job.kunci}"')
+        self.assertEqual(self.client.get(url_unduh, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url_unduh, HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+
+        # Perubahan data mengganti versi setelah commit, sehingga PDF lama tidak dipakai lagi
+        Pemesanan.objects.create(idPelanggan=Pelanggan.objects.get(), alamatPengiriman='Kupang', status='Selesai')
+        jalankan_on_commit()
+        self.client.get(url, {'status_pesanan': 'Selesai'})
+        self.assertEqual(LaporanJob.objects.count(), 2)
+        self.assertNotEqual(LaporanJob.objects.latest('idJob').kunci, job.kunci)
+
+    def test_tanggal_di_ujung_kalender_tidak_500(self):
+        params = {'tgl_mulai': '0001-01-01', 'tgl_akhir': '9999-12-31'}
+        for url_name in ['laporan-produk', 'core_pemesanan_laporan', 'laporan-feedback']:
+            response = self.client.get(reverse(f'admin:{url_name}'), params)
+            self.assertContains(response, 'di luar rentang yang didukung')
+        response = self.client.get(reverse('admin:laporan-feedback-csv'), params)
+        self.assertEqual(response.status_code, 200)
+        b''.join(response.streaming_content)
+
+    def test_versi_laporan_shared_across_processes(self):
+        versi = get_versi_laporan()
+        # Cache per proses boleh kosong (proses lain, restart); versi dibaca dari database
+        cache.clear()
+        self.assertEqual(get_versi_laporan(), versi)
+
+        call_command('rebuild_rekap_pendapatan', stdout=StringIO())
+        jalankan_on_commit()
+        versi_rekap = get_versi_laporan()
+        self.assertGreater(versi_rekap, versi)
+        call_command('rekonsiliasi_pelanggan', stdout=StringIO())
+        jalankan_on_commit()
+        self.assertGreater(get_versi_laporan(), versi_rekap)
+
+    def test_versi_laporan_naik_sekali_setelah_commit(self):
+        jalankan_on_commit()
+        versi = get_versi_laporan()
+        with CaptureQueriesContext(connection) as queries, transaction.atomic():
+            pelanggan = buat_pelanggan('baru', noWa='08129999999')
+            pemesanan = Pemesanan.objects.create(idPelanggan=pelanggan, alamatPengiriman='Kupang')
+            pemesanan.add_lines([(buat_produk(stok=5).pk, 1)])
+        # Tidak ada UPDATE versi di dalam transaksi penulis, dan hanya satu yang dijadwalkan
+        self.assertFalse([q for q in queries if '"core_versilaporan"' in q['sql']])
+        self.assertEqual(len([c for _, c, _ in connection.run_on_commit if c.__name__ == '_naikkan_versi_laporan']), 1)
+        self.assertEqual(get_versi_laporan(), versi)
+        jalankan_on_commit()
+        self.assertGreater(get_versi_laporan(), versi)
+
+    def test_bersihkan_cache_laporan(self):
+        def simpan(path, umur_jam):
+            path = default_storage.save(path, ContentFile(b'%PDF'))
+            waktu = (timezone.now() - timedelta(hours=umur_jam)).timestamp()
+            os.utime(default_storage.path(path), (waktu, waktu))
+            return path
+
+        lama = timezone.now() - timedelta(days=2)
+        job_lama = LaporanJob.objects.create(laporan='produk', status='Selesai', tanggalSelesai=lama,
+                                             file=simpan('laporan_job/1_produk.pdf', 48))
+        LaporanJob.objects.create(laporan='produk', kunci='a' * 64, status='Gagal', tanggalSelesai=lama)
+        job_baru = LaporanJob.objects.create(laporan='produk', kunci='b' * 64, status='Selesai',
+                                             tanggalSelesai=timezone.now(), file=simpan(f'laporan_cache/{"b" * 64}.pdf', 48))
+        # Job aktif belum mengisi `file`, tetapi path kuncinya sudah mungkin ditulis
+        LaporanJob.objects.create(laporan='semua', kunci='c' * 64, status='Diproses')
+        dipakai_aktif = simpan(f'laporan_cache/{"c" * 64}.zip', 48)
+        usang = simpan(f'laporan_cache/{"d" * 64}.pdf', 48)
+        baru_dirender = simpan(f'laporan_cache/{"e" * 64}.pdf', 0)
+
+        output = StringIO()
+        call_command('bersihkan_laporan_cache', stdout=output)
+        self.assertIn('2 job dan 1 file', output.getvalue())
+        self.assertFalse(LaporanJob.objects.filter(status='Gagal').exists())
+        self.assertFalse(LaporanJob.objects.filter(pk=job_lama.pk).exists())
+        self.assertFalse(default_storage.exists(job_lama.file.name))
+        self.assertFalse(default_storage.exists(usang))
+        for path in [job_baru.file.name, dipakai_aktif, baru_dirender]:
+            self.assertTrue(default_storage.exists(path), path)
+
+    def test_bundel_zip(self):
+        filter_laporan = FilterLaporan(tgl_mulai=date(2020, 1, 1), tgl_akhir=date(2030, 12, 31))
+        url = reverse('admin:laporan-semua-zip')
+        response = self.client.get(url, filter_laporan.as_params())
+        job = LaporanJob.objects.get()
+        self.assertRedirects(response, reverse('admin:laporan-job-status', args=[job.idJob]),
+                             fetch_redirect_response=False)
+        # Klik berulang selagi job masih antre memakai job yang sama
+        self.client.get(url, filter_laporan.as_params())
+        self.assertEqual(LaporanJob.objects.count(), 1)
+
+        klaim_job(5)
+        self.assertEqual(proses_job(job.idJob), 'Selesai')
+        response = self.client.get(url, filter_laporan.as_params())
+        url_unduh = reverse('admin:laporan-job-unduh', args=[job.idJob])
+        self.assertRedirects(response, url_unduh, fetch_redirect_response=False)
+
+        response = self.client.get(url_unduh)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertIn('laporan_viquam_2020-01-01_2030-12-31.zip', response['Content-Disposition'])
+        with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as arsip:
+            self.assertEqual(sorted(arsip.namelist()), sorted(laporan.filename for laporan in LAPORAN.values()))
+            self.assertTrue(all(arsip.read(nama).startswith(b'%PDF') for nama in arsip.namelist()))
+
+        # PDF hasil bundel sudah ada di cache untuk "Cetak PDF" dengan filter yang sama
+        self.client.get(reverse('admin:laporan-feedback-pdf'), filter_laporan.as_params())
+        self.assertTrue(default_storage.exists(f'laporan_cache/{LaporanJob.objects.latest("idJob").kunci}.pdf'))
+
+    def test_job_claimed_once(self):
+        job = buat_job(LAPORAN['feedback'], FilterLaporan())
+        self.assertEqual(klaim_job(5), [job.idJob])
+        self.assertEqual(klaim_job(5), [])
+        # Job yang ditinggal worker mati diklaim ulang setelah timeout
+        LaporanJob.objects.filter(pk=job.pk).update(tanggalMulai=timezone.now() - timedelta(hours=1))
+        self.assertEqual(klaim_job(5), [job.idJob])
+
+    def test_job_gagal(self):
+        job = LaporanJob.objects.create(laporan='tidak-ada')
+        klaim_job(5)
+        self.assertEqual(proses_job(job.idJob), 'Gagal')
+        self.assertEqual(self.client.get(reverse('admin:laporan-job-unduh', args=[job.idJob])).status_code, 404)
+
+    def test_streaming_exports(self):
+        for nama in LAPORAN:
+            for format_ekspor in ['csv', 'xlsx']:
+                response = self.client.get(reverse(f'admin:laporan-{nama}-{format_ekspor}'))
+                self.assertEqual(response.status_code, 200, nama)
+                self.assertTrue(response.streaming)
+                b''.join(response.streaming_content)
+
+        response = self.client.get(reverse('admin:laporan-pemesanan-pendapatan-csv'), {'status_pesanan': 'Selesai'})
+        baris = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()
+        self.assertEqual(baris[0], 'Tanggal,Pelanggan,Alamat,Status,Total')
+        self.assertEqual(baris[1].split(',')[1:], ['Budi', 'Kupang', 'Selesai', '10000.00'])
+        self.assertEqual(len(baris), 2)
+
+        response = self.client.get(reverse('admin:laporan-feedback-xlsx'))
+        with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as arsip:
+            sheet = arsip.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertIn('Pengiriman cepat sekali', sheet)
+        self.assertEqual(sheet.count('<row '), 2)
+
+    def test_ekspor_menetralkan_rumus(self):
+        pelanggan = Pelanggan.objects.get()
+        Feedback.objects.create(idPelanggan=pelanggan, isi='=HYPERLINK("http://x")')
+        Feedback.objects.create(idPelanggan=pelanggan, isi='-1+1 tetap teks biasa')
+
+        response = self.client.get(reverse('admin:laporan-feedback-csv'))
+        isi = b''.join(response.streaming_content).decode('utf-8-sig')
+        self.assertIn('"\'=HYPERLINK(""http://x"")"', isi)
+        self.assertIn("'-1+1 tetap teks biasa", isi)
+        self.assertNotIn(',=HYPERLINK', isi)
+
+        response = self.client.get(reverse('admin:laporan-feedback-xlsx'))
+        with zipfile.ZipFile(BytesIO(b''.join(response.streaming_content))) as arsip:
+            sheet = arsip.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertIn("<t xml:space=\"preserve\">'=HYPERLINK", sheet)
+        # Angka negatif tetap sel angka
+        self.assertEqual(nilai_ekspor(Decimal('-5')), Decimal('-5'))
+        self.assertEqual(nilai_ekspor('+62812'), "'+62812")
+
+    def test_pendapatan_preview_and_pdf_share_total(self):
+        laporan = LAPORAN['pemesanan-pendapatan']
+        ringkasan = laporan.get_ringkasan(FilterLaporan(status_pesanan='Dikirim'))
+        self.assertEqual(ringkasan['total_pendapatan'], Decimal('10000'))
+        response = self.client.get(reverse('admin:core_pemesanan_laporan'), {'status_pesanan': 'Dikirim'})
+        self.assertEqual(response.context['total_pendapatan'], Decimal('10000'))
+        self.assertEqual(len(response.context['pemesanan_list']), 1)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT_TEST)
+class LaporanBulananTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123')
+        cls.awal, cls.akhir = get_rentang_bulan_lalu()
+        pelanggan = buat_pelanggan()
+        waktu = timezone.make_aware(datetime.combine(cls.awal + timedelta(days=10), datetime.min.time()))
+        Pemesanan.objects.create(idPelanggan=pelanggan, alamatPengiriman='Kupang', total=15000,
+                                 status='Dikirim', tanggalPemesanan=waktu)
+        Feedback.objects.create(idPelanggan=pelanggan, isi='Air galon bersih')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.params = {'tgl_mulai': self.awal.isoformat(), 'tgl_akhir': self.akhir.isoformat()}
+
+    def test_bulan_tutup(self):
+        today = date(2025, 3, 5)
+        self.assertEqual(get_bulan_tutup(FilterLaporan(date(2025, 2, 1), date(2025, 2, 28)), today), '2025-02')
+        # Bulan berjalan, rentang tidak penuh, dan filter tambahan tidak dilayani dari prerender
+        self.assertIsNone(get_bulan_tutup(FilterLaporan(date(2025, 3, 1), date(2025, 3, 31)), today))
+        self.assertIsNone(get_bulan_tutup(FilterLaporan(date(2025, 2, 1), date(2025, 2, 27)), today))
+        self.assertIsNone(get_bulan_tutup(FilterLaporan(date(2025, 2, 1), date(2025, 2, 28), status_pesanan='Selesai'), today))
+
+    def test_prerender_served_without_queries(self):
+        call_command('prerender_laporan_bulanan', stdout=StringIO())
+        bulan = self.awal.strftime('%Y-%m')
+        for nama, laporan in LAPORAN.items():
+            # Laporan yang memuat nilai saat ini (stok, statistik pelanggan) tidak di-prerender
+            self.assertEqual(default_storage.exists(f'laporan_bulanan/{bulan}/{nama}.pdf'), laporan.per_bulan, nama)
+            self.assertEqual(default_storage.exists(f'laporan_bulanan/{bulan}/{nama}.html'), laporan.per_bulan, nama)
+        self.assertEqual(sorted(get_laporan_bulanan()), ['feedback', 'pemesanan-pendapatan'])
+        with self.assertRaises(CommandError):
+            call_command('prerender_laporan_bulanan', 'produk', stdout=StringIO())
+
+        url = reverse('admin:core_pemesanan_laporan')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, self.params)
+        self.assertEqual([q for q in queries if '"core_' in q['sql']], [])
+        self.assertContains(response, 'Rp 15.000')
+        self.assertContains(response, 'Budi')
+
+        response = self.client.get(reverse('admin:laporan-pemesanan-pendapatan-pdf'), self.params)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+        response.close()
+        self.assertFalse(LaporanJob.objects.exists())
+
+        # Rentang lain tetap dihitung langsung dari database
+        response = self.client.get(url, {'tgl_mulai': self.awal.isoformat()})
+        self.assertNotIn('tabel_tersimpan', response.context)
+
+        response = self.client.get(reverse('admin:laporan-pelanggan'), self.params)
+        self.assertNotIn('tabel_tersimpan', response.context)
+
+    def test_prerender_dihapus_saat_data_bulan_berubah(self):
+        call_command('prerender_laporan_bulanan', stdout=StringIO())
+        path = f'laporan_bulanan/{self.awal.strftime("%Y-%m")}/pemesanan-pendapatan.html'
+        pesanan = Pemesanan.objects.get()
+
+        # Perubahan pesanan bulan berjalan tidak menyentuh bulan yang sudah tutup
+        with self.captureOnCommitCallbacks(execute=True):
+            Pemesanan.objects.create(idPelanggan=pesanan.idPelanggan, alamatPengiriman='Kupang')
+        self.assertTrue(default_storage.exists(path))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            batalkan_pesanan(Pemesanan.objects.filter(pk=pesanan.pk))
+        self.assertFalse(default_storage.exists(path))
+        response = self.client.get(reverse('admin:core_pemesanan_laporan'), self.params)
+        self.assertNotIn('tabel_tersimpan', response.context)
+        self.assertContains(response, 'Dibatalkan')
+
+        call_command('prerender_laporan_bulanan', stdout=StringIO())
+        pesanan = Pemesanan.objects.get(pk=pesanan.pk)
+        # Memindahkan pesanan keluar dari bulan tutup juga membuat bulan asalnya usang
+        pesanan.tanggalPemesanan = timezone.now()
+        with self.captureOnCommitCallbacks(execute=True):
+            pesanan.save()
+        self.assertFalse(default_storage.exists(path))
+
+
+class LaporanPemesananPendapatanTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'rahasia123')
+        pelanggan_list = [buat_pelanggan(f'pelanggan{i}') for i in range(3)]
+        waktu = timezone.now() - timedelta(days=1)
+        # Beberapa pesanan berbagi tanggalPemesanan yang sama untuk menguji urutan idPemesanan
+        Pemesanan.objects.bulk_create([
+            Pemesanan(idPelanggan=pelanggan_list[i % 3], alamatPengiriman='Kupang', total=1000, status='Dikirim',
+                      tanggalPemesanan=waktu + timedelta(minutes=i // 4))
+            for i in range(120)
+        ])
+        cls.urutan = list(Pemesanan.objects.order_by('tanggalPemesanan', 'idPemesanan').values_list('idPemesanan', flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.url = reverse('admin:core_pemesanan_laporan')
+
+    def test_keyset_pages_cover_all_orders(self):
+        terlihat, params = [], {}
+        while True:
+            response = self.client.get(self.url, params)
+            page_obj = response.context['page_obj']
+            terlihat.extend(row['idPemesanan'] for row in response.context['pemesanan_list'])
+            if not page_obj.has_next():
+                break
+            params = {'sesudah': page_obj.cursor_berikutnya}
+        self.assertEqual(terlihat, self.urutan)
+        self.assertEqual(response.context['jumlah_pesanan'], 120)
+        self.assertEqual(response.context['total_nilai_pesanan'], Decimal('120000'))
+
+        response = self.client.get(self.url, {'sebelum': page_obj.cursor_sebelumnya})
+        self.assertEqual([row['idPemesanan'] for row in response.context['pemesanan_list']], self.urutan[50:100])
+
+    def test_constant_queries(self):
+        cursor = self.client.get(self.url).context['page_obj'].cursor_berikutnya
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'sesudah': cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Budi')
+        # Agregasi ringkasan, rekap pendapatan, dan satu halaman pesanan dengan pelanggannya
+        query_laporan = [q for q in queries if '"core_' in q['sql']]
+        self.assertEqual(len(query_laporan), 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {'sesudah': 'bukan-cursor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['pemesanan_list']), 50)
@@ -1,187 +1,85 @@
-from django.shortcuts import render, redirect
-from django.db.models import Sum, Count, Q
-from django.db.models.functions import Extract
+from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.db.models import Count
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 import json
+import hashlib
 from django.contrib import messages
-from django.http import HttpResponse, HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse, StreamingHttpResponse, FileResponse
+from django.views.decorators.http import condition, etag, require_GET
+from django.utils.cache import patch_cache_control
 from django.db import transaction
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.hashers import check_password
 from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
-
-from reportlab.pdfgen import canvas
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.lib.units import cm
-from io import BytesIO
-
-from .models import Pelanggan, Sopir, Kendaraan, Produk, StokMasuk, Pemesanan, DetailPemesanan, Feedback
+from django.core.files.storage import default_storage
+
+from .models import Pelanggan, Sopir, Kendaraan, Produk, StokMasuk, Pemesanan, DetailPemesanan, Feedback, LaporanJob
+from .dashboard import (
+    GRANULARITAS_CHOICES, get_kpi_pemesanan, get_pendapatan_bulanan, get_deret_waktu,
+    get_rentang_default, get_rentang_bulan_lalu, get_cached_dashboard_context
+)
+from .reports import (
+    BUNDEL, FilterLaporan, KeysetPaginator, CursorTidakValid, FORMAT_EKSPOR, iter_ekspor, buat_job,
+    get_filename_bundel, get_laporan, get_laporan_job, get_pdf_bulanan, get_tabel_bulanan
+)
+from .reports.cache import get_versi_laporan
 from .forms import SopirEditPengirimanForm, PelangganRegisterForm, PelangganLoginForm, PemesananCheckoutForm, PelangganUpdateForm, ChangePasswordForm
 
-def format_rupiah(amount):
-    if amount is None:
-        return "Rp 0"
-    return f"Rp {int(amount):,}".replace(",", ".")
-
-def add_page_template(canvas, doc, title):
-    """Add header and footer to each page"""
-    canvas.saveState()
-    
-    # Header
-    canvas.setFont("Helvetica-Bold", 16)
-    canvas.drawCentredString(A4[0]/2, A4[1]-50, f"Laporan {title} VIQUAM")
-    
-    # Footer
-    canvas.setFont("Helvetica", 10)
-    current_date = timezone.now().strftime("%d %B %Y")
-    canvas.drawCentredString(A4[0]/2, 30, f"Tanggal Cetak: {current_date}")
-    
-    canvas.restoreState()
-
-def create_pdf_header(canvas, title, date_range=None):
-    """Create PDF header with date range"""
-    # Header
-    canvas.setFont("Helvetica-Bold", 16)
-    canvas.drawCentredString(A4[0]/2, A4[1]-50, f"Laporan {title} VIQUAM")
-    
-    # Date range if provided
-    if date_range:
-        canvas.setFont("Helvetica", 10)
-        canvas.drawCentredString(A4[0]/2, A4[1]-70, f"Periode: {date_range}")
-    
-    # Footer
-    canvas.setFont("Helvetica", 10)
-    current_date = timezone.now().strftime("%d %B %Y")
-    canvas.drawCentredString(A4[0]/2, 30, f"Tanggal Cetak: {current_date}")
-
 def get_dashboard_context():
     """
-    Get dashboard context data without rendering template
+    Get dashboard context data without rendering template (cached)
+    """
+    return get_cached_dashboard_context(build_dashboard_context)
+
+def build_dashboard_context():
+    """
+    Compute dashboard context data directly from the database
     """
-    from django.utils import timezone
-    from datetime import timedelta
-    from django.db.models import Sum
-    from decimal import Decimal
-    import json
-    from .models import Pemesanan, Produk, Feedback
-    
     now = timezone.now()
     
-    # 1. Calculation: Start/End of Current Month
-    start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    if now.month == 12:
-        end_of_month = now.replace(year=now.year + 1, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-    else:
-        end_of_month = now.replace(month=now.month + 1, day=1, hour=0, minute=0, second=0, microsecond=0)
-    
-    twenty_four_hours_ago = now - timedelta(hours=24)
-    
     # --- Business Metrics Calculation ---
-    # Pesanan Perlu Perhatian: Jumlah Pemesanan dengan status='Diproses' dan tanggalPemesanan lebih dari 24 jam yang lalu
-    pesanan_perlu_perhatian = Pemesanan.objects.filter(
-        status='Diproses',
-        tanggalPemesanan__lte=twenty_four_hours_ago
-    ).count()
-    
-    # Total Pesanan Diproses: Jumlah Pemesanan dengan status='Diproses'
-    total_pesanan_diproses = Pemesanan.objects.filter(status='Diproses').count()
-    
-    # Total Pengiriman Aktif: Jumlah Pemesanan dengan status='Dikirim'
-    total_pengiriman_aktif = Pemesanan.objects.filter(status='Dikirim').count()
-    
-    # Total Pendapatan (Bulan Ini): Total Pemesanan.total di mana status='Selesai' pada bulan berjalan
-    pendapatan_bulan_ini_result = Pemesanan.objects.filter(
-        status='Selesai',
-        tanggalPemesanan__gte=start_of_month,
-        tanggalPemesanan__lt=end_of_month
-    ).aggregate(Sum('total'))['total__sum']
-    
-    pendapatan_bulan_ini = pendapatan_bulan_ini_result if pendapatan_bulan_ini_result is not None else Decimal('0')
-    
-    # Total Pendapatan (Keseluruhan): Total Pemesanan.total di mana status='Selesai' (tanpa filter tanggal)
-    total_pendapatan_keseluruhan_result = Pemesanan.objects.filter(
-        status='Selesai'
-    ).aggregate(Sum('total'))['total__sum']
-    
-    total_pendapatan_keseluruhan = total_pendapatan_keseluruhan_result if total_pendapatan_keseluruhan_result is not None else Decimal('0')
-    
-    # Transaksi Selesai (Bulan Ini): Jumlah Pemesanan di mana status='Selesai' pada bulan berjalan
-    transaksi_selesai_bulan_ini = Pemesanan.objects.filter(
-        status='Selesai',
-        tanggalPemesanan__gte=start_of_month,
-        tanggalPemesanan__lt=end_of_month
-    ).count()
-    
-    # Transaksi Selesai (Keseluruhan): Jumlah Pemesanan di mana status='Selesai' (tanpa filter tanggal)
-    transaksi_selesai_keseluruhan = Pemesanan.objects.filter(
-        status='Selesai'
-    ).count()
+    # Semua status count dan pendapatan Pemesanan dihitung dalam satu query
+    kpi = get_kpi_pemesanan(now)
+    twenty_four_hours_ago = kpi['twenty_four_hours_ago']
     
     # Produk Stok Menipis: Jumlah Produk dengan stok <= 10
     produk_stok_menipis = Produk.objects.filter(stok__lte=10).count()
     
     # Feedback Terbaru: 1-2 entri terbaru dari model Feedback
-    feedback_terbaru = Feedback.objects.all().order_by('-tanggal')[:2]
+    feedback_terbaru = list(Feedback.objects.select_related('idPelanggan').order_by('-tanggal')[:2])
     
     # --- 6-Month Revenue Data (Chart) ---
-    months = []
-    current_date = now.replace(day=1)
-    for i in range(6):
-        months.insert(0, (current_date.month, current_date.year))
-        if current_date.month == 1:
-            current_date = current_date.replace(year=current_date.year - 1, month=12)
-        else:
-            current_date = current_date.replace(month=current_date.month - 1)
-            
-    start_date_filter = current_date.replace(day=1)
-    
-    from django.db.models.functions import Extract
-    revenue_data = Pemesanan.objects.filter(
-        status='Selesai',
-        tanggalPemesanan__gte=start_date_filter
-    ).annotate(
-        month=Extract('tanggalPemesanan', 'month'),
-        year=Extract('tanggalPemesanan', 'year')
-    ).values('month', 'year').annotate(revenue=Sum('total')).order_by('year', 'month')
-    
-    chart_labels = []
-    chart_data = []
-    month_names = ["Jan", "Feb", "Mar", "Apr", "Mei", "Jun", "Jul", "Agu", "Sep", "Okt", "Nov", "Des"]
-    
-    for month, year in months:
-        label = f"{month_names[month-1]} {str(year)[2:]}"
-        chart_labels.append(label)
-        
-        revenue = 0.0
-        for item in revenue_data:
-            if item.get('month') == month and item.get('year') == year:
-                # Konversi Decimal ke float secara eksplisit
-                revenue = float(item.get('revenue')) if item.get('revenue') is not None else 0.0
-                break
-        chart_data.append(revenue)
+    # Dibaca dari tabel RekapPendapatanHarian, bukan dari scan seluruh Pemesanan
+    chart_labels, chart_data = get_pendapatan_bulanan(now, 6)
 
     # PENTING: Konversi data ke JSON string dan kirim ke context
     chart_labels_json = json.dumps(chart_labels)
     chart_data_json = json.dumps(chart_data)
 
+    awal_bulan_lalu, akhir_bulan_lalu = get_rentang_bulan_lalu(timezone.localdate(now))
+
     context = {
-        'pesanan_perlu_perhatian': pesanan_perlu_perhatian,
-        'total_pesanan_diproses': total_pesanan_diproses,
-        'total_pengiriman_aktif': total_pengiriman_aktif,
-        'total_pendapatan_keseluruhan': total_pendapatan_keseluruhan,
-        'transaksi_selesai_keseluruhan': transaksi_selesai_keseluruhan,
+        'pesanan_perlu_perhatian': kpi['pesanan_perlu_perhatian'],
+        'total_pesanan_diproses': kpi['total_pesanan_diproses'],
+        'total_pengiriman_aktif': kpi['total_pengiriman_aktif'],
+        'pendapatan_bulan_ini': kpi['pendapatan_bulan_ini'],
+        'transaksi_selesai_bulan_ini': kpi['transaksi_selesai_bulan_ini'],
+        'total_pendapatan_keseluruhan': kpi['total_pendapatan_keseluruhan'],
+        'transaksi_selesai_keseluruhan': kpi['transaksi_selesai_keseluruhan'],
         'produk_stok_menipis': produk_stok_menipis,
         'feedback_terbaru': feedback_terbaru,
         # Kirim string JSON
         'chart_labels_json': chart_labels_json,
         'chart_data_json': chart_data_json,
-        'twenty_four_hours_ago': twenty_four_hours_ago.strftime('%Y-%m-%d')
+        'twenty_four_hours_ago': twenty_four_hours_ago.strftime('%Y-%m-%d'),
+        # Rentang tombol unduh semua laporan bulan lalu
+        'awal_bulan_lalu': awal_bulan_lalu,
+        'akhir_bulan_lalu': akhir_bulan_lalu,
     }
     
     return context
@@ -190,1037 +88,187 @@ def get_dashboard_context():
 def admin_dashboard(request):
     context = get_dashboard_context()
     return render(request, 'core/dashboard.html', context)
-def admin_laporan_pelanggan(request):
-    # Get filter parameters
-    tgl_mulai = request.GET.get('tgl_mulai')
-    tgl_akhir = request.GET.get('tgl_akhir')
-    
-    # Build queryset
-    pelanggan_list = Pelanggan.objects.all()
-    
-    # Apply date filters if provided and not empty
-    if tgl_mulai and tgl_akhir:
-        # Filter pelanggan based on their last order date
-        pelanggan_dengan_pesanan = Pemesanan.objects.filter(
-            tanggalPemesanan__date__gte=tgl_mulai,
-            tanggalPemesanan__date__lte=tgl_akhir
-        ).values_list('idPelanggan', flat=True)
-        pelanggan_list = pelanggan_list.filter(idPelanggan__in=pelanggan_dengan_pesanan)
-    
-    # Calculate total purchases for each customer
-    pelanggan_data = []
-    for pelanggan in pelanggan_list:
-        total_pembelian = Pemesanan.objects.filter(idPelanggan=pelanggan).aggregate(
-            total=Sum('total')
-        )['total'] or 0
-        
-        pelanggan_data.append({
-            'nama': pelanggan.nama,
-            'noWa': pelanggan.noWa,
-            'alamat': pelanggan.alamat,
-            'username': pelanggan.username,
-            'total_pembelian': format_rupiah(total_pembelian)
-        })
+
+def dashboard_deret_waktu_etag(request):
+    # Deret hanya berubah jika data berubah atau hari berganti. Versi dashboard hanya ada di
+    # cache per proses, jadi dipakai versi laporan di database yang juga naik setiap kali
+    # RekapPendapatanHarian berubah, agar semua worker web menjawab dengan ETag yang sama
+    kunci = f"{get_versi_laporan()}:{timezone.localdate().isoformat()}:{request.GET.urlencode()}"
+    return hashlib.md5(kunci.encode()).hexdigest()
+
+@require_GET
+@etag(dashboard_deret_waktu_etag)
+def admin_dashboard_deret_waktu(request):
+    """JSON deret pendapatan & jumlah pesanan untuk grafik dashboard"""
+    granularitas = request.GET.get('granularitas', 'bulanan')
+    if granularitas not in GRANULARITAS_CHOICES:
+        return JsonResponse({'error': f'Granularitas harus salah satu dari: {", ".join(GRANULARITAS_CHOICES)}.'}, status=400)
+    
+    tgl_mulai, tgl_akhir = get_rentang_default(granularitas)
+    try:
+        if request.GET.get('tgl_mulai'):
+            tgl_mulai = date.fromisoformat(request.GET['tgl_mulai'])
+        if request.GET.get('tgl_akhir'):
+            tgl_akhir = date.fromisoformat(request.GET['tgl_akhir'])
+        deret = get_deret_waktu(tgl_mulai, tgl_akhir, granularitas)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(deret)
+def render_laporan_preview(request, laporan):
+    """Render halaman preview HTML sebuah laporan dari spesifikasinya di core.reports"""
+    filter_laporan = FilterLaporan.from_querydict(request.GET)
+    for error in filter_laporan.errors:
+        messages.warning(request, error)
     
     context = {
-        'judul_laporan': 'Data Pelanggan',
-        'pelanggan_list': pelanggan_data,
-        'tgl_mulai': tgl_mulai,
-        'tgl_akhir': tgl_akhir
+        'judul_laporan': laporan.judul_laporan,
+        **filter_laporan.as_context(),
     }
-    return render(request, 'core/laporan_pelanggan.html', context)
-
-def admin_laporan_produk(request):
-    filter_tipe = request.GET.get('filter_tipe')
-    batas_stok = request.GET.get('batas_stok', 10)
-    tgl_mulai = request.GET.get('tgl_mulai')
-    tgl_akhir = request.GET.get('tgl_akhir')
-    
-    produk_list = Produk.objects.all()
-    
-    if filter_tipe == 'terlaris' or (tgl_mulai or tgl_akhir):
-        date_filter_q = None
-        if tgl_mulai and tgl_akhir:
-            date_filter_q = Q(detailpemesanan__idPemesanan__tanggalPemesanan__date__gte=tgl_mulai) & \
-                           Q(detailpemesanan__idPemesanan__tanggalPemesanan__date__lte=tgl_akhir)
-        elif tgl_mulai:
-            date_filter_q = Q(detailpemesanan__idPemesanan__tanggalPemesanan__date__gte=tgl_mulai)
-        elif tgl_akhir:
-            date_filter_q = Q(detailpemesanan__idPemesanan__tanggalPemesanan__date__lte=tgl_akhir)
-        
-        if filter_tipe == 'terlaris':
-            if date_filter_q:
-                produk_list = produk_list.annotate(
-                    total_terjual=Sum('detailpemesanan__jumlah', filter=date_filter_q)
-                ).order_by('-total_terjual')
-            else:
-                produk_list = produk_list.annotate(
-                    total_terjual=Sum('detailpemesanan__jumlah')
-                ).order_by('-total_terjual')
-        else:
-            produk_list = produk_list.annotate(
-                total_terjual=Sum('detailpemesanan__jumlah', filter=date_filter_q) if date_filter_q else Sum('detailpemesanan__jumlah')
-            )
-    elif filter_tipe == 'stok_menipis':
-        produk_list = produk_list.filter(stok__lte=batas_stok).order_by('stok')
     
-    produk_data = []
-    for produk in produk_list:
-        product_date_filter_q = None
-        if tgl_mulai and tgl_akhir:
-            product_date_filter_q = Q(idPemesanan__tanggalPemesanan__date__gte=tgl_mulai) & \
-                                  Q(idPemesanan__tanggalPemesanan__date__lte=tgl_akhir)
-        elif tgl_mulai:
-            product_date_filter_q = Q(idPemesanan__tanggalPemesanan__date__gte=tgl_mulai)
-        elif tgl_akhir:
-            product_date_filter_q = Q(idPemesanan__tanggalPemesanan__date__lte=tgl_akhir)
-            
-        total_terjual = 0
-        if filter_tipe == 'terlaris' or (tgl_mulai or tgl_akhir):
-            total_terjual_queryset = DetailPemesanan.objects.filter(idProduk=produk)
-            if product_date_filter_q:
-                total_terjual_queryset = total_terjual_queryset.filter(product_date_filter_q)
-            total_terjual = total_terjual_queryset.aggregate(total=Sum('jumlah'))['total'] or 0
-        
-        produk_data.append({
-            'namaProduk': produk.namaProduk,
-            'ukuranKemasan': produk.ukuranKemasan,
-            'hargaPerDus': format_rupiah(produk.hargaPerDus),
-            'stok': produk.stok,
-            'total_terjual': total_terjual if (filter_tipe == 'terlaris' or (tgl_mulai or tgl_akhir)) else None
-        })
+    # Bulan yang sudah tutup dilayani dari tabel hasil prerender_laporan_bulanan tanpa query
+    tabel_tersimpan = get_tabel_bulanan(laporan, filter_laporan)
+    if tabel_tersimpan is not None:
+        context['tabel_tersimpan'] = tabel_tersimpan
+        return render(request, laporan.template, context)
     
-    context = {
-        'judul_laporan': 'Produk & Stok',
-        'produk_list': produk_data,
-        'tgl_mulai': tgl_mulai,
-        'tgl_akhir': tgl_akhir,
-        'filter_tipe': filter_tipe,
-        'batas_stok': batas_stok
-    }
-    return render(request, 'core/laporan_produk.html', context)
+    context.update(laporan.get_ringkasan(filter_laporan))
+    queryset = laporan.get_queryset(filter_laporan)
+    if laporan.keyset:
+        paginator = KeysetPaginator(queryset, *laporan.keyset, per_page=laporan.paginate_by)
+        try:
+            page_obj = paginator.get_page(sesudah=request.GET.get('sesudah'), sebelum=request.GET.get('sebelum'))
+        except CursorTidakValid as e:
+            messages.warning(request, str(e))
+            page_obj = paginator.get_page()
+        context['page_obj'] = page_obj
+        queryset = page_obj
+    elif laporan.paginate_by:
+        paginator = Paginator(queryset, laporan.paginate_by)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        context['page_obj'] = page_obj
+        queryset = page_obj
+    
+    context[laporan.context_object_name] = [laporan.get_row(obj) for obj in queryset]
+    return render(request, laporan.template, context)
+
+def admin_laporan_pelanggan(request):
+    return render_laporan_preview(request, get_laporan('pelanggan'))
+
+def admin_laporan_produk(request):
+    return render_laporan_preview(request, get_laporan('produk'))
 
 def admin_laporan_sopir_kendaraan(request):
-    # Get filter parameters
-    tgl_mulai = request.GET.get('tgl_mulai')
-    tgl_akhir = request.GET.get('tgl_akhir')
-    
-    # Build queryset
-    sopir_list = Sopir.objects.all()
-    
-    # Process data for each driver
-    sopir_data = []
-    for sopir in sopir_list:
-        # Get driver's vehicle
-        kendaraan = Kendaraan.objects.filter(idSopir=sopir).first()
-        kendaraan_nama = kendaraan.nama if kendaraan else None
-        
-        # Count completed orders for this driver
-        pesanan_selesai_queryset = Pemesanan.objects.filter(
-            idSopir=sopir,
-            status='Selesai'
-        )
-        
-        # Apply date filters if provided and not empty
-        if tgl_mulai:
-            pesanan_selesai_queryset = pesanan_selesai_queryset.filter(
-                tanggalPemesanan__date__gte=tgl_mulai
-            )
-        if tgl_akhir:
-            pesanan_selesai_queryset = pesanan_selesai_queryset.filter(
-                tanggalPemesanan__date__lte=tgl_akhir
-            )
-            
-        pesanan_selesai = pesanan_selesai_queryset.count()
-        
-        sopir_data.append({
-            'nama': sopir.nama,
-            'noHp': sopir.noHp,
-            'username': sopir.username,
-            'kendaraan_nama': kendaraan_nama,
-            'pesanan_selesai': pesanan_selesai
-        })
-    
-    context = {
-        'judul_laporan': 'Sopir & Kendaraan',
-        'sopir_list': sopir_data,
-        'tgl_mulai': tgl_mulai,
-        'tgl_akhir': tgl_akhir
-    }
-    return render(request, 'core/laporan_sopir_kendaraan.html', context)
+    return render_laporan_preview(request, get_laporan('sopir-kendaraan'))
 
 def admin_laporan_pemesanan_pendapatan(request):
-    # Get filter parameters
-    tgl_mulai = request.GET.get('tgl_mulai')
-    tgl_akhir = request.GET.get('tgl_akhir')
-    status_pesanan = request.GET.get('status_pesanan')
-    
-    # Build queryset
-    pemesanan_list = Pemesanan.objects.all()
-    
-    # Apply filters
-    if tgl_mulai:
-        pemesanan_list = pemesanan_list.filter(
-            tanggalPemesanan__date__gte=tgl_mulai
-        )
-    if tgl_akhir:
-        pemesanan_list = pemesanan_list.filter(
-            tanggalPemesanan__date__lte=tgl_akhir
-        )
-    
-    if status_pesanan:
-        pemesanan_list = pemesanan_list.filter(status=status_pesanan)
-    
-    # Calculate total revenue - only from 'Selesai' orders
-    pendapatan_queryset = Pemesanan.objects.filter(status='Selesai')
-    
-    # Apply the same date filters to pendapatan queryset
-    if tgl_mulai:
-        pendapatan_queryset = pendapatan_queryset.filter(
-            tanggalPemesanan__date__gte=tgl_mulai
-        )
-    if tgl_akhir:
-        pendapatan_queryset = pendapatan_queryset.filter(
-            tanggalPemesanan__date__lte=tgl_akhir
-        )
-    
-    # If status filter is applied and it's 'Selesai', use the same queryset
-    if status_pesanan == 'Selesai':
-        total_pendapatan = pemesanan_list.aggregate(total=Sum('total'))['total'] or 0
-    else:
-        # Otherwise, calculate from 'Selesai' orders separately
-        total_pendapatan = pendapatan_queryset.aggregate(total=Sum('total'))['total'] or 0
-    
-    # Process data for each order
-    pemesanan_data = []
-    for pemesanan in pemesanan_list:
-        pemesanan_data.append({
-            'tanggalPemesanan': pemesanan.tanggalPemesanan,
-            'idPelanggan': pemesanan.idPelanggan,
-            'alamatPengiriman': pemesanan.alamatPengiriman,
-            'status': pemesanan.status,
-            'total': format_rupiah(pemesanan.total)
-        })
-    
-    context = {
-        'judul_laporan': 'Pemesanan & Pendapatan',
-        'pemesanan_list': pemesanan_data,
-        'tgl_mulai': tgl_mulai,
-        'tgl_akhir': tgl_akhir,
-        'status_pesanan': status_pesanan,
-        'total_pendapatan': format_rupiah(total_pendapatan)
-    }
-    return render(request, 'core/laporan_pemesanan_pendapatan.html', context)
+    return render_laporan_preview(request, get_laporan('pemesanan-pendapatan'))
 
 def admin_laporan_feedback(request):
-    # Get filter parameters
-    tgl_mulai = request.GET.get('tgl_mulai')
-    tgl_akhir = request.GET.get('tgl_akhir')
-    
-    # Build queryset
-    feedback_list = Feedback.objects.all().select_related('idPelanggan')
-    
-    # Apply date filters if provided and not empty
-    if tgl_mulai:
-        feedback_list = feedback_list.filter(
-            tanggal__date__gte=tgl_mulai
-        )
-    if tgl_akhir:
-        feedback_list = feedback_list.filter(
-            tanggal__date__lte=tgl_akhir
-        )
-    
-    # Process data for each feedback
-    feedback_data = []
-    for feedback in feedback_list:
-        feedback_data.append({
-            'tanggal': feedback.tanggal,
-            'idPelanggan': feedback.idPelanggan,
-            'isi': feedback.isi
-        })
-    
-    context = {
-        'judul_laporan': 'Feedback Pelanggan',
-        'feedback_list': feedback_data,
-        'tgl_mulai': tgl_mulai,
-        'tgl_akhir': tgl_akhir
+    return render_laporan_preview(request, get_laporan('feedback'))
+
+def render_laporan_pdf(request, laporan):
+    """
+    Antrekan render PDF laporan sebagai LaporanJob lalu arahkan ke halaman statusnya.
+    Layout reportlab dikerjakan oleh `manage.py proses_laporan_job`, bukan oleh worker web.
+    """
+    filter_laporan = FilterLaporan.from_querydict(request.GET)
+    path_bulanan = get_pdf_bulanan(laporan, filter_laporan)
+    if path_bulanan is not None:
+        # PDF bulan yang sudah tutup sudah dirender oleh prerender_laporan_bulanan
+        return FileResponse(default_storage.open(path_bulanan, 'rb'), as_attachment=True,
+                            filename=laporan.filename, content_type='application/pdf')
+    job = buat_job(laporan, filter_laporan, request.user)
+    if job.status == 'Selesai':
+        # PDF untuk laporan, filter, dan versi data yang sama sudah tersimpan
+        return redirect('admin:laporan-job-unduh', id_job=job.idJob)
+    return redirect('admin:laporan-job-status', id_job=job.idJob)
+
+def get_status_job(job):
+    status = {
+        'id': job.idJob,
+        'status': job.status,
+        'selesai': job.status in ('Selesai', 'Gagal'),
+        'pesan_error': job.pesanError,
+        'url_unduh': None,
     }
-    return render(request, 'core/laporan_feedback.html', context)
+    if job.status == 'Selesai':
+        status['url_unduh'] = reverse('admin:laporan-job-unduh', args=[job.idJob])
+    return status
+
+def admin_laporan_job_status(request, id_job):
+    """Halaman status job PDF; mem-poll admin_laporan_job_status_json sampai file siap"""
+    job = get_object_or_404(LaporanJob, pk=id_job)
+    laporan = get_laporan_job(job)
+    return render(request, 'core/laporan_job_status.html', {
+        'title': f'Laporan {laporan.judul_laporan}',
+        'judul_laporan': laporan.judul_laporan,
+        'job': job,
+        'status_job': get_status_job(job),
+    })
+
+def admin_laporan_job_status_json(request, id_job):
+    return JsonResponse(get_status_job(get_object_or_404(LaporanJob, pk=id_job)))
+
+def laporan_job_etag(request, id_job):
+    job = LaporanJob.objects.filter(pk=id_job, status='Selesai').values('kunci').first()
+    if job is None:
+        return None
+    return job['kunci'] or f'job-{id_job}'
+
+def laporan_job_last_modified(request, id_job):
+    return LaporanJob.objects.filter(pk=id_job, status='Selesai').values_list('tanggalSelesai', flat=True).first()
+
+@condition(etag_func=laporan_job_etag, last_modified_func=laporan_job_last_modified)
+def laporan_job_unduh(request, id_job):
+    job = get_object_or_404(LaporanJob, pk=id_job, status='Selesai')
+    laporan = get_laporan_job(job)
+    if laporan is BUNDEL:
+        filename = get_filename_bundel(FilterLaporan.from_querydict(job.parameter))
+        content_type = BUNDEL.content_type
+    else:
+        filename, content_type = laporan.filename, 'application/pdf'
+    response = FileResponse(job.file.open('rb'), as_attachment=True, filename=filename, content_type=content_type)
+    # Browser tetap bertanya ke server, yang menjawab 304 selama ETag masih sama
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
-def laporan_pelanggan(request):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="laporan_pelanggan.pdf"'
-    
-    # Create a PDF buffer
-    buffer = BytesIO()
-    
-    # Create the PDF object, using the buffer as its "file."
-    doc = SimpleDocTemplate(buffer, pagesize=A4, 
-                           leftMargin=2*cm, rightMargin=2*cm,
-                           topMargin=2*cm, bottomMargin=2*cm)
-    
-    # Get filter parameters
-    tgl_mulai = request.GET.get('tgl_mulai')
-    tgl_akhir = request.GET.get('tgl_akhir')
-    
-    # Build queryset
-    pelanggan_list = Pelanggan.objects.all()
-    
-    # Apply date filters if provided and not empty
-    date_range = ""
-    if tgl_mulai and tgl_akhir:
-        date_range = f"{tgl_mulai} - {tgl_akhir}"
-        # Filter pelanggan based on their last order date
-        pelanggan_dengan_pesanan = Pemesanan.objects.filter(
-            tanggalPemesanan__date__gte=tgl_mulai,
-            tanggalPemesanan__date__lte=tgl_akhir
-        ).values_list('idPelanggan', flat=True)
-        pelanggan_list = pelanggan_list.filter(idPelanggan__in=pelanggan_dengan_pesanan)
-    
-    # Container for the 'Flowable' objects
-    story = []
-    
-    # Add company header
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    normal_style = styles['Normal']
-    
-    # Set font size for title
-    title_style.fontSize = 12
-    title_style.alignment = 1  # Center alignment
-    
-    # Title
-    title = Paragraph("Laporan Data Pelanggan VIQUAM", title_style)
-    story.append(title)
-    
-    # Company address
-    address_style = normal_style.clone('Address')
-    address_style.fontSize = 8 
-    address_style.alignment = 1  # Center alignment
-    address = Paragraph("Jl. Cendrawasih, Lahilai Bissi Kopan, Kec. Kota Lama, Kota Kupang Nusa Tenggara Timur.", address_style)
-    story.append(address)
-    
-    # Date range if provided
-    if date_range:
-        date_paragraph = Paragraph(f"Periode: {date_range}", address_style)
-        story.append(date_paragraph)
-    
-    # Add spacer between address/date and horizontal line
-    story.append(Spacer(1, 12))
-    
-    # Horizontal line (moved above table)
-    # Using a 1x1 table for reliable horizontal line placement
-    line_table = Table([['']], colWidths=[16*cm], rowHeights=[1])
-    line_table.setStyle(TableStyle([
-        ('LINEABOVE', (0, 0), (0, 0), 2, colors.black),  # Increased line thickness to 2
-        ('LEFTPADDING', (0, 0), (0, 0), 0),
-        ('RIGHTPADDING', (0, 0), (0, 0), 0),
-        ('TOPPADDING', (0, 0), (0, 0), 0),
-        ('BOTTOMPADDING', (0, 0), (0, 0), 0),
-    ]))
-    story.append(line_table)
-    story.append(Spacer(1, 12))
-    
-    # Prepare data for table
-    data = [['No.', 'Nama', 'No WA', 'Alamat', 'Username', 'Total Pembelian']]
-    
-    for i, pelanggan in enumerate(pelanggan_list, 1):
-        # Calculate total purchases for this customer
-        total_pembelian = Pemesanan.objects.filter(idPelanggan=pelanggan).aggregate(
-            total=Sum('total')
-        )['total'] or 0
-        
-        row = [
-            str(i),
-            pelanggan.nama,
-            pelanggan.noWa,
-            pelanggan.alamat,
-            pelanggan.username,
-            format_rupiah(total_pembelian)
-        ]
-        data.append(row)
-    
-    # Create table with improved styling
-    table = Table(data, colWidths=[1.5*cm, 3*cm, 3*cm, 4*cm, 2.5*cm, 3*cm])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    
-    story.append(table)
-    story.append(Spacer(1, 24))
-    
-    # Add signature section (positioned at bottom right)
-    story.append(Spacer(1, 200))  # Push signature to bottom
-    signature_data = [
-        ['', 'Kupang, ......................'],
-        ['', 'Mengetahui,'],
-        ['', ''],
-        ['', ''],
-        ['', '(Alain N. Susanto)']
-    ]
-    
-    signature_table = Table(signature_data, colWidths=[8*cm, 8*cm])
-    signature_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (1, -1), (1, -1), 30),
-    ]))
-    
-    story.append(signature_table)
-    
-    # Build PDF
-    doc.build(story)
-    
-    # Get the value of the BytesIO buffer and write it to the response
-    pdf = buffer.getvalue()
-    buffer.close()
-    response.write(pdf)
+def laporan_bundel_zip(request):
+    """
+    Antrekan ZIP PDF semua laporan untuk filter yang sama sebagai satu LaporanJob;
+    klik berulang dengan filter dan versi data yang sama berbagi job yang sama
+    """
+    job = buat_job(BUNDEL, FilterLaporan.from_querydict(request.GET), request.user)
+    if job.status == 'Selesai':
+        return redirect('admin:laporan-job-unduh', id_job=job.idJob)
+    return redirect('admin:laporan-job-status', id_job=job.idJob)
+
+def laporan_ekspor(request, nama, format_ekspor):
+    """Unduh laporan sebagai CSV atau XLSX yang di-stream baris demi baris"""
+    laporan = get_laporan(nama)
+    filter_laporan = FilterLaporan.from_querydict(request.GET)
+    
+    response = StreamingHttpResponse(
+        iter_ekspor(laporan, filter_laporan, format_ekspor),
+        content_type=FORMAT_EKSPOR[format_ekspor],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{laporan.get_filename(format_ekspor)}"'
     return response
 
+def laporan_pelanggan(request):
+    return render_laporan_pdf(request, get_laporan('pelanggan'))
+
 def laporan_produk(request):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="laporan_produk.pdf"'
-    
-    # Create a PDF buffer
-    buffer = BytesIO()
-    
-    # Create the PDF object, using the buffer as its "file."
-    doc = SimpleDocTemplate(buffer, pagesize=A4, 
-                           leftMargin=2*cm, rightMargin=2*cm,
-                           topMargin=2*cm, bottomMargin=2*cm)
-    
-    filter_tipe = request.GET.get('filter_tipe')
-    batas_stok = request.GET.get('batas_stok', 10)
-    tgl_mulai = request.GET.get('tgl_mulai')
-    tgl_akhir = request.GET.get('tgl_akhir')
-    
-    produk_list = Produk.objects.all()
-    
-    date_range = ""
-    if tgl_mulai and tgl_akhir:
-        date_range = f"{tgl_mulai} - {tgl_akhir}"
-    
-    if filter_tipe == 'terlaris' or (tgl_mulai or tgl_akhir):
-        date_filter_q = None
-        if tgl_mulai and tgl_akhir:
-            date_filter_q = Q(detailpemesanan__idPemesanan__tanggalPemesanan__date__gte=tgl_mulai) & \
-                           Q(detailpemesanan__idPemesanan__tanggalPemesanan__date__lte=tgl_akhir)
-        elif tgl_mulai:
-            date_filter_q = Q(detailpemesanan__idPemesanan__tanggalPemesanan__date__gte=tgl_mulai)
-        elif tgl_akhir:
-            date_filter_q = Q(detailpemesanan__idPemesanan__tanggalPemesanan__date__lte=tgl_akhir)
-        
-        if filter_tipe == 'terlaris':
-            if date_filter_q:
-                produk_list = produk_list.annotate(
-                    total_terjual=Sum('detailpemesanan__jumlah', filter=date_filter_q)
-                ).order_by('-total_terjual')
-            else:
-                produk_list = produk_list.annotate(
-                    total_terjual=Sum('detailpemesanan__jumlah')
-                ).order_by('-total_terjual')
-        else:
-            produk_list = produk_list.annotate(
-                total_terjual=Sum('detailpemesanan__jumlah', filter=date_filter_q) if date_filter_q else Sum('detailpemesanan__jumlah')
-            )
-    elif filter_tipe == 'stok_menipis':
-        produk_list = produk_list.filter(stok__lte=batas_stok).order_by('stok')
-    
-    # Container for the 'Flowable' objects
-    story = []
-    
-    # Add company header
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    normal_style = styles['Normal']
-    
-    # Set font size for title
-    title_style.fontSize = 12
-    title_style.alignment = 1  # Center alignment
-    
-    # Title
-    title = Paragraph("Laporan Data Produk & Stok VIQUAM", title_style)
-    story.append(title)
-    
-    # Company address
-    address_style = normal_style.clone('Address')
-    address_style.fontSize = 10  # Set font size to 10pt
-    address_style.alignment = 1  # Center alignment
-    address = Paragraph("Jl. Cendrawasih, Lahilai Bissi Kopan, Kec. Kota Lama, Kota Kupang Nusa Tenggara Timur.", address_style)
-    story.append(address)
-    
-    # Date range if provided
-    if date_range:
-        date_paragraph = Paragraph(f"Periode: {date_range}", address_style)
-        story.append(date_paragraph)
-    
-    # Add spacer between address/date and horizontal line
-    story.append(Spacer(1, 12))
-    
-    # Horizontal line (moved above table)
-    # Using a 1x1 table for reliable horizontal line placement
-    line_table = Table([['']], colWidths=[16*cm], rowHeights=[1])
-    line_table.setStyle(TableStyle([
-        ('LINEABOVE', (0, 0), (0, 0), 2, colors.black),  # Increased line thickness to 2
-        ('LEFTPADDING', (0, 0), (0, 0), 0),
-        ('RIGHTPADDING', (0, 0), (0, 0), 0),
-        ('TOPPADDING', (0, 0), (0, 0), 0),
-        ('BOTTOMPADDING', (0, 0), (0, 0), 0),
-    ]))
-    story.append(line_table)
-    story.append(Spacer(1, 12))
-    
-    # Prepare data for table
-    data = [['No.', 'Nama Produk', 'Ukuran', 'Harga', 'Stok', 'Terjual']]
-    
-    for i, produk in enumerate(produk_list, 1):
-        product_date_filter_q = None
-        if tgl_mulai and tgl_akhir:
-            product_date_filter_q = Q(idPemesanan__tanggalPemesanan__date__gte=tgl_mulai) & \
-                                  Q(idPemesanan__tanggalPemesanan__date__lte=tgl_akhir)
-        elif tgl_mulai:
-            product_date_filter_q = Q(idPemesanan__tanggalPemesanan__date__gte=tgl_mulai)
-        elif tgl_akhir:
-            product_date_filter_q = Q(idPemesanan__tanggalPemesanan__date__lte=tgl_akhir)
-            
-        total_terjual = 0
-        if filter_tipe == 'terlaris' or (tgl_mulai or tgl_akhir):
-            if product_date_filter_q:
-                total_terjual = produk.detailpemesanan_set.filter(product_date_filter_q).aggregate(
-                    total=Sum('jumlah')
-                )['total'] or 0
-            else:
-                total_terjual = produk.detailpemesanan_set.aggregate(
-                    total=Sum('jumlah')
-                )['total'] or 0
-        else:
-            total_terjual = getattr(produk, 'total_terjual', 0) or 0
-        
-        row = [
-            str(i),
-            produk.namaProduk,
-            produk.ukuranKemasan,
-            format_rupiah(produk.hargaPerDus),
-            str(produk.stok),
-            str(total_terjual)
-        ]
-        data.append(row)
-    
-    # Create table with improved styling
-    table = Table(data, colWidths=[1.5*cm, 4*cm, 2.5*cm, 3*cm, 2*cm, 2.5*cm])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    
-    story.append(table)
-    story.append(Spacer(1, 24))
-    
-    # Add signature section (positioned at bottom right)
-    story.append(Spacer(1, 200))  # Push signature to bottom
-    signature_data = [
-        ['', 'Kupang, ......................'],
-        ['', 'Mengetahui,'],
-        ['', ''],
-        ['', ''],
-        ['', '(Alain N. Susanto)']
-    ]
-    
-    signature_table = Table(signature_data, colWidths=[8*cm, 8*cm])
-    signature_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (1, -1), (1, -1), 30),
-        ('LINEBELOW', (1, -1), (1, -1), 1, colors.black),
-    ]))
-    
-    story.append(signature_table)
-    
-    # Build PDF
-    doc.build(story)
-    
-    # Get the value of the BytesIO buffer and write it to the response
-    pdf = buffer.getvalue()
-    buffer.close()
-    response.write(pdf)
-    return response
+    return render_laporan_pdf(request, get_laporan('produk'))
 
 def laporan_sopir_kendaraan(request):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="laporan_sopir_kendaraan.pdf"'
-    
-    # Create a PDF buffer
-    buffer = BytesIO()
-    
-    # Create the PDF object, using the buffer as its "file."
-    doc = SimpleDocTemplate(buffer, pagesize=A4, 
-                           leftMargin=2*cm, rightMargin=2*cm,
-                           topMargin=2*cm, bottomMargin=2*cm)
-    
-    # Get filter parameters
-    tgl_mulai = request.GET.get('tgl_mulai')
-    tgl_akhir = request.GET.get('tgl_akhir')
-    
-    # Build queryset
-    sopir_list = Sopir.objects.all()
-    
-    # Apply date filters if provided and not empty
-    date_range = ""
-    if tgl_mulai and tgl_akhir:
-        date_range = f"{tgl_mulai} - {tgl_akhir}"
-    
-    # Container for the 'Flowable' objects
-    story = []
-    
-    # Add company header
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    normal_style = styles['Normal']
-    
-    # Set font size for title
-    title_style.fontSize = 12
-    title_style.alignment = 1  # Center alignment
-    
-    # Title
-    title = Paragraph("Laporan Data Sopir & Kendaraan VIQUAM", title_style)
-    story.append(title)
-    
-    # Company address
-    address_style = normal_style.clone('Address')
-    address_style.fontSize = 10  # Set font size to 10pt
-    address_style.alignment = 1  # Center alignment
-    address = Paragraph("Jl. Cendrawasih, Lahilai Bissi Kopan, Kec. Kota Lama, Kota Kupang Nusa Tenggara Timur.", address_style)
-    story.append(address)
-    
-    # Date range if provided
-    if date_range:
-        date_paragraph = Paragraph(f"Periode: {date_range}", address_style)
-        story.append(date_paragraph)
-    
-    # Add spacer between address/date and horizontal line
-    story.append(Spacer(1, 12))
-    
-    # Horizontal line (moved above table)
-    # Using a 1x1 table for reliable horizontal line placement
-    line_table = Table([['']], colWidths=[16*cm], rowHeights=[1])
-    line_table.setStyle(TableStyle([
-        ('LINEABOVE', (0, 0), (0, 0), 2, colors.black),  # Increased line thickness to 2
-        ('LEFTPADDING', (0, 0), (0, 0), 0),
-        ('RIGHTPADDING', (0, 0), (0, 0), 0),
-        ('TOPPADDING', (0, 0), (0, 0), 0),
-        ('BOTTOMPADDING', (0, 0), (0, 0), 0),
-    ]))
-    story.append(line_table)
-    story.append(Spacer(1, 12))
-    
-    # Prepare data for table
-    data = [['No.', 'Nama Sopir', 'No HP', 'Username', 'Kendaraan', 'Pesanan Selesai']]
-    
-    for i, sopir in enumerate(sopir_list, 1):
-        # Get driver's vehicle
-        kendaraan = Kendaraan.objects.filter(idSopir=sopir).first()
-        nama_kendaraan = kendaraan.nama if kendaraan else "-"
-        
-        # Count completed orders for this driver
-        pesanan_selesai_queryset = Pemesanan.objects.filter(
-            idSopir=sopir,
-            status='Selesai'
-        )
-        
-        # Apply date filters if provided and not empty
-        if tgl_mulai:
-            pesanan_selesai_queryset = pesanan_selesai_queryset.filter(
-                tanggalPemesanan__date__gte=tgl_mulai
-            )
-        if tgl_akhir:
-            pesanan_selesai_queryset = pesanan_selesai_queryset.filter(
-                tanggalPemesanan__date__lte=tgl_akhir
-            )
-            
-        pesanan_selesai_count = pesanan_selesai_queryset.count()
-        
-        row = [
-            str(i),
-            sopir.nama,
-            sopir.noHp,
-            sopir.username,
-            nama_kendaraan,
-            str(pesanan_selesai_count)
-        ]
-        data.append(row)
-    
-    # Create table with improved styling
-    table = Table(data, colWidths=[1.5*cm, 3*cm, 3*cm, 2.5*cm, 4*cm, 3*cm])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    
-    story.append(table)
-    story.append(Spacer(1, 24))
-    
-    # Add signature section (positioned at bottom right)
-    story.append(Spacer(1, 200))  # Push signature to bottom
-    signature_data = [
-        ['', 'Kupang, ......................'],
-        ['', 'Mengetahui,'],
-        ['', ''],
-        ['', ''],
-        ['', '(Alain N. Susanto)']
-    ]
-    
-    signature_table = Table(signature_data, colWidths=[8*cm, 8*cm])
-    signature_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),n        ('TOPPADDING', (1, -1), (1, -1), 30),
-        ('LINEBELOW', (1, -1), (1, -1), 1, colors.black),
-    ]))
-    
-    story.append(signature_table)
-    
-    # Build PDF
-    doc.build(story)
-    
-    # Get the value of the BytesIO buffer and write it to the response
-    pdf = buffer.getvalue()
-    buffer.close()
-    response.write(pdf)
-    return response
+    return render_laporan_pdf(request, get_laporan('sopir-kendaraan'))
 
 def laporan_pemesanan_pendapatan(request):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="laporan_pemesanan_pendapatan.pdf"'
-    
-    # Create a PDF buffer
-    buffer = BytesIO()
-    
-    # Create the PDF object, using the buffer as its "file."
-    doc = SimpleDocTemplate(buffer, pagesize=A4, 
-                           leftMargin=2*cm, rightMargin=2*cm,
-                           topMargin=2*cm, bottomMargin=2*cm)
-    
-    # Get filter parameters
-    tgl_mulai = request.GET.get('tgl_mulai')
-    tgl_akhir = request.GET.get('tgl_akhir')
-    status_pesanan = request.GET.get('status_pesanan')
-    
-    # Build queryset
-    pemesanan_list = Pemesanan.objects.all()
-    
-    # Apply filters
-    date_range = ""
-    if tgl_mulai and tgl_akhir:
-        date_range = f"{tgl_mulai} - {tgl_akhir}"
-        pemesanan_list = pemesanan_list.filter(
-            tanggalPemesanan__date__gte=tgl_mulai,
-            tanggalPemesanan__date__lte=tgl_akhir
-        )
-    else:
-        # Apply individual date filters if provided
-        if tgl_mulai:
-            pemesanan_list = pemesanan_list.filter(
-                tanggalPemesanan__date__gte=tgl_mulai
-            )
-        if tgl_akhir:
-            pemesanan_list = pemesanan_list.filter(
-                tanggalPemesanan__date__lte=tgl_akhir
-            )
-    
-    if status_pesanan:
-        pemesanan_list = pemesanan_list.filter(status=status_pesanan)
-    
-    # Calculate total revenue
-    total_pendapatan = pemesanan_list.aggregate(total=Sum('total'))['total'] or 0
-    
-    # Container for the 'Flowable' objects
-    story = []
-    
-    # Add company header
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    normal_style = styles['Normal']
-    
-    # Set font size for title
-    title_style.fontSize = 12
-    title_style.alignment = 1  # Center alignment
-    
-    # Title
-    title = Paragraph("Laporan Data Pemesanan & Pendapatan VIQUAM", title_style)
-    story.append(title)
-    
-    # Company address
-    address_style = normal_style.clone('Address')
-    address_style.fontSize = 10  # Set font size to 10pt
-    address_style.alignment = 1  # Center alignment
-    address = Paragraph("Jl. Cendrawasih, Lahilai Bissi Kopan, Kec. Kota Lama, Kota Kupang Nusa Tenggara Timur.", address_style)
-    story.append(address)
-    
-    # Date range if provided
-    if date_range:
-        date_paragraph = Paragraph(f"Periode: {date_range}", address_style)
-        story.append(date_paragraph)
-    
-    # Add spacer between address/date and horizontal line
-    story.append(Spacer(1, 12))
-    
-    # Total revenue
-    total_paragraph = Paragraph(f"<b>Total Pendapatan:</b> {format_rupiah(total_pendapatan)}", normal_style)
-    story.append(total_paragraph)
-    
-    # Horizontal line (moved above table)
-    # Using a 1x1 table for reliable horizontal line placement
-    line_table = Table([['']], colWidths=[16*cm], rowHeights=[1])
-    line_table.setStyle(TableStyle([
-        ('LINEABOVE', (0, 0), (0, 0), 2, colors.black),  # Increased line thickness to 2
-        ('LEFTPADDING', (0, 0), (0, 0), 0),
-        ('RIGHTPADDING', (0, 0), (0, 0), 0),
-        ('TOPPADDING', (0, 0), (0, 0), 0),
-        ('BOTTOMPADDING', (0, 0), (0, 0), 0),
-    ]))
-    story.append(line_table)
-    story.append(Spacer(1, 12))
-    
-    # Prepare data for table
-    data = [['No.', 'Tanggal', 'Pelanggan', 'Alamat', 'Status', 'Total']]
-    
-    for i, pemesanan in enumerate(pemesanan_list, 1):
-        row = [
-            str(i),
-            pemesanan.tanggalPemesanan.strftime("%d/%m/%Y"),
-            pemesanan.idPelanggan.nama,
-            pemesanan.alamatPengiriman,
-            pemesanan.status,
-            format_rupiah(pemesanan.total)
-        ]
-        data.append(row)
-    
-    # Create table with improved styling
-    table = Table(data, colWidths=[1.5*cm, 3*cm, 3*cm, 4*cm, 2.5*cm, 3*cm])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    
-    story.append(table)
-    story.append(Spacer(1, 24))
-    
-    # Add signature section (positioned at bottom right)
-    story.append(Spacer(1, 200))  # Push signature to bottom
-    signature_data = [
-        ['', 'Kupang, ......................'],
-        ['', 'Mengetahui,'],
-        ['', ''],
-        ['', ''],
-        ['', '(Alain N. Susanto)']
-    ]
-    
-    signature_table = Table(signature_data, colWidths=[8*cm, 8*cm])
-    signature_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (1, -1), (1, -1), 30),
-        ('LINEBELOW', (1, -1), (1, -1), 1, colors.black),
-    ]))
-    
-    story.append(signature_table)
-    
-    # Build PDF
-    doc.build(story)
-    
-    # Get the value of the BytesIO buffer and write it to the response
-    pdf = buffer.getvalue()
-    buffer.close()
-    response.write(pdf)
-    return response
+    return render_laporan_pdf(request, get_laporan('pemesanan-pendapatan'))
 
 def laporan_feedback(request):
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="laporan_feedback.pdf"'
-    
-    # Create a PDF buffer
-    buffer = BytesIO()
-    
-    # Create the PDF object, using the buffer as its "file."
-    doc = SimpleDocTemplate(buffer, pagesize=A4, 
-                           leftMargin=2*cm, rightMargin=2*cm,
-                           topMargin=2*cm, bottomMargin=2*cm)
-    
-    # Get filter parameters
-    tgl_mulai = request.GET.get('tgl_mulai')
-    tgl_akhir = request.GET.get('tgl_akhir')
-    
-    # Build queryset
-    feedback_list = Feedback.objects.all().select_related('idPelanggan')
-    
-    # Apply date filters if provided and not empty
-    date_range = ""
-    if tgl_mulai and tgl_akhir:
-        date_range = f"{tgl_mulai} - {tgl_akhir}"
-        feedback_list = feedback_list.filter(
-            tanggal__date__gte=tgl_mulai,
-            tanggal__date__lte=tgl_akhir
-        )
-    else:
-        # Apply individual date filters if provided
-        if tgl_mulai:
-            feedback_list = feedback_list.filter(
-                tanggal__date__gte=tgl_mulai
-            )
-        if tgl_akhir:
-            feedback_list = feedback_list.filter(
-                tanggal__date__lte=tgl_akhir
-            )
-    
-    # Container for the 'Flowable' objects
-    story = []
-    
-    # Add company header
-    styles = getSampleStyleSheet()
-    title_style = styles['Title']
-    normal_style = styles['Normal']
-    
-    # Set font size for title
-    title_style.fontSize = 12
-    title_style.alignment = 1  # Center alignment
-    
-    # Title
-    title = Paragraph("Laporan Data Feedback Pelanggan VIQUAM", title_style)
-    story.append(title)
-    
-    # Company address
-    address_style = normal_style.clone('Address')
-    address_style.fontSize = 10  # Set font size to 10pt
-    address_style.alignment = 1  # Center alignment
-    address = Paragraph("Jl. Cendrawasih, Lahilai Bissi Kopan, Kec. Kota Lama, Kota Kupang Nusa Tenggara Timur.", address_style)
-    story.append(address)
-    
-    # Date range if provided
-    if date_range:
-        date_paragraph = Paragraph(f"Periode: {date_range}", address_style)
-        story.append(date_paragraph)
-    
-    # Add spacer between address/date and horizontal line
-    story.append(Spacer(1, 12))
-    
-    # Horizontal line (moved above table)
-    # Using a 1x1 table for reliable horizontal line placement
-    line_table = Table([['']], colWidths=[16*cm], rowHeights=[1])
-    line_table.setStyle(TableStyle([
-        ('LINEABOVE', (0, 0), (0, 0), 2, colors.black),  # Increased line thickness to 2
-        ('LEFTPADDING', (0, 0), (0, 0), 0),
-        ('RIGHTPADDING', (0, 0), (0, 0), 0),
-        ('TOPPADDING', (0, 0), (0, 0), 0),
-        ('BOTTOMPADDING', (0, 0), (0, 0), 0),
-    ]))
-    story.append(line_table)
-    story.append(Spacer(1, 12))
-    
-    # Prepare data for table (without Rating column as requested)
-    data = [['No.', 'Nama Pelanggan', 'Subjek', 'Tanggal']]
-    
-    for i, feedback in enumerate(feedback_list, 1):
-        row = [
-            str(i),
-            feedback.idPelanggan.nama,
-            feedback.isi[:30] + "..." if len(feedback.isi) > 30 else feedback.isi,
-            feedback.tanggal.strftime("%d/%m/%Y")
-        ]
-        data.append(row)
-    
-    # Create table with improved styling
-    table = Table(data, colWidths=[1.5*cm, 4*cm, 6*cm, 3*cm])
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-    ]))
-    
-    story.append(table)
-    story.append(Spacer(1, 24))
-    
-    # Add signature section (positioned at bottom right)
-    story.append(Spacer(1, 200))  # Push signature to bottom
-    signature_data = [
-        ['', 'Kupang, ......................'],
-        ['', 'Mengetahui,'],
-        ['', ''],
-        ['', ''],
-        ['', '(Alain N. Susanto)']
-    ]
-    
-    signature_table = Table(signature_data, colWidths=[8*cm, 8*cm])
-    signature_table.setStyle(TableStyle([
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('TOPPADDING', (1, -1), (1, -1), 30),
-        ('LINEBELOW', (1, -1), (1, -1), 1, colors.black),
-    ]))
-    
-    story.append(signature_table)
-    
-    # Build PDF
-    doc.build(story)
-    
-    # Get the value of the BytesIO buffer and write it to the response
-    pdf = buffer.getvalue()
-    buffer.close()
-    response.write(pdf)
-    return response
+    return render_laporan_pdf(request, get_laporan('feedback'))
 
 def sopir_login(request):
     if request.method == 'POST':
@@ -1297,7 +345,13 @@ def sopir_edit_pengiriman(request, pk):
         form = SopirEditPengirimanForm(request.POST, request.FILES, instance=pesanan)
         if form.is_valid():
             # Save the form with the status selected by the Sopir
-            form.save()
+            try:
+                form.save()
+            except ValidationError as e:
+                # Pesanan diubah admin bersamaan dengan pembatalan ini
+                for pesan in e.messages:
+                    messages.error(request, pesan)
+                return redirect('sopir-dashboard')
             
             messages.success(request, 'Verifikasi pengiriman berhasil.')
             return redirect('sopir-dashboard')
@@ -1347,6 +401,27 @@ def save_keranjang(request, keranjang):
     request.session['cart'] = keranjang
     request.session.modified = True
 
+def validasi_keranjang(keranjang, produk_map):
+    """
+    Cocokkan harga dan stok di keranjang dengan produk dari `produk_map` ({idProduk: Produk}).
+    Keranjang diperbarui di tempat (produk yang hilang dihapus, harga dan stok disegarkan)
+    dan daftar pesan untuk pelanggan dikembalikan; daftar kosong berarti keranjang valid.
+    """
+    masalah = []
+    for product_id, item in list(keranjang.items()):
+        produk = produk_map.get(int(product_id))
+        if produk is None:
+            del keranjang[product_id]
+            masalah.append(f'{item["nama"]} sudah tidak tersedia dan telah dihapus dari keranjang.')
+            continue
+        if Decimal(str(item['harga'])) != produk.hargaPerDus:
+            item['harga'] = float(produk.hargaPerDus)
+            masalah.append(f'Harga {produk.namaProduk} telah berubah. Silakan periksa kembali keranjang Anda.')
+        item['stok'] = produk.stok
+        if item['quantity'] > produk.stok:
+            masalah.append(f'Stok {produk.namaProduk} tidak mencukupi. Stok tersedia: {produk.stok}')
+    return masalah
+
 # Pelanggan Views
 def landing_page(request):
     """Landing page view"""
@@ -1645,44 +720,46 @@ def checkout_pemesanan(request):
                     'total_price': total_price,
                 })
             
-            # Use atomic transaction to ensure data consistency
-            with transaction.atomic():
-                # Get pelanggan from session
-                pelanggan_id = request.session['pelanggan_id']
-                pelanggan = Pelanggan.objects.get(idPelanggan=pelanggan_id)
-                
-                # Create new pemesanan
-                pemesanan = Pemesanan.objects.create(
-                    idPelanggan=pelanggan,
-                    alamatPengiriman=form.cleaned_data['alamatPengiriman'],
-                    total=total_price,
-                    buktiBayar=bukti_bayar,
-                    status='Diproses'
-                )
-                
-                # Create detail pemesanan for each item in cart
-                for item in cart_items:
-                    # Get produk
-                    produk = Produk.objects.get(idProduk=item['id'])
-                    
-                    # Check stock availability
-                    if item['quantity'] > produk.stok:
-                        raise ValueError(f'Stok {produk.namaProduk} tidak mencukupi.')
-                    
-                    # Create detail pemesanan
-                    DetailPemesanan.objects.create(
-                        idPemesanan=pemesanan,
-                        idProduk=produk,
-                        jumlah=item['quantity'],
-                        subTotal=item['subtotal']
+            # Semua produk di keranjang diambil dengan satu in_bulk, lalu harga dan stok
+            # dicek ulang di memori; jumlah query checkout tidak bergantung jumlah baris
+            produk_map = Produk.objects.in_bulk([int(product_id) for product_id in keranjang])
+            masalah = validasi_keranjang(keranjang, produk_map)
+            if masalah:
+                save_keranjang(request, keranjang)
+                for pesan in masalah:
+                    messages.error(request, pesan)
+                return redirect('view_keranjang')
+            
+            pemesanan = None
+            try:
+                with transaction.atomic():
+                    pemesanan = Pemesanan.objects.create(
+                        idPelanggan_id=request.session['pelanggan_id'],
+                        alamatPengiriman=form.cleaned_data['alamatPengiriman'],
+                        buktiBayar=bukti_bayar,
+                        status='Diproses'
                     )
-                
-                # Clear cart from session
-                del request.session['cart']
-                request.session.modified = True
-                
-                messages.success(request, 'Pesanan berhasil dibuat!')
-                return redirect('riwayat_pesanan')
+                    # Baris dibuat dengan bulk_create dan stok semua produk dipotong dengan
+                    # satu UPDATE bersyarat; total dihitung dari harga produk saat ini
+                    pemesanan.add_lines(
+                        [(int(product_id), item['quantity']) for product_id, item in keranjang.items()],
+                        produk_map=produk_map,
+                    )
+            except ValidationError as e:
+                # Stok berubah oleh checkout lain setelah dicek; seluruh pesanan dibatalkan.
+                # File bukti bayar sudah tersimpan di storage saat INSERT dan tidak ikut di-rollback
+                if pemesanan is not None and pemesanan.buktiBayar:
+                    pemesanan.buktiBayar.delete(save=False)
+                for pesan in e.messages:
+                    messages.error(request, pesan)
+                return redirect('view_keranjang')
+            
+            # Clear cart from session
+            del request.session['cart']
+            request.session.modified = True
+            
+            messages.success(request, 'Pesanan berhasil dibuat!')
+            return redirect('riwayat_pesanan')
         else:
             messages.error(request, 'Terjadi kesalahan pada form. Silakan periksa kembali.')
     else:
@@ -0,0 +1,21 @@
+"""
+Entry point proses pool `proses_laporan_job` (job PDF dan laporan dalam job bundel ZIP). Proses
+hasil spawn membongkar fungsi-fungsi ini sebelum Django siap, jadi modul ini
+tidak boleh mengimpor model di level atas.
+"""
+
+
+def init_worker():
+    import django
+    django.setup()
+
+
+def proses_job(id_job):
+    from core.reports.jobs import proses_job
+    return proses_job(id_job)
+
+
+def simpan_pdf_cache(nama, parameter, kunci):
+    from core.reports import FilterLaporan, get_laporan
+    from core.reports.jobs import simpan_pdf_cache
+    return simpan_pdf_cache(get_laporan(nama), FilterLaporan.from_querydict(parameter), kunci)
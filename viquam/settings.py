@@ -84,6 +84,20 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Dashboard admin di-cache dan diinvalidasi lewat signals (lihat core/signals.py).
+# Untuk production dengan beberapa worker gunakan backend bersama (Redis/Memcached)
+# agar invalidasi terlihat oleh semua proses.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'viquam',
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 